@@ -3,7 +3,7 @@ import click
 from pathlib import Path
 from pylegislation.utils import find_project_root
 from pylegislation.research.categorize import categorize_acts
-from pylegislation.research.lineage import generate_lineage_json, generate_lineage_markdown
+from pylegislation.research.lineage import generate_lineage
 from pylegislation.research.process import process_acts
 from pylegislation.research.analyze import analyze_base, analyze_custom, analyze_act_by_id, extract_text_fallback, fetch_pdf
 from pylegislation.research.versions import init_versioning, apply_patch, list_versions, get_head_path
@@ -30,19 +30,15 @@ def cmd_categorize():
     categorize_acts(i, o)
 
 @research.command("lineage")
-def cmd_lineage():
-    """Generate lineage JSON applying patches."""
+@click.option("--force", is_flag=True, help="Rewrite all outputs, ignoring the saved lineage state")
+def cmd_lineage(force):
+    """Generate lineage JSON and markdown applying patches (only changed families are rewritten)."""
     i = get_head_path()
     o = PROJECT_ROOT / 'ui/public/data/lineage.json'
     p = PROJECT_ROOT / 'reports/research/patches'
-    print(f"Generating lineage from {i.name}...")
-    generate_lineage_json(i, o, p)
-    
-    # Generate Markdown lineage
-    from pylegislation.research.lineage import generate_lineage_markdown
     out_dir = PROJECT_ROOT / 'reports/research/lineage'
-    print(f"Generating lineage markdown to {out_dir}...")
-    generate_lineage_markdown(i, out_dir)
+    print(f"Generating lineage from {i.name} (markdown to {out_dir})...")
+    generate_lineage(i, o, p, out_dir, force=force)
 
 @research.command("update-docs")
 def cmd_update_docs():
@@ -71,24 +67,27 @@ def version_group():
 @click.option("--by-id", is_flag=True, help="Treat target as doc_id instead of path")
 @click.option("--fetch-only", is_flag=True, help="Fetch document only, do not analyze")
 @click.option("--force-refresh", is_flag=True, help="Force refresh of analysis")
-def cmd_analyze(target, api_key, by_id, fetch_only, force_refresh):
+@click.option("--chunked/--no-chunked", default=None, help="Force chunked (map-reduce) analysis on or off for a local file (default: by size)")
+def cmd_analyze(target, api_key, by_id, fetch_only, force_refresh, chunked):
     """Analyze a local PDF or Act by ID using Gemini."""
     import json
     from pylegislation.research.analyze import analyze_act_by_id, analyze_base
+    from pylegislation.research.db import create_db_and_tables
     
     try:
         if by_id:
-            data_path = get_head_path()
+            # Ensure cache/store/lease tables exist on older databases
+            create_db_and_tables()
             result_json = analyze_act_by_id(
                 target, 
                 api_key, 
-                data_path, 
+                None, 
                 PROJECT_ROOT, 
                 force_refresh=force_refresh, 
                 fetch_only=fetch_only
             )
         else:
-            result_json = analyze_base(Path(target), api_key)
+            result_json = analyze_base(Path(target), api_key, chunked=chunked)
         
         if not result_json:
              result_json = json.dumps({"error": "Empty response from LLM"})
@@ -100,6 +99,58 @@ def cmd_analyze(target, api_key, by_id, fetch_only, force_refresh):
         traceback.print_exc() # print stack to stderr
         print(json.dumps({"error": str(e)})) # Print JSON error for API route to parse safely
 
+@research.command("analyze-batch")
+@click.option("--api-key", required=True, help="Google API Key")
+@click.option("--ids", help="Comma-separated doc_ids to analyze")
+@click.option("--ids-file", type=click.Path(exists=True, path_type=Path), help="File with one doc_id per line")
+@click.option("--domain", help="Analyze all acts in this domain")
+@click.option("--year", help="Analyze all acts from this year")
+@click.option("--limit", type=int, help="Maximum number of acts to select")
+@click.option("--concurrency", default=4, show_default=True, help="Parallel analyses")
+@click.option("--rpm", default=15, show_default=True, type=click.IntRange(min=1), help="Requests per minute budget")
+@click.option("--tpm", default=1_000_000, show_default=True, type=click.IntRange(min=1), help="Tokens per minute budget")
+@click.option("--resume", "resume_run_id", help="Resume an interrupted batch run by id")
+@click.option("--retry-failed", is_flag=True, help="With --resume, also retry failed acts")
+@click.option("--force-refresh", is_flag=True, help="Re-analyze acts that are already cached")
+def cmd_analyze_batch(api_key, ids, ids_file, domain, year, limit, concurrency, rpm, tpm, resume_run_id, retry_failed, force_refresh):
+    """Analyze many acts concurrently with rate limits and resumable checkpoints."""
+    from pylegislation.research.batch import run_batch, select_doc_ids
+
+    doc_ids = None
+    if not resume_run_id:
+        id_list = []
+        if ids:
+            id_list.extend(i.strip() for i in ids.split(",") if i.strip())
+        if ids_file:
+            id_list.extend(line.strip() for line in ids_file.read_text().splitlines() if line.strip())
+        if not (id_list or domain or year):
+            raise click.UsageError("Provide --ids, --ids-file, --domain or --year (or --resume)")
+        doc_ids = select_doc_ids(id_list or None, domain, year, limit)
+
+    run_batch(
+        api_key,
+        PROJECT_ROOT,
+        doc_ids=doc_ids,
+        resume_run_id=resume_run_id,
+        retry_failed=retry_failed,
+        force_refresh=force_refresh,
+        concurrency=concurrency,
+        rpm=rpm,
+        tpm=tpm
+    )
+
+@research.command("db-bench")
+@click.option("--seconds", default=5.0, show_default=True, help="Duration of each scenario")
+@click.option("--readers", default=4, show_default=True, help="Concurrent reader threads")
+@click.option("--writers", default=2, show_default=True, help="Concurrent writer threads")
+@click.option("--source", type=click.Path(exists=True, path_type=Path), help="research.db to copy (default: data/research.db)")
+def cmd_db_bench(seconds, readers, writers, source):
+    """Benchmark concurrent read/write throughput of research.db storage profiles."""
+    from pylegislation.research.bench import run_storage_benchmark
+    from pylegislation.research.db import BASE_DIR
+
+    run_storage_benchmark(seconds, readers, writers, source or BASE_DIR / "data/research.db")
+
 @research.command()
 def migrate():
     """Migrate Acts JSON to SQLite."""
@@ -108,39 +159,43 @@ def migrate():
 
 @research.command()
 @click.argument("output_path", required=False, type=click.Path(path_type=Path))
-def dump_analysis(output_path):
+@click.option("--compress", type=click.Choice(["none", "gzip", "zstd"]), default="gzip", show_default=True,
+              help="Compression for the default versioned dump (OUTPUT_PATH uses its suffix: .gz / .zst)")
+@click.option("--full", is_flag=True, help="Write a full dump instead of a delta on top of the last one")
+def dump_analysis(output_path, compress, full):
     """
-    Dump analysis cache to JSON file.
+    Dump analysis cache, history and telemetry to a streaming NDJSON file.
     
-    If OUTPUT_PATH is not provided, defaults to saving versioned and latest dumps
-    in 'acts/database/dump/'.
+    If OUTPUT_PATH is not provided, writes a versioned dump in
+    'reports/database/dump/': a delta holding only rows newer than the
+    previous dump (recorded in manifest.json), or a full dump with --full,
+    when there is no previous one, or every few deltas.
+    OUTPUT_PATH always gets a standalone full dump.
     """
-    from datetime import datetime
-    from pylegislation.research.dump import dump_analysis_to_json
-    
-    paths = []
+    from pylegislation.research.dump import DUMP_DIR, dump_analysis_to_json, write_versioned_dump
     
-    if output_path:
-        paths.append(output_path)
-    else:
-        # Default behavior: Versioned + Latest
-        dump_dir = PROJECT_ROOT / "reports/database/dump"
-        dump_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Local time for versioning
-        now_str = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        versioned_name = f"analysis_dump_{now_str}.json"
-        
-        paths.append(dump_dir / versioned_name)
-        
-    dump_analysis_to_json(paths)
+    try:
+        if output_path:
+            dump_analysis_to_json([output_path])
+        else:
+            write_versioned_dump(PROJECT_ROOT / DUMP_DIR, compression=compress, full=full)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
 
 @research.command()
 @click.argument("input_path", type=click.Path(exists=True, path_type=Path))
 def load_analysis(input_path):
-    """Load analysis cache from JSON file."""
-    from pylegislation.research.dump import load_analysis_from_json
-    load_analysis_from_json(input_path)
+    """
+    Load analysis cache from a dump file (NDJSON, optionally compressed, or legacy JSON).
+
+    If INPUT_PATH is a dump directory, replays its latest full dump and the
+    deltas after it (or the newest dump when it has no manifest).
+    """
+    from pylegislation.research.dump import load_analysis_from_json, load_dump_dir
+    if input_path.is_dir():
+        load_dump_dir(input_path)
+    else:
+        load_analysis_from_json(input_path)
 
 @version_group.command("init")
 def cmd_ver_init():
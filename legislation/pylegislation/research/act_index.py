@@ -0,0 +1,142 @@
+import csv
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from pylegislation.research import versions
+
+# How often (seconds) a lookup may stat the manifest/TSV to detect changes.
+# Lookups in between are pure dict hits.
+CHECK_INTERVAL = 2.0
+
+
+def _stat_key(path: Path):
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ActIndex:
+    """
+    In-memory index of act metadata rows keyed by doc_id.
+
+    If `path` is None the index follows the versioning HEAD (manifest.json),
+    otherwise it tracks the given TSV. The index is rebuilt when the manifest
+    head or the TSV mtime/size changes.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self._rows: Dict[str, dict] = {}
+        self._source: Optional[Path] = None
+        self._fingerprint = None
+        self._manifest_key = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _resolve_source(self) -> Path:
+        if self.path is not None:
+            return self.path
+        # Only re-read the manifest when it has changed on disk
+        manifest_key = _stat_key(versions.MANIFEST_FILE)
+        if self._source is None or manifest_key != self._manifest_key:
+            self._manifest_key = manifest_key
+            return versions.get_head_path()
+        return self._source
+
+    def _load(self, source: Path):
+        rows = {}
+        if source.exists():
+            with open(source, 'r', encoding='utf-8') as f:
+                reader = csv.DictReader(f, delimiter='\t')
+                for row in reader:
+                    doc_id = row.get('doc_id')
+                    if doc_id:
+                        rows[doc_id] = row
+        else:
+            print(f"WARN: Act index source {source} does not exist", file=sys.stderr)
+        self._rows = rows
+        self._source = source
+        self._fingerprint = (source, _stat_key(source))
+
+    def refresh(self, force: bool = False):
+        """Rebuilds the index if the source changed (or unconditionally with force)."""
+        now = time.monotonic()
+        if not force and self._fingerprint is not None and now - self._last_check < CHECK_INTERVAL:
+            return
+        with self._lock:
+            source = self._resolve_source()
+            if force or self._fingerprint != (source, _stat_key(source)):
+                self._load(source)
+            self._last_check = now
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        self.refresh()
+        return self._rows.get(doc_id)
+
+    def rows(self):
+        """All indexed rows (TSV order)."""
+        self.refresh()
+        return list(self._rows.values())
+
+    def __contains__(self, doc_id: str) -> bool:
+        return self.get(doc_id) is not None
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._rows)
+
+
+_indexes: Dict[Optional[Path], ActIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_act_index(path: Optional[Path] = None) -> ActIndex:
+    """Returns the process-wide index for `path` (or the versioning HEAD if None)."""
+    key = Path(path).resolve() if path is not None else None
+    index = _indexes.get(key)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(key, ActIndex(key))
+    return index
+
+
+def _row_from_db(doc_id: str) -> Optional[dict]:
+    """Fallback lookup for acts added through the API but not (yet) in the TSV."""
+    from pylegislation.research.db import Session, engine, ActMetadata
+
+    try:
+        with Session(engine) as session:
+            act = session.get(ActMetadata, doc_id)
+    except Exception as e:
+        print(f"WARN: ActMetadata lookup failed for {doc_id}: {e}", file=sys.stderr)
+        return None
+    if not act:
+        return None
+    return {
+        "doc_type": act.doc_type,
+        "doc_id": act.doc_id,
+        "num": act.num,
+        "date_str": act.date_str,
+        "description": act.description,
+        "url_metadata": act.url_metadata or "",
+        "lang": act.lang,
+        "url_pdf": act.url_pdf or "",
+        "doc_number": act.doc_number or "",
+        "domain": act.domain or "",
+    }
+
+
+def lookup_act(doc_id: str, path: Optional[Path] = None) -> Optional[dict]:
+    """
+    O(1) lookup of an act's metadata row by doc_id.
+    Falls back to the ActMetadata table on a miss.
+    """
+    row = get_act_index(path).get(doc_id)
+    if row is None:
+        row = _row_from_db(doc_id)
+    return row
@@ -1,19 +1,26 @@
 import os
+import time
+from datetime import timedelta
 from pathlib import Path
+from typing import Optional
 
-import requests
 import sys
 from pypdf import PdfReader
 
+from pylegislation.research.gemini import generate_with_document
+from pylegislation.research.singleflight import SingleFlight, acquire_lease, keep_lease, lease_owner, release_lease
+
 
 def fetch_document(url: str, save_path: Path) -> Path:
     """Downloads a document (PDF/HTML) from a URL to the specified path."""
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    save_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(save_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+    from pylegislation.research.documents import get_http_session, resolve_url, REQUEST_TIMEOUT
+
+    with get_http_session().get(resolve_url(url), stream=True, timeout=REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(save_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                f.write(chunk)
     return save_path
 
 # Backward compatibility alias if needed, or just replace usage
@@ -27,30 +34,9 @@ def extract_text_fallback(pdf_path: Path) -> str:
         text += page.extract_text() + "\n"
     return text
 
-def analyze_base(doc_path: Path, api_key: str) -> dict:
-    """
-    Performs the base structural analysis (Summary, Sections, Entities).
-    Returns dict with 'text' (JSON string) and token metrics.
-    """
-    from google import genai
-    
+def build_base_prompt() -> str:
+    """Prompt for the base structural analysis JSON."""
     from pylegislation.research.categorize import DOMAIN_KEYWORDS
-
-    client = genai.Client(api_key=api_key)
-    
-    # Handle Content Type
-    if doc_path.suffix.lower() in ['.html', '.htm']:
-        # For HTML, we pass the text content directly to Gemini
-        # It handles raw HTML well.
-        # TODO: check this logic with practical examples
-        try:
-            content_part = doc_path.read_text(encoding='utf-8')
-        except UnicodeDecodeError:
-            print(f"Warning: UTF-8 decode failed for {doc_path}, retrying with latin-1", file=sys.stderr)
-            content_part = doc_path.read_text(encoding='latin-1', errors='replace')
-    else:
-        # Default to PDF File Upload
-        content_part = client.files.upload(file=doc_path)
     
     # improved prompt with categorization
     base_prompt = f"""
@@ -86,12 +72,48 @@ def analyze_base(doc_path: Path, api_key: str) -> dict:
     
     Ensure the output is pure JSON.
     """
+    return base_prompt
+
+def strip_code_fence(text: str) -> str:
+    """Removes a ```json ... ``` wrapper around model output."""
+    text = text.strip()
+    if text.startswith("```"):
+        import re
+        text = re.sub(r"^```[a-zA-Z]*\s+", "", text)
+        text = re.sub(r"\s+```$", "", text)
+    return text
+
+def usage_tokens(response) -> tuple:
+    """(input_tokens, output_tokens) from a Gemini response."""
+    if not response.usage_metadata:
+        return 0, 0
+    return (response.usage_metadata.prompt_token_count or 0,
+            response.usage_metadata.candidates_token_count or 0)
+
+def analyze_base(doc_path: Path, api_key: str, chunked: Optional[bool] = None) -> dict:
+    """
+    Performs the base structural analysis (Summary, Sections, Entities).
+    Returns dict with 'text' (JSON string) and token metrics.
+
+    Long documents are analyzed in parallel chunks and merged (see
+    chunked.py); chunked=None decides automatically from the document size.
+    """
+    from pylegislation.research.chunked import analyze_chunked, should_chunk
+
+    if chunked is None:
+        chunked = should_chunk(doc_path)
+    if chunked:
+        return analyze_chunked(doc_path, api_key)
+
+    base_prompt = build_base_prompt()
     
     from google.genai import types
     
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=[content_part, base_prompt],
+    # Client and uploaded file are cached per API key / document hash
+    response, upload_cache_hit = generate_with_document(
+        api_key,
+        doc_path,
+        base_prompt,
         config=types.GenerateContentConfig(
             response_mime_type="application/json",
             response_schema=None, 
@@ -99,23 +121,15 @@ def analyze_base(doc_path: Path, api_key: str) -> dict:
         )
     )
     
-    text = response.text.strip()
-    if text.startswith("```"):
-        import re
-        text = re.sub(r"^```[a-zA-Z]*\s+", "", text)
-        text = re.sub(r"\s+```$", "", text)
-    
-    input_tokens = 0
-    output_tokens = 0
-    if response.usage_metadata:
-        input_tokens = response.usage_metadata.prompt_token_count or 0
-        output_tokens = response.usage_metadata.candidates_token_count or 0
+    text = strip_code_fence(response.text)
+    input_tokens, output_tokens = usage_tokens(response)
         
     return {
         "text": text,
         "input_tokens": input_tokens,
         "output_tokens": output_tokens,
-        "model": "gemini-2.0-flash"
+        "model": "gemini-2.0-flash",
+        "upload_cache_hit": upload_cache_hit
     }
 
 def analyze_custom(doc_path: Path, api_key: str, custom_prompt: str) -> dict:
@@ -123,19 +137,6 @@ def analyze_custom(doc_path: Path, api_key: str, custom_prompt: str) -> dict:
     Performs a specific user query analysis.
     Returns dict with 'answer' (string) and token metrics.
     """
-    from google import genai
-    
-    client = genai.Client(api_key=api_key)
-    
-    if doc_path.suffix.lower() in ['.html', '.htm']:
-        try:
-            content_part = doc_path.read_text(encoding='utf-8')
-        except UnicodeDecodeError:
-            print(f"Warning: UTF-8 decode failed for {doc_path}, retrying with latin-1", file=sys.stderr)
-            content_part = doc_path.read_text(encoding='latin-1', errors='replace')
-    else:
-        content_part = client.files.upload(file=doc_path)
-    
     prompt = f"""
     You are legally analyzing this document.
     The user has a specific question/instruction: "{custom_prompt}"
@@ -143,10 +144,7 @@ def analyze_custom(doc_path: Path, api_key: str, custom_prompt: str) -> dict:
     Provide a direct, detailed answer based strictly on the document content.
     """
     
-    response = client.models.generate_content(
-        model="gemini-2.0-flash",
-        contents=[content_part, prompt]
-    )
+    response, upload_cache_hit = generate_with_document(api_key, doc_path, prompt)
     
     input_tokens = 0
     output_tokens = 0
@@ -157,166 +155,437 @@ def analyze_custom(doc_path: Path, api_key: str, custom_prompt: str) -> dict:
     return {
         "answer": response.text.strip(),
         "input_tokens": input_tokens,
-        "output_tokens": output_tokens
+        "output_tokens": output_tokens,
+        "upload_cache_hit": upload_cache_hit
     }
 
-def analyze_act_by_id(doc_id: str, api_key: str, data_path: Path, project_root: Path, custom_prompt: str = None, force_refresh: bool = False, fetch_only: bool = False) -> dict:
+def repair_json(json_str: str) -> str:
+    """Attempts to repair truncated JSON by closing brackets."""
+    json_str = json_str.strip()
+    # Simple heuristic: count brackets
+    open_braces = json_str.count('{') - json_str.count('}')
+    open_brackets = json_str.count('[') - json_str.count(']')
+    
+    # This is a naive repair, but handles simple truncation
+    # Reverse order of closing ideally, but for now just appending might work for simple cases.
+    # A better way is to check the last char.
+    return json_str + ("}" * open_braces) + ("]" * open_brackets)
+
+def load_cached_analysis(doc_id: str) -> Optional[dict]:
+    """Returns {'text', 'model'} for a valid cached base analysis, else None."""
+    import json
+    import zlib
+    from pylegislation.research.db import engine
+    from pylegislation.research.blobs import CACHED_ANALYSIS_SQL, decode_blob
+
+    # Plain connection + prebuilt statement: this runs on every /analyze
+    with engine.connect() as conn:
+        cached = conn.execute(CACHED_ANALYSIS_SQL, {"doc_id": doc_id}).first()
+    if not cached:
+        return None
+    model, codec, data = cached
+    # Validate Cache Integrity
+    try:
+        content_json = decode_blob(codec, data)
+        if not content_json:
+            return None
+        json.loads(content_json)
+    except (ValueError, zlib.error):
+        print(f"WARN: Cached analysis for {doc_id} is corrupted. Forcing re-analysis.", file=sys.stderr)
+        return None
+    return {"text": content_json, "model": model}
+
+def validate_analysis_json(base_json_str: str) -> str:
+    """Returns the analysis JSON string, repaired if truncated. Raises ValueError if unusable."""
+    import json
+
+    try:
+        json.loads(base_json_str)
+        return base_json_str
+    except json.JSONDecodeError as e:
+        print(f"WARN: JSON parse failed: {e}", file=sys.stderr)
+        print("INFO: Attempting to auto-repair JSON...", file=sys.stderr)
+        
+        repaired_str = repair_json(base_json_str)
+        try:
+            json.loads(repaired_str)
+            print("INFO: JSON repaired successfully.", file=sys.stderr)
+            return repaired_str
+        except json.JSONDecodeError as repair_e:
+            print(f"ERROR: Auto-repair failed: {repair_e}", file=sys.stderr)
+            raise ValueError(f"Generated analysis is corrupted and repair failed: {e}")
+
+def save_base_analysis(doc_id: str, model_used: str, base_json_str: str, force_refresh: bool = False):
+    """Upserts the ActAnalysis cache row and records the base analysis in history."""
+    from pylegislation.research.db import Session, engine, ActAnalysis, AnalysisHistory
+    from pylegislation.research.blobs import put_text
+    from pylegislation.research.search import index_analyses
+    from pylegislation.research.structured import index_structured
+    from pylegislation.research.citations import index_citations
+
+    with Session(engine) as session:
+        # Cache and history share one stored copy of the JSON
+        content_sha256 = put_text(session, base_json_str)
+        new_record = ActAnalysis(
+            doc_id=doc_id,
+            model=model_used,
+            content_sha256=content_sha256
+        )
+        session.merge(new_record)  # Use merge for upsert
+        
+        # Save Base Analysis to History as well
+        base_history = AnalysisHistory(
+            doc_id=doc_id,
+            prompt="Base Analysis (Refresh)" if force_refresh else "Base Analysis",
+            response_sha256=content_sha256,
+            model=model_used
+        )
+        session.add(base_history)
+        session.flush()
+        index_analyses(session.connection(), [doc_id])
+        index_structured(session.connection(), [doc_id])
+        index_citations(session.connection(), [doc_id])
+        session.commit()
+
+def run_base_analysis(doc_id: str, doc_path: Path, api_key: str, force_refresh: bool = False) -> dict:
     """
-    Analyzes an act by its ID, using caching for base structure.
+    Generates, validates (with repair) and saves the base analysis of an act.
+    Returns dict with 'text' (JSON string), token metrics and model.
     """
-    import csv
-    import json
-    from pylegislation.research.db import Session, engine, select, ActAnalysis, AnalysisHistory
-    
-    # ... (Keep existing path finding logic) ...
-    # Find Act Metadata
-    act_data = None
-    with open(data_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f, delimiter='\t')
-        for row in reader:
-            if row['doc_id'] == doc_id:
-                act_data = row
-                break
-    
+    # Run Base Analysis (Single Execution with Repair)
+    print(f"Running Base Analysis for {doc_id} (force_refresh={force_refresh})...", file=sys.stderr)
+    base_res = analyze_base(doc_path, api_key)
+    base_json_str = validate_analysis_json(base_res["text"])
+    model_used = base_res["model"]
+    save_base_analysis(doc_id, model_used, base_json_str, force_refresh)
+
+    return {
+        "text": base_json_str,
+        "input_tokens": base_res["input_tokens"],
+        "output_tokens": base_res["output_tokens"],
+        "model": model_used,
+        "upload_cache_hit": base_res.get("upload_cache_hit")
+    }
+
+# --- Single-flight for base analyses ---
+# Concurrent requests for the same (doc_id, force_refresh) share one
+# generation. With CROSS_PROCESS_LEASES an AnalysisLease row also
+# coordinates separate worker processes sharing research.db. The holder
+# renews its lease while the analysis runs; LEASE_TTL only bounds how long
+# a crashed holder blocks others.
+CROSS_PROCESS_LEASES = True
+LEASE_TTL = timedelta(minutes=10)
+LEASE_POLL_SECONDS = 1.0
+# How long a request waits for another process's analysis before failing
+LEASE_WAIT_TIMEOUT = timedelta(minutes=15)
+
+base_analysis_flights = SingleFlight()
+
+def _run_base_analysis_leased(doc_id: str, doc_path: Path, api_key: str, force_refresh: bool,
+                              run=run_base_analysis) -> dict:
+    if not CROSS_PROCESS_LEASES:
+        return run(doc_id, doc_path, api_key, force_refresh)
+
+    key = f"{doc_id}:{force_refresh}"
+    owner = lease_owner()
+    waited = False
+    deadline = time.monotonic() + LEASE_WAIT_TIMEOUT.total_seconds()
+    while not acquire_lease(key, owner, LEASE_TTL):
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Timed out waiting for another worker's analysis of {doc_id}")
+        waited = True
+        time.sleep(LEASE_POLL_SECONDS)
+    try:
+        if waited:
+            # Another process just produced this analysis; reuse it
+            cached = load_cached_analysis(doc_id)
+            if cached:
+                base_analysis_flights.record_coalesced()
+                return {**cached, "input_tokens": 0, "output_tokens": 0, "shared": True}
+        with keep_lease(key, owner, LEASE_TTL):
+            return run(doc_id, doc_path, api_key, force_refresh)
+    finally:
+        release_lease(key, owner)
+
+def resolve_document(doc_id: str, data_path: Optional[Path], project_root: Path) -> Path:
+    """Local path of an act's document, fetched through the shared document store."""
+    from pylegislation.research.act_index import lookup_act
+    from pylegislation.research.documents import get_document_store, infer_suffix, resolve_url
+
+    # Find Act Metadata (in-memory index; data_path=None follows the versioning HEAD)
+    act_data = lookup_act(doc_id, data_path)
+
     if not act_data:
-        raise ValueError(f"Act with ID {doc_id} not found in {data_path}")
+        raise ValueError(f"Act with ID {doc_id} not found in {data_path or 'HEAD'}")
 
     # Determine Document URL and Type
     url_source = act_data['url_pdf']
     if not url_source:
         raise ValueError(f"No source URL found for act {doc_id}")
 
-    # Infer extension
-    is_html = url_source.lower().endswith('.html') or url_source.lower().endswith('.htm')
-    ext = '.html' if is_html else '.pdf'
+    # Resolve the document through the shared content-addressed store
+    store = get_document_store()
+    url_source = resolve_url(url_source)
+    if not store.lookup(doc_id):
+        # Seed the store from a legacy web/public/pdfs copy if one exists
+        legacy_path = project_root / 'web/public/pdfs' / f"{doc_id}{infer_suffix(url_source)}"
+        if legacy_path.exists():
+            store.put_file(doc_id, legacy_path, url_source)
+        else:
+            print(f"Downloading Document from {url_source}...", file=sys.stderr)
+    return store.fetch(doc_id, url_source)
 
-    pdf_dir = project_root / 'web/public/pdfs'
-    pdf_dir.mkdir(parents=True, exist_ok=True)
-    doc_path = pdf_dir / f"{doc_id}{ext}"
-    
-    if not doc_path.exists():
-        print(f"Downloading Document from {url_source}...", file=sys.stderr)
-        if url_source.startswith('/'):
-             base_domain = "https://documents.gov.lk"
-             url_source = base_domain + url_source
-        fetch_document(url_source, doc_path)
+def run_custom_analysis(doc_id: str, doc_path: Path, api_key: str, custom_prompt: str) -> dict:
+    """Answers a custom prompt about an act and records it in AnalysisHistory."""
+    from pylegislation.research.db import Session, engine, AnalysisHistory
+    from pylegislation.research.blobs import put_text
+
+    print(f"Running Custom Analysis for {doc_id}...", file=sys.stderr)
+    custom_res = analyze_custom(doc_path, api_key, custom_prompt)
+
+    # Save History
+    with Session(engine) as session:
+        history_record = AnalysisHistory(
+            doc_id=doc_id,
+            prompt=custom_prompt,
+            response_sha256=put_text(session, custom_res["answer"]),
+            model="gemini-2.0-flash"
+        )
+        session.add(history_record)
+        session.commit()
+    return custom_res
+
+def analyze_act_by_id(doc_id: str, api_key: str, data_path: Optional[Path], project_root: Path, custom_prompt: str = None, force_refresh: bool = False, fetch_only: bool = False) -> dict:
+    """
+    Analyzes an act by its ID, using caching for base structure.
+    """
+    import json
+
+    doc_path = resolve_document(doc_id, data_path, project_root)
     
     # --- Caching Logic ---
     base_json_str = None
     input_tokens = 0
     output_tokens = 0
     model_used = "cached"
-    data = None
+    # Gemini upload reuse for this request (PDF uploads only)
+    upload_hits = 0
+    upload_misses = 0
+
+    def count_upload(cache_hit: Optional[bool]):
+        nonlocal upload_hits, upload_misses
+        if cache_hit is True:
+            upload_hits += 1
+        elif cache_hit is False:
+            upload_misses += 1
 
     if not force_refresh:
-        with Session(engine) as session:
-            cached = session.get(ActAnalysis, doc_id)
-            if cached:
-                base_json_str = cached.content_json
-                model_used = cached.model
-
-                # Validate Cache Integrity
-                if base_json_str:
-                    try:
-                        json.loads(base_json_str)
-                    except json.JSONDecodeError:
-                        print(f"WARN: Cached analysis for {doc_id} is corrupted. Forcing re-analysis.", file=sys.stderr)
-                        base_json_str = None
-    
-    # Validating/Healing JSON logic
-    def repair_json(json_str: str) -> str:
-        """Attempts to repair truncated JSON by closing brackets."""
-        json_str = json_str.strip()
-        # Simple heuristic: count brackets
-        open_braces = json_str.count('{') - json_str.count('}')
-        open_brackets = json_str.count('[') - json_str.count(']')
-        
-        # This is a naive repair, but handles simple truncation
-        # Reverse order of closing ideally, but for now just appending might work for simple cases.
-        # A better way is to check the last char.
-        return json_str + ("}" * open_braces) + ("]" * open_brackets)
+        cached = load_cached_analysis(doc_id)
+        if cached:
+            base_json_str = cached["text"]
+            model_used = cached["model"]
 
     if not base_json_str:
         if fetch_only:
             return None
 
-        # Run Base Analysis (Single Execution with Repair)
-        print(f"Running Base Analysis for {doc_id} (force_refresh={force_refresh})...", file=sys.stderr)
-        base_res = analyze_base(doc_path, api_key)
+        base_res, shared = base_analysis_flights.do(
+            f"{doc_id}:{force_refresh}",
+            _run_base_analysis_leased, doc_id, doc_path, api_key, force_refresh
+        )
         base_json_str = base_res["text"]
-        input_tokens += base_res["input_tokens"]
-        output_tokens += base_res["output_tokens"]
         model_used = base_res["model"]
-        
-        # Validate and Repair JSON
-        try:
-            data = json.loads(base_json_str)
-        except json.JSONDecodeError as e:
-            print(f"WARN: JSON parse failed: {e}", file=sys.stderr)
-            print("INFO: Attempting to auto-repair JSON...", file=sys.stderr)
-            
-            repaired_str = repair_json(base_json_str)
-            try:
-                data = json.loads(repaired_str)
-                base_json_str = repaired_str
-                print("INFO: JSON repaired successfully.", file=sys.stderr)
-            except json.JSONDecodeError as repair_e:
-                print(f"ERROR: Auto-repair failed: {repair_e}", file=sys.stderr)
-                raise ValueError(f"Generated analysis is corrupted and repair failed: {e}")
-
-        # Save to DB
-        with Session(engine) as session:
-            new_record = ActAnalysis(
-                doc_id=doc_id,
-                model=model_used,
-                content_json=base_json_str
-            )
-            session.merge(new_record)  # Use merge for upsert
-            session.commit()
+        if not shared and not base_res.get("shared"):
+            # Only the leader pays for (and reports) the generation
+            input_tokens += base_res["input_tokens"]
+            output_tokens += base_res["output_tokens"]
+            count_upload(base_res.get("upload_cache_hit"))
             
-            # Save Base Analysis to History as well
-            base_history = AnalysisHistory(
-                doc_id=doc_id,
-                prompt="Base Analysis (Refresh)" if force_refresh else "Base Analysis",
-                response=base_json_str,
-                model=model_used
-            )
-            session.add(base_history)
-            session.commit()
-            
-    # Parse Base Data (already parsed above if new, or here if cached)
-    if not data:
-        data = json.loads(base_json_str)
+    # Parse Base Data (per caller; followers must not share a mutable dict)
+    data = json.loads(base_json_str)
 
     # Handle Custom Prompt
     if custom_prompt:
-        print(f"Running Custom Analysis for {doc_id}...", file=sys.stderr)
-        custom_res = analyze_custom(doc_path, api_key, custom_prompt)
+        custom_res = run_custom_analysis(doc_id, doc_path, api_key, custom_prompt)
         data["custom_analysis"] = custom_res["answer"]
         data["custom_prompt"] = custom_prompt
         input_tokens += custom_res["input_tokens"]
         output_tokens += custom_res["output_tokens"]
+        count_upload(custom_res.get("upload_cache_hit"))
         model_used = "gemini-2.0-flash" # We definitely used it if custom prompt
-        
-        # Save History
-        with Session(engine) as session:
-            history_record = AnalysisHistory(
-                doc_id=doc_id,
-                prompt=custom_prompt,
-                response=custom_res["answer"],
-                model=model_used
-            )
-            session.add(history_record)
-            session.commit()
     else:
         # Ensure custom_analysis key exists even if null
         data["custom_analysis"] = None
         data["custom_prompt"] = None
 
+    from pylegislation.research.blobs import text_sha256
+
     return {
         "text": json.dumps(data),
         "input_tokens": input_tokens,
         "output_tokens": output_tokens,
-        "model": model_used
+        "model": model_used,
+        "upload_cache_hits": upload_hits,
+        "upload_cache_misses": upload_misses,
+        # Blobs the base analysis and the custom answer are stored under
+        "content_sha256": text_sha256(base_json_str),
+        "answer_sha256": text_sha256(data["custom_analysis"]) if custom_prompt else None
+    }
+
+
+# --- Streaming analysis ---
+# Top-level fields of the base analysis that are streamed as they complete
+STREAM_FIELDS = {"summary": "summary"}
+STREAM_ITEMS = {"sections": "section"}
+
+def stream_base_analysis(doc_id: str, doc_path: Path, api_key: str, force_refresh: bool = False,
+                         on_event=None) -> dict:
+    """
+    Like run_base_analysis, but generates with a streaming call and reports
+    the summary and each completed section through on_event(name, value)
+    as soon as it parses. The final document is validated and saved as usual.
+    """
+    from google.genai import types
+    from pylegislation.research.gemini import stream_with_document, MODEL
+    from pylegislation.research.stream_json import IncrementalJSONScanner
+
+    print(f"Streaming Base Analysis for {doc_id} (force_refresh={force_refresh})...", file=sys.stderr)
+    scanner = IncrementalJSONScanner()
+    pieces = []
+    input_tokens = output_tokens = 0
+    upload_cache_hit = None
+    for chunk, upload_cache_hit in stream_with_document(
+        api_key,
+        doc_path,
+        build_base_prompt(),
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            max_output_tokens=65536,
+        )
+    ):
+        text = chunk.text or ""
+        pieces.append(text)
+        if chunk.usage_metadata:
+            # Usage is cumulative; the last chunk carries the totals
+            input_tokens, output_tokens = usage_tokens(chunk)
+        if on_event is None:
+            continue
+        for kind, key, value in scanner.feed(text):
+            if kind == "field" and key in STREAM_FIELDS:
+                on_event(STREAM_FIELDS[key], value)
+            elif kind == "item" and key in STREAM_ITEMS:
+                on_event(STREAM_ITEMS[key], value)
+
+    base_json_str = validate_analysis_json(strip_code_fence("".join(pieces)))
+    save_base_analysis(doc_id, MODEL, base_json_str, force_refresh)
+    return {
+        "text": base_json_str,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "model": MODEL,
+        "upload_cache_hit": upload_cache_hit
     }
 
+def _replay_events(data: dict):
+    """Events for an analysis that was not streamed (cached, chunked or shared)."""
+    for key, name in STREAM_FIELDS.items():
+        if key in data:
+            yield {"event": name, "data": data[key]}
+    for key, name in STREAM_ITEMS.items():
+        for item in data.get(key) or []:
+            yield {"event": name, "data": item}
+
+def stream_act_analysis(doc_id: str, api_key: str, project_root: Path, custom_prompt: str = None,
+                        force_refresh: bool = False):
+    """
+    Generator of analysis events for an act: 'summary' and one 'section' per
+    section as soon as they are available, 'custom_analysis' if a custom
+    prompt was given, then 'done' with the same document /analyze returns
+    (or 'error'). Cached, chunked and coalesced analyses are replayed from
+    the final document. Telemetry is recorded as for queued jobs.
+    """
+    import json
+    import queue
+    import threading
+    from functools import partial
+    from pylegislation.research.chunked import should_chunk
+    from pylegislation.research.telemetry import estimate_cost, record_telemetry
+
+    start_time = time.time()
+    input_tokens = output_tokens = upload_hits = upload_misses = 0
+    model_used = "cached"
+    try:
+        doc_path = resolve_document(doc_id, None, project_root)
+        cached = None if force_refresh else load_cached_analysis(doc_id)
+        if cached:
+            data = json.loads(cached["text"])
+            model_used = cached["model"]
+            yield from _replay_events(data)
+        else:
+            events = queue.Queue()
+            streamed = False
+
+            def generate():
+                try:
+                    if should_chunk(doc_path):
+                        run = run_base_analysis
+                    else:
+                        run = partial(stream_base_analysis, on_event=lambda name, value: events.put(("event", name, value)))
+                    result, shared = base_analysis_flights.do(
+                        f"{doc_id}:{force_refresh}",
+                        _run_base_analysis_leased, doc_id, doc_path, api_key, force_refresh, run
+                    )
+                    events.put(("result", result, shared))
+                except Exception as e:
+                    events.put(("error", e, None))
+
+            threading.Thread(target=generate, name=f"stream-{doc_id}", daemon=True).start()
+            while True:
+                kind, value, extra = events.get()
+                if kind == "event":
+                    streamed = True
+                    yield {"event": value, "data": extra}
+                elif kind == "error":
+                    raise value
+                else:
+                    base_res, shared = value, extra
+                    break
+
+            data = json.loads(base_res["text"])
+            model_used = base_res["model"]
+            if not shared and not base_res.get("shared"):
+                input_tokens += base_res["input_tokens"]
+                output_tokens += base_res["output_tokens"]
+                if base_res.get("upload_cache_hit") is True:
+                    upload_hits += 1
+                elif base_res.get("upload_cache_hit") is False:
+                    upload_misses += 1
+            if not streamed:
+                yield from _replay_events(data)
+
+        if custom_prompt:
+            custom_res = run_custom_analysis(doc_id, doc_path, api_key, custom_prompt)
+            data["custom_analysis"] = custom_res["answer"]
+            data["custom_prompt"] = custom_prompt
+            input_tokens += custom_res["input_tokens"]
+            output_tokens += custom_res["output_tokens"]
+            if custom_res.get("upload_cache_hit") is True:
+                upload_hits += 1
+            elif custom_res.get("upload_cache_hit") is False:
+                upload_misses += 1
+            model_used = "gemini-2.0-flash"
+            yield {"event": "custom_analysis", "data": custom_res["answer"]}
+        else:
+            data["custom_analysis"] = None
+            data["custom_prompt"] = None
+    except Exception as e:
+        print(f"ERROR: Streaming analysis of {doc_id} failed: {e}", file=sys.stderr)
+        record_telemetry(doc_id, "failed", 0, 0, int((time.time() - start_time) * 1000), "FAIL")
+        yield {"event": "error", "data": {"detail": str(e)}}
+        return
+
+    record_telemetry(
+        doc_id, model_used, input_tokens, output_tokens, int((time.time() - start_time) * 1000), "SUCCESS",
+        estimate_cost(input_tokens, output_tokens), upload_hits, upload_misses
+    )
+    yield {"event": "done", "data": data}
@@ -1,39 +1,73 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from pathlib import Path
 import os
 import sys
-import time
 import json
+import re
+import asyncio
+import base64
+import gzip
+import hashlib
 from datetime import datetime, timedelta
 from typing import List, Optional
 
 # Ensure ldf is in path
 sys.path.append(str(Path(__file__).parents[3]))
 
-import requests
+from fastapi import Response
 from fastapi.responses import StreamingResponse
 
-from pylegislation.research.analyze import analyze_act_by_id
+from pylegislation.research.analyze import base_analysis_flights, stream_act_analysis
+from pylegislation.research.jobs import AnalysisJobQueue, cached_analysis, job_to_dict, TERMINAL_STATUSES
 from pylegislation.utils import find_project_root
-from pylegislation.research.db import create_db_and_tables, TelemetryLog, ActMetadata, ActAnalysis, engine
-from pylegislation.research.dump import restore_from_latest_dump
+from pylegislation.research.db import create_db_and_tables, TelemetryLog, TelemetryRollup, ActMetadata, ActAnalysis, AnalysisOutline, engine
+from pylegislation.research.dump import background_restore, restore_from_latest_dump
+from pylegislation.research.documents import get_document_store, get_http_session, fill_in_background, infer_suffix, resolve_url, REQUEST_TIMEOUT
 from pylegislation.research.versions import get_head_path
+from pylegislation.research.title_index import get_title_index
+from pylegislation.research.telemetry import latency_percentile, telemetry_sink, LATENCY_BUCKETS_MS
+from pylegislation.research.search import search_acts, SEARCH_KINDS, DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT, MAX_LIMIT as MAX_SEARCH_LIMIT
+from pylegislation.research import structured
+from pylegislation.research.citations import get_citations, get_cited_by, resolve_new_acts
+from pylegislation.research import lineage_graph
 from sqlmodel import Session, select, func
-import difflib
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
 import csv
 
+# How the lifespan restores reports/database/dump: "background" (serve while
+# restoring), "sync" (restore before serving) or "off". Dumps already
+# restored into this database are skipped either way.
+STARTUP_RESTORE = os.environ.get("RESEARCH_STARTUP_RESTORE", "background")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
+    telemetry_sink.start()
+    job_queue.recover_interrupted()
+    job_queue.prune_finished()
     # Attempt to restore from latest dump if available
+    if STARTUP_RESTORE == "background":
+        background_restore.start()
+    elif STARTUP_RESTORE == "sync":
+        try:
+            restore_from_latest_dump()
+        except Exception as e:
+            print(f"Startup restoration failed: {e}", file=sys.stderr)
     try:
-        restore_from_latest_dump()
+        lineage_graph.lineage_graphs.load()
     except Exception as e:
-        print(f"Startup restoration failed: {e}", file=sys.stderr)
+        print(f"Lineage graph load failed: {e}", file=sys.stderr)
     yield
+    # An unfinished restore is rolled back; the next start picks it up again
+    background_restore.stop()
+    job_queue.shutdown()
+    # Write out queued telemetry before exit
+    telemetry_sink.stop()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -47,6 +81,7 @@ app.add_middleware(
 )
 
 PROJECT_ROOT = find_project_root() or Path(os.getcwd())
+job_queue = AnalysisJobQueue(PROJECT_ROOT)
 
 class AnalyzeRequest(BaseModel):
     doc_id: str
@@ -67,128 +102,173 @@ class AnalyticsSummary(BaseModel):
     total_requests: int
     total_input_tokens: int
     total_output_tokens: int
+    failed_requests: int = 0
     avg_latency_ms: float
+    p50_latency_ms: float = 0.0
+    p95_latency_ms: float = 0.0
+    p99_latency_ms: float = 0.0
     total_cost_est: float
+    coalesced_requests: int = 0
+    analyses_in_flight: int = 0
+    upload_cache_hits: int = 0
+    upload_cache_misses: int = 0
+    upload_cache_hit_rate: float = 0.0
+    telemetry_backlog: int = 0
+    telemetry_dropped: int = 0
+    range: dict = {}
+    daily: List[dict] = []
     logs: List[dict]
 
 @app.get("/")
 def read_root():
-    return {"status": "ok", "service": "pylegislation-backend"}
+    return {"status": "ok", "service": "pylegislation-backend", "restore": background_restore.status}
 
 @app.post("/analyze")
 async def analyze(request: AnalyzeRequest):
-    start_time = time.time()
+    if not request.custom_prompt and (request.fetch_only or not request.force_refresh):
+        # Cache reads (the act page sends a fetch_only lookup on every load)
+        # are answered here: no job row and no wait behind running generations
+        cached = None if request.force_refresh else await run_in_threadpool(cached_analysis, request.doc_id)
+        if cached is not None:
+            return cached
+        if request.fetch_only:
+            return {"status": "not_found", "detail": "Analysis not found in cache"}
+
+    # Model calls run on the job pool; awaiting the future keeps the event loop free
+    job, future = job_queue.submit(
+        request.doc_id,
+        request.api_key,
+        request.custom_prompt,
+        request.force_refresh,
+        request.fetch_only
+    )
     try:
-        # Determine paths
-        # Ideally finding the TSV dynamically or using a standard location
-        head_path = PROJECT_ROOT / 'reports/research/archive/docs_en_with_domain.tsv'
-        if not head_path.exists():
-            # Fallback for dev environment or if path differs in Docker
-            head_path = PROJECT_ROOT / 'reports/research/archive/docs_en.tsv'
-        
-        # Analyze
-        result_dict = analyze_act_by_id(
-            request.doc_id, 
-            request.api_key, 
-            head_path, 
-            PROJECT_ROOT, 
-            request.custom_prompt, 
-            request.force_refresh,
-            request.fetch_only
-        )
-        
-        if result_dict is None:
-             # fetch_only was True and no cache found
-             return {"status": "not_found", "detail": "Analysis not found in cache"}
-        
-        # Parse result text
-        text_content = result_dict.get("text", "")
-        try:
-            parsed_content = json.loads(text_content)
-        except json.JSONDecodeError:
-            print(f"DEBUG raw result: {text_content!r}", file=sys.stderr)
-            raise
-            
-        # Log Telemetry
-        latency_ms = int((time.time() - start_time) * 1000)
-        
-        # Estimate Cost (Gemini 2.0 Flash pricing - example)
-        # Input: $0.10 / 1M tokens
-        # Output: $0.40 / 1M tokens
-        input_tokens = result_dict.get("input_tokens", 0)
-        output_tokens = result_dict.get("output_tokens", 0)
-        cost = (input_tokens * 0.10 / 1_000_000) + (output_tokens * 0.40 / 1_000_000)
-        
-        with Session(engine) as session:
-            log = TelemetryLog(
-                doc_id=request.doc_id,
-                model=result_dict.get("model", "unknown"),
-                input_tokens=input_tokens,
-                output_tokens=output_tokens,
-                latency_ms=latency_ms,
-                status="SUCCESS",
-                cost_usd=cost
-            )
-            session.add(log)
-            session.commit()
-            
-        return parsed_content
-        
+        result_dict = await asyncio.wrap_future(future)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        
-        # Log Failure
-        try:
-            latency_ms = int((time.time() - start_time) * 1000)
-            with Session(engine) as session:
-                log = TelemetryLog(
-                    doc_id=request.doc_id,
-                    model="failed",
-                    input_tokens=0,
-                    output_tokens=0,
-                    latency_ms=latency_ms,
-                    status="FAIL"
-                )
-                session.add(log)
-                session.commit()
-        except:
-            pass 
-            
         raise HTTPException(status_code=500, detail=str(e))
 
+    if result_dict is None:
+        # fetch_only was True and no cache found
+        return {"status": "not_found", "detail": "Analysis not found in cache"}
+
+    text_content = result_dict.get("text", "")
+    try:
+        return json.loads(text_content)
+    except json.JSONDecodeError:
+        print(f"DEBUG raw result: {text_content!r}", file=sys.stderr)
+        raise HTTPException(status_code=500, detail="Analysis result is not valid JSON")
+
+@app.post("/analyze/stream")
+def analyze_stream(request: AnalyzeRequest, format: str = "sse"):
+    """
+    Streaming /analyze: emits 'summary' and each 'section' as the model
+    generates them, then 'done' with the full analysis (or 'error').
+    format=sse (text/event-stream) or format=ndjson (one JSON event per line).
+    """
+    if format not in ("sse", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'sse' or 'ndjson'")
+
+    events = stream_act_analysis(
+        request.doc_id,
+        request.api_key,
+        PROJECT_ROOT,
+        request.custom_prompt,
+        request.force_refresh
+    )
+
+    def body():
+        # Sync generator; Starlette iterates it in a worker thread
+        for event in events:
+            if format == "ndjson":
+                yield json.dumps(event) + "\n"
+            else:
+                yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/event-stream"
+    return StreamingResponse(body(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.post("/analyze/jobs", status_code=202)
+def submit_analysis_job(request: AnalyzeRequest):
+    """Queue an analysis and return its job id for polling / streaming."""
+    job, _ = job_queue.submit(
+        request.doc_id,
+        request.api_key,
+        request.custom_prompt,
+        request.force_refresh,
+        request.fetch_only
+    )
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/analyze/jobs/{job_id}")
+def get_analysis_job(job_id: str):
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(job)
+
+JOB_EVENTS_POLL_SECONDS = 1.0
+
+@app.get("/analyze/jobs/{job_id}/events")
+async def stream_analysis_job(job_id: str):
+    """Server-Sent Events: one 'status' event per state change, then 'done'."""
+    if not job_queue.get(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last_status = None
+        while True:
+            job = await run_in_threadpool(job_queue.get, job_id)
+            if job.status != last_status:
+                last_status = job.status
+                payload = await run_in_threadpool(job_to_dict, job)
+                if job.status in TERMINAL_STATUSES:
+                    yield f"event: done\ndata: {json.dumps(payload)}\n\n"
+                    return
+                yield f"event: status\ndata: {json.dumps(payload)}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            future = job_queue.future(job_id)
+            if future is not None:
+                # Wake up as soon as the local worker finishes
+                await asyncio.wait([asyncio.wrap_future(future)], timeout=JOB_EVENTS_POLL_SECONDS)
+            else:
+                await asyncio.sleep(JOB_EVENTS_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
 @app.post("/acts/check-duplicate")
 def check_duplicate(act: ActCreate):
-    with Session(engine) as session:
-        # Check exact match on doc_id if provided
-        if act.doc_id:
+    # Check exact match on doc_id if provided
+    if act.doc_id:
+        with Session(engine) as session:
             existing = session.get(ActMetadata, act.doc_id)
-            if existing:
-                 return [{"title": existing.description, "doc_id": existing.doc_id, "score": 1.0}]
+        if existing:
+            return [{"title": existing.description, "doc_id": existing.doc_id, "score": 1.0}]
 
-        # Fuzzy match on description
-        all_acts = session.exec(select(ActMetadata)).all()
-        titles = [a.description for a in all_acts]
-        
-        # difflib.get_close_matches returns exact matches too
-        matches = difflib.get_close_matches(act.title, titles, n=5, cutoff=0.6)
-        
-        results = []
-        for match in matches:
-             # Find the act (inefficient but safe for now)
-             found = next((a for a in all_acts if a.description == match), None)
-             if found:
-                 ratio = difflib.SequenceMatcher(None, act.title, found.description).ratio()
-                 results.append({
-                     "title": found.description,
-                     "doc_id": found.doc_id,
-                     "score": ratio
-                 })
-        
-        return results
+    # Fuzzy match on description (cached trigram index, SequenceMatcher scores)
+    return get_title_index(engine).query(act.title)
 
-@app.post("/acts/add")
-def add_act(act: ActCreate):
+@app.post("/acts/check-duplicate/batch")
+def check_duplicates_batch(acts: List[ActCreate]):
+    """
+    Duplicate check for a whole upload in one pass. Each entry lists matches
+    against existing acts and against earlier rows of the same upload.
+    """
+    index = get_title_index(engine)
+    existing_ids = set()
+    doc_ids = [act.doc_id for act in acts if act.doc_id]
+    if doc_ids:
+        with Session(engine) as session:
+            existing_ids = set(session.exec(select(ActMetadata.doc_id).where(ActMetadata.doc_id.in_(doc_ids))).all())
+
+    results = []
+    for act, matches in zip(acts, index.query_many([act.title for act in acts])):
+        if act.doc_id in existing_ids:
+            matches = [{"title": act.title, "doc_id": act.doc_id, "score": 1.0}]
+        results.append({"title": act.title, "doc_id": act.doc_id, "matches": matches})
+    return results
+
+def _new_act_metadata(act: ActCreate) -> ActMetadata:
     # generate doc_id if not present
     if not act.doc_id:
         # Simple slug generation or existing pattern? 
@@ -198,49 +278,65 @@ def add_act(act: ActCreate):
         year = act.year or datetime.now().year
         act.doc_id = f"custom-{year}-{safe_title}"
 
+    return ActMetadata(
+        doc_id=act.doc_id,
+        doc_type=act.doc_type,
+        num=act.number or "",
+        date_str=str(act.year) if act.year else "",  # approximate
+        description=act.title,
+        url_metadata=None,
+        lang="en", # default
+        url_pdf=act.url_pdf,
+        doc_number=act.number,
+        domain="Custom",
+        year=str(act.year) if act.year else str(datetime.now().year)
+    )
+
+def _tsv_row(act: ActMetadata) -> list:
+    # We need to respect the TSV columns:
+    # doc_type, doc_id, num, date_str, description, url_metadata, lang, url_pdf, doc_number, domain
+    return [
+        act.doc_type,
+        act.doc_id,
+        act.num,
+        act.date_str,
+        act.description,
+        "", # url_metadata
+        act.lang,
+        act.url_pdf,
+        act.doc_number,
+        act.domain
+    ]
+
+def _append_tsv_rows(tsv_path: Path, rows: List[list]) -> int:
+    """Appends rows to the HEAD TSV in one buffered write. Returns the prior file size."""
+    with open(tsv_path, 'a', newline='', encoding='utf-8') as f:
+        offset = f.tell()
+        writer = csv.writer(f, delimiter='\t')
+        writer.writerows(rows)
+    return offset
+
+@app.post("/acts/add")
+def add_act(act: ActCreate):
+    new_act = _new_act_metadata(act)
+
     with Session(engine) as session:
         # Double check existence
-        if session.get(ActMetadata, act.doc_id):
-             raise HTTPException(status_code=400, detail=f"Act with ID {act.doc_id} already exists")
+        if session.get(ActMetadata, new_act.doc_id):
+             raise HTTPException(status_code=400, detail=f"Act with ID {new_act.doc_id} already exists")
         
-        new_act = ActMetadata(
-            doc_id=act.doc_id,
-            doc_type=act.doc_type,
-            num=act.number or "",
-            date_str=str(act.year) if act.year else "",  # approximate
-            description=act.title,
-            url_metadata=None,
-            lang="en", # default
-            url_pdf=act.url_pdf,
-            doc_number=act.number,
-            domain="Custom",
-            year=str(act.year) if act.year else str(datetime.now().year)
-        )
         session.add(new_act)
         session.commit()
         session.refresh(new_act)
+        get_title_index(engine).add(new_act.doc_id, new_act.description)
+        # References that named this act can resolve now
+        resolve_new_acts(engine)
 
         # Append to TSV
-        # We need to respect the TSV columns:
-        # doc_type, doc_id, num, date_str, description, url_metadata, lang, url_pdf, doc_number, domain
         tsv_path = get_head_path()
         try:
-             with open(tsv_path, 'a', newline='', encoding='utf-8') as f:
-                 writer = csv.writer(f, delimiter='\t')
-                 # Ensure we have all columns. 
-                 # Current HEAD TSV header check might be good, but assuming standard 10 cols for now as per view_file
-                 writer.writerow([
-                     new_act.doc_type,
-                     new_act.doc_id,
-                     new_act.num,
-                     new_act.date_str,
-                     new_act.description,
-                     "", # url_metadata
-                     new_act.lang,
-                     new_act.url_pdf,
-                     new_act.doc_number,
-                     new_act.domain
-                 ])
+             _append_tsv_rows(tsv_path, [_tsv_row(new_act)])
+             lineage_graph.lineage_graphs.expire()
         except Exception as e:
             print(f"Failed to append to TSV: {e}", file=sys.stderr)
             # FIXME: Issue #22 (https://github.com/LDFLK/research/issues/22) - Potential data inconsistency between DB and TSV.
@@ -250,24 +346,310 @@ def add_act(act: ActCreate):
 
         return new_act
 
+# SQLite limits bound parameters per statement; existence checks are chunked
+BATCH_LOOKUP_CHUNK = 500
+
 @app.post("/acts/batch")
 def add_acts_batch(acts: List[ActCreate]):
+    """
+    Bulk import: validates and dedupes the whole payload, inserts all new
+    acts in one transaction (executemany) and appends their TSV rows in one
+    write. The DB insert is only committed once the TSV append succeeded,
+    so a failure leaves neither side changed.
+
+    Returns {"added", "errors", "results"} with one outcome per input row
+    (status added / duplicate / exists / invalid / failed).
+    """
+    from sqlalchemy import insert
+
     results = []
-    errors = []
-    for act in acts:
-        try:
-            res = add_act(act)
-            results.append(res)
-        except Exception as e:
-            errors.append({"title": act.title, "error": str(e)})
-    
-    return {"added": len(results), "errors": errors}
+    pending = {}
+    for i, act in enumerate(acts):
+        outcome = {"index": i, "title": act.title, "doc_id": None, "status": "added", "error": None}
+        results.append(outcome)
+        if not act.title.strip() or not act.url_pdf.strip():
+            outcome.update(status="invalid", error="title and url_pdf are required")
+            continue
+        new_act = _new_act_metadata(act)
+        outcome["doc_id"] = new_act.doc_id
+        if new_act.doc_id in pending:
+            outcome.update(status="duplicate", error=f"Duplicate of row {pending[new_act.doc_id][0]} in this batch")
+            continue
+        pending[new_act.doc_id] = (i, new_act)
+
+    with Session(engine) as session:
+        doc_ids = list(pending)
+        existing = set()
+        for start in range(0, len(doc_ids), BATCH_LOOKUP_CHUNK):
+            chunk = doc_ids[start:start + BATCH_LOOKUP_CHUNK]
+            existing.update(session.exec(select(ActMetadata.doc_id).where(ActMetadata.doc_id.in_(chunk))).all())
+        for doc_id in existing:
+            i, _ = pending.pop(doc_id)
+            results[i].update(status="exists", error=f"Act with ID {doc_id} already exists")
+
+        new_acts = [new_act for _, new_act in pending.values()]
+        if new_acts:
+            tsv_path = get_head_path()
+            offset = None
+            try:
+                session.execute(insert(ActMetadata), [a.model_dump() for a in new_acts])
+                offset = _append_tsv_rows(tsv_path, [_tsv_row(a) for a in new_acts])
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                if offset is not None:
+                    # Commit failed after the TSV append; undo the appended rows
+                    with open(tsv_path, 'r+b') as f:
+                        f.truncate(offset)
+                print(f"Batch import failed, nothing was added: {e}", file=sys.stderr)
+                for i, _ in pending.values():
+                    results[i].update(status="failed", error=str(e))
+                new_acts = []
+
+            index = get_title_index(engine)
+            for new_act in new_acts:
+                index.add(new_act.doc_id, new_act.description)
+            if new_acts:
+                resolve_new_acts(engine)
+                lineage_graph.lineage_graphs.expire()
+
+    errors = [{"title": r["title"], "error": r["error"]} for r in results if r["status"] != "added"]
+    return {"added": len(results) - len(errors), "errors": errors, "results": results}
+
+ACT_FIELDS = list(ActMetadata.model_fields)
+ACT_FILTERS = ("domain", "year", "doc_type", "lang")
+MAX_PAGE_SIZE = 1000
+GZIP_MIN_BYTES = 1024
+
+def _encode_cursor(doc_id: str) -> str:
+    return base64.urlsafe_b64encode(doc_id.encode("utf-8")).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str) -> str:
+    try:
+        return base64.b64decode(cursor + "=" * (-len(cursor) % 4), altchars=b"-_", validate=True).decode("utf-8")
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _acts_version(session) -> tuple:
+    # Act rows are insert-only (add/batch/migrate), so count + max rowid
+    # changes whenever the catalogue does
+    return tuple(session.execute(text("SELECT count(*), max(rowid) FROM actmetadata")).one())
+
+def _db_last_modified() -> Optional[datetime]:
+    database = engine.url.database
+    if not database or database == ":memory:":
+        return None
+    mtimes = [os.path.getmtime(p) for p in (database, f"{database}-wal") if os.path.exists(p)]
+    return datetime.utcfromtimestamp(int(max(mtimes))) if mtimes else None
+
+def _cached_json_response(request: Request, payload, etag: str, headers: Optional[dict] = None,
+                          db_last_modified: bool = True) -> Response:
+    """
+    JSON response with ETag/Last-Modified validators and gzip when accepted.
+    Last-Modified is research.db's mtime; pass db_last_modified=False for
+    payloads that do not come from the database.
+    """
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding", **(headers or {})}
+    last_modified = _db_last_modified() if db_last_modified else None
+    if last_modified:
+        headers["Last-Modified"] = last_modified.strftime("%a, %d %b %Y %H:%M:%S GMT")
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    if len(body) >= GZIP_MIN_BYTES and "gzip" in request.headers.get("accept-encoding", ""):
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _act_filters(filters: dict, exclude: Optional[str] = None) -> list:
+    return [getattr(ActMetadata, name) == value for name, value in filters.items() if value is not None and name != exclude]
 
 @app.get("/acts")
-def get_acts():
+def get_acts(
+    request: Request,
+    domain: Optional[str] = None,
+    year: Optional[str] = None,
+    doc_type: Optional[str] = None,
+    lang: Optional[str] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+):
+    """
+    Lists acts in doc_id order. Without `limit` all matching acts are
+    returned (the original behaviour); with it, pages are keyset-paginated
+    and the next page is linked through the Link / X-Next-Cursor headers.
+    `fields` is a comma-separated projection, e.g. fields=doc_id,description.
+    """
+    selected = ACT_FIELDS
+    if fields:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in ACT_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    if limit is not None and not 1 <= limit <= MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PAGE_SIZE}")
+
+    filters = {"domain": domain, "year": year, "doc_type": doc_type, "lang": lang}
+    # doc_id is always read: it is the keyset column
+    columns = ["doc_id"] + [f for f in selected if f != "doc_id"]
+
+    with Session(engine) as session:
+        version = _acts_version(session)
+        etag = 'W/"' + hashlib.sha1(f"{version}|{request.url.query}".encode("utf-8")).hexdigest() + '"'
+        if request.headers.get("if-none-match") == etag:
+            return _cached_json_response(request, None, etag)
+
+        query = select(*[getattr(ActMetadata, c) for c in columns]).where(*_act_filters(filters))
+        if cursor:
+            query = query.where(ActMetadata.doc_id > _decode_cursor(cursor))
+        query = query.order_by(ActMetadata.doc_id)
+        if limit is not None:
+            query = query.limit(limit + 1)
+        # execute (not exec) so single-column projections still yield rows
+        rows = session.execute(query).all()
+
+    headers = {}
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1][0])
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
+
+    acts = [{c: row[i] for i, c in enumerate(columns) if c in selected} for row in rows]
+    return _cached_json_response(request, acts, etag, headers)
+
+@app.get("/acts/facets")
+def get_act_facets(
+    request: Request,
+    domain: Optional[str] = None,
+    year: Optional[str] = None,
+    doc_type: Optional[str] = None,
+    lang: Optional[str] = None,
+):
+    """
+    Counts per domain / year / doc_type / lang. Each facet applies the
+    other filters but not its own, so the UI can show alternatives.
+    """
+    filters = {"domain": domain, "year": year, "doc_type": doc_type, "lang": lang}
     with Session(engine) as session:
-        acts = session.exec(select(ActMetadata)).all()
-        return acts
+        version = _acts_version(session)
+        etag = 'W/"' + hashlib.sha1(f"facets|{version}|{request.url.query}".encode("utf-8")).hexdigest() + '"'
+        if request.headers.get("if-none-match") == etag:
+            return _cached_json_response(request, None, etag)
+
+        facets = {}
+        for name in ACT_FILTERS:
+            column = getattr(ActMetadata, name)
+            rows = session.exec(
+                select(column, func.count()).where(*_act_filters(filters, exclude=name))
+                .group_by(column).order_by(func.count().desc(), column)
+            ).all()
+            facets[name] = [{"value": value, "count": count} for value, count in rows]
+        facets["total"] = session.exec(
+            select(func.count()).select_from(ActMetadata).where(*_act_filters(filters))
+        ).one()
+    return _cached_json_response(request, facets, etag)
+
+PROXY_CHUNK_SIZE = 64 * 1024
+
+def _parse_range(range_header: str, size: int):
+    """
+    Parses a single 'bytes=' range into an inclusive (start, end) tuple.
+    Returns None when the header should be ignored (multi-range/garbled) and
+    raises ValueError when the range is unsatisfiable.
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("range not satisfiable")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+def _iter_file(path: Path, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(PROXY_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def _local_document_response(request: Request, path: Path, etag: str, media_type: str):
+    """Serves a stored document with ETag, Accept-Ranges and single-range (206) support."""
+    size = path.stat().st_size
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": "public, max-age=86400",
+        "Content-Disposition": "inline; filename=act.pdf",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag in [t.strip() for t in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    length = end - start + 1 if size else 0
+    headers["Content-Length"] = str(length)
+
+    if request.method == "HEAD":
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+    return StreamingResponse(_iter_file(path, start, length), status_code=status_code, headers=headers, media_type=media_type)
+
+def _upstream_document_response(request: Request, url: str, media_type: str):
+    """Pass-through for the first view of a document while the store fills in the background."""
+    upstream_headers = {}
+    if request.headers.get("range"):
+        upstream_headers["Range"] = request.headers["range"]
+    http = get_http_session()
+    if request.method == "HEAD":
+        r = http.head(url, headers=upstream_headers, allow_redirects=True, timeout=5)
+    else:
+        r = http.get(url, headers=upstream_headers, stream=True, timeout=REQUEST_TIMEOUT)
+    if r.status_code >= 400:
+        r.close()
+        raise HTTPException(status_code=502 if r.status_code >= 500 else 404, detail="Upstream PDF not available")
+
+    headers = {"Content-Disposition": "inline; filename=act.pdf"}
+    for name in ("Content-Length", "Content-Range", "Accept-Ranges"):
+        if name in r.headers:
+            headers[name] = r.headers[name]
+    if request.method == "HEAD":
+        return Response(status_code=r.status_code, headers=headers, media_type=media_type)
+
+    def iterfile():
+        with r:
+            for chunk in r.iter_content(chunk_size=PROXY_CHUNK_SIZE):
+                yield chunk
+
+    return StreamingResponse(iterfile(), status_code=r.status_code, headers=headers, media_type=media_type)
 
 @app.api_route("/acts/{doc_id}/pdf", methods=["GET", "HEAD"])
 def proxy_pdf(doc_id: str, request: Request):
@@ -275,31 +657,173 @@ def proxy_pdf(doc_id: str, request: Request):
         act = session.get(ActMetadata, doc_id)
         if not act or not act.url_pdf:
             raise HTTPException(status_code=404, detail="PDF URL not found")
-            
-    if request.method == "HEAD":
-        try:
-            r = requests.head(act.url_pdf, allow_redirects=True, timeout=5)
-            # Forward status and headers (maybe filter headers?)
-            # Just return status code mainly for the existence check
-            from fastapi import Response
-            return Response(status_code=r.status_code, headers={"Content-Type": "application/pdf"})
-        except Exception as e:
-            print(f"Proxy HEAD error: {e}")
-            raise HTTPException(status_code=404, detail="Remote PDF check failed")
 
+    store = get_document_store()
+    url = resolve_url(act.url_pdf)
+    media_type = "text/html" if infer_suffix(url) == ".html" else "application/pdf"
+
+    entry = store.lookup(doc_id)
+    if entry and entry.url == url:
+        # Local-first: serve from disk, revalidate stale copies off the request path
+        if not store.is_fresh(entry):
+            fill_in_background(store, doc_id, url)
+        path = store.object_path(entry.sha256, entry.suffix)
+        return _local_document_response(request, path, f'"{entry.sha256}"', media_type)
+
+    # First access: fill the store in the background and relay upstream meanwhile
+    fill_in_background(store, doc_id, url)
     try:
-        # Stream the PDF
-        def iterfile():
-            with requests.get(act.url_pdf, stream=True) as r:
-                r.raise_for_status()
-                for chunk in r.iter_content(chunk_size=8192):
-                    yield chunk
-        
-        return StreamingResponse(iterfile(), media_type="application/pdf", headers={"Content-Disposition": "inline; filename=act.pdf"})
+        return _upstream_document_response(request, url, media_type)
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Proxy error: {e}")
         raise HTTPException(status_code=502, detail="Failed to fetch upstream PDF")
 
+@app.get("/search")
+def search(q: str, limit: int = DEFAULT_SEARCH_LIMIT, kind: Optional[str] = None, domain: Optional[str] = None):
+    """
+    Full-text search over act titles, analysis summaries and sections.
+    Hits are ranked by BM25 (higher score is better) with highlighted snippets.
+    """
+    if kind and kind not in SEARCH_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(SEARCH_KINDS)}")
+    limit = max(1, min(limit, MAX_SEARCH_LIMIT))
+    try:
+        results = search_acts(engine, q, limit, kind, domain)
+    except OperationalError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid search query: {e.orig}")
+    return {"query": q, "count": len(results), "results": results}
+
+# Cross-act queries over the normalized analysis tables (see structured.py)
+
+def _check_page(limit: int, offset: int):
+    if not 1 <= limit <= structured.MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {structured.MAX_LIMIT}")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="offset must not be negative")
+
+@app.get("/acts/{doc_id}/sections")
+def get_act_sections(doc_id: str, number: Optional[str] = None):
+    """Sections of an analysed act in document order; `number` selects one (e.g. number=5A)."""
+    sections = structured.get_sections(engine, doc_id, number)
+    if sections is None:
+        raise HTTPException(status_code=404, detail="Act has not been analysed")
+    if number is not None and not sections:
+        raise HTTPException(status_code=404, detail=f"Section {number} not found")
+    return {"doc_id": doc_id, "count": len(sections), "sections": sections}
+
+@app.get("/acts/{doc_id}/citations")
+def get_act_citations(doc_id: str):
+    """Acts referenced by an analysed act, resolved to catalogue entries where possible."""
+    citations = get_citations(engine, doc_id)
+    if not citations:
+        with Session(engine) as session:
+            if not session.get(AnalysisOutline, doc_id):
+                raise HTTPException(status_code=404, detail="Act has not been analysed")
+    return {"doc_id": doc_id, "count": len(citations), "citations": citations}
+
+@app.get("/acts/{doc_id}/cited-by")
+def get_act_cited_by(doc_id: str, limit: int = structured.DEFAULT_LIMIT, offset: int = 0):
+    """Analysed acts that reference this act (reverse citations)."""
+    _check_page(limit, offset)
+    with Session(engine) as session:
+        if not session.get(ActMetadata, doc_id):
+            raise HTTPException(status_code=404, detail="Act not found")
+    results = get_cited_by(engine, doc_id, limit, offset)
+    return {"doc_id": doc_id, "count": len(results), "results": results}
+
+@app.get("/entities")
+def get_entities(type: Optional[str] = None, q: Optional[str] = None,
+                 limit: int = structured.DEFAULT_LIMIT, offset: int = 0):
+    """Entities named in analyses with the number of acts mentioning each; `q` is a name prefix."""
+    _check_page(limit, offset)
+    results = structured.list_entities(engine, type, q, limit, offset)
+    return {"count": len(results), "results": results}
+
+@app.get("/entities/mentions")
+def get_entity_mentions(name: str, type: Optional[str] = None, domain: Optional[str] = None,
+                        prefix: bool = False, limit: int = structured.DEFAULT_LIMIT, offset: int = 0):
+    """Acts mentioning an entity, e.g. name=Ministry of Finance (case-insensitive)."""
+    _check_page(limit, offset)
+    results = structured.find_entity_mentions(engine, name, type, domain, prefix, limit, offset)
+    return {"name": name, "count": len(results), "results": results}
+
+@app.get("/boards")
+def get_boards(domain: Optional[str] = None, role: Optional[str] = None,
+               limit: int = structured.DEFAULT_LIMIT, offset: int = 0):
+    """Board/committee compositions of the acts in a domain (or with a given role)."""
+    _check_page(limit, offset)
+    return {"domain": domain, "role": role, **structured.board_compositions(engine, domain, role, limit, offset)}
+
+@app.get("/meetings")
+def get_meetings(frequency: Optional[str] = None, domain: Optional[str] = None,
+                 limit: int = structured.DEFAULT_LIMIT, offset: int = 0):
+    """Meeting details across acts, optionally by frequency (e.g. Monthly) and domain."""
+    _check_page(limit, offset)
+    results = structured.find_meetings(engine, frequency, domain, limit, offset)
+    return {"count": len(results), "results": results}
+
+@app.get("/references")
+def get_references(title: str, prefix: bool = False, limit: int = structured.DEFAULT_LIMIT, offset: int = 0):
+    """Acts whose analysis lists `title` among its referenced acts."""
+    _check_page(limit, offset)
+    results = structured.find_referencing_acts(engine, title, prefix, limit, offset)
+    return {"title": title, "count": len(results), "results": results}
+
+# Act lineage from the in-memory family graph (see lineage_graph.py). Family
+# responses are ETagged by content, so clients revalidate with a 304. They
+# carry no Last-Modified: research.db's mtime says nothing about the graph.
+
+def _lineage_graph() -> lineage_graph.LineageGraph:
+    try:
+        return lineage_graph.get_lineage_graph()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Lineage is unavailable: {e}")
+
+def _lineage_response(request: Request, payload, etag: str) -> Response:
+    return _cached_json_response(request, payload, etag, db_last_modified=False)
+
+@app.get("/lineage/families")
+def get_lineage_families(request: Request, domain: Optional[str] = None, year: Optional[int] = None,
+                         q: Optional[str] = None, limit: int = lineage_graph.DEFAULT_LIMIT, offset: int = 0):
+    """Family summaries (slug, title, version counts, year span) filtered by domain, a version year or title text."""
+    _check_page(limit, offset)
+    graph = _lineage_graph()
+    etag = lineage_graph.weak_etag("families", graph.version, request.url.query)
+    if request.headers.get("if-none-match") == etag:
+        return _lineage_response(request, None, etag)
+    total, families = graph.find(domain, year, q, limit, offset)
+    return _lineage_response(request, {"total": total, "count": len(families), "families": families}, etag)
+
+@app.get("/lineage/families/{slug}")
+def get_lineage_family(slug: str, request: Request):
+    """The family (all versions, oldest first) with this slug; titles differing only in case/punctuation share a slug."""
+    matches = _lineage_graph().by_slug(slug)
+    if not matches:
+        raise HTTPException(status_code=404, detail="Lineage family not found")
+    etag = lineage_graph.weak_etag(*(tag for _, tag in matches))
+    return _lineage_response(request, {"slug": slug, "families": [family for family, _ in matches]}, etag)
+
+@app.get("/lineage/acts/{doc_id}")
+def get_act_lineage(doc_id: str, request: Request):
+    """The family an act belongs to, plus slugs of families a patch also added it to."""
+    matches = _lineage_graph().by_doc_id(doc_id)
+    if not matches:
+        raise HTTPException(status_code=404, detail="Act not found in lineage")
+    (family, etag), others = matches[0], matches[1:]
+    payload = {"doc_id": doc_id, "family": family, "also_in": [other["slug"] for other, _ in others]}
+    return _lineage_response(request, payload, lineage_graph.weak_etag(doc_id, etag, *(tag for _, tag in others)))
+
+@app.get("/lineage/acts/{doc_id}/chain")
+def get_act_amendment_chain(doc_id: str, request: Request):
+    """The principal act doc_id belongs to, its amendments in order and the act that superseded it."""
+    graph = _lineage_graph()
+    matches = graph.by_doc_id(doc_id)
+    if not matches:
+        raise HTTPException(status_code=404, detail="Act not found in lineage")
+    return _lineage_response(request, graph.chain(doc_id), lineage_graph.weak_etag("chain", doc_id, matches[0][1]))
+
 @app.get("/acts/{doc_id}")
 def get_act_by_id(doc_id: str, request: Request):
     with Session(engine) as session:
@@ -319,44 +843,106 @@ def get_act_by_id(doc_id: str, request: Request):
              
         return act
 
+RECENT_LOGS_LIMIT = 50
+
+def _parse_day(value: Optional[str], name: str) -> Optional[str]:
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be YYYY-MM-DD")
+
 @app.get("/analytics")
-def get_analytics():
+def get_analytics(days: Optional[int] = None, start: Optional[str] = None, end: Optional[str] = None):
+    """
+    Usage summary from the per-day/model TelemetryRollup table plus the most
+    recent logs. Restrict to a UTC date range with start/end (YYYY-MM-DD,
+    inclusive) or to the last `days` days.
+    """
+    start = _parse_day(start, "start")
+    end = _parse_day(end, "end")
+    if days is not None:
+        if days < 1:
+            raise HTTPException(status_code=400, detail="days must be positive")
+        start = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+
     with Session(engine) as session:
-        # Summary Stats
-        total_requests = session.exec(select(func.count(TelemetryLog.id))).one() or 0
-        total_input = session.exec(select(func.sum(TelemetryLog.input_tokens))).one() or 0
-        total_output = session.exec(select(func.sum(TelemetryLog.output_tokens))).one() or 0
-        avg_latency = session.exec(select(func.avg(TelemetryLog.latency_ms))).one() or 0
-        total_cost = session.exec(select(func.sum(TelemetryLog.cost_usd))).one() or 0.0
-        
-        # Recent Logs (Limit 50)
-        statement = select(TelemetryLog).order_by(TelemetryLog.timestamp.desc()).limit(50)
-        logs = session.exec(statement).all()
-        
-        return {
-            "total_requests": total_requests,
-            "total_input_tokens": total_input or 0,
-            "total_output_tokens": total_output or 0,
-            "avg_latency_ms": float(avg_latency or 0),
-            "total_cost_est": float(total_cost or 0),
-            "logs": logs
-        }
+        query = select(TelemetryRollup)
+        if start:
+            query = query.where(TelemetryRollup.day >= start)
+        if end:
+            query = query.where(TelemetryRollup.day <= end)
+        rollups = session.exec(query.order_by(TelemetryRollup.day)).all()
+
+        # Recent Logs (indexed on timestamp)
+        statement = select(TelemetryLog)
+        if start:
+            statement = statement.where(TelemetryLog.timestamp >= datetime.strptime(start, "%Y-%m-%d"))
+        if end:
+            statement = statement.where(TelemetryLog.timestamp < datetime.strptime(end, "%Y-%m-%d") + timedelta(days=1))
+        logs = session.exec(statement.order_by(TelemetryLog.timestamp.desc()).limit(RECENT_LOGS_LIMIT)).all()
+
+    histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    latency_max = 0
+    daily = {}
+    for rollup in rollups:
+        for i, count in enumerate(json.loads(rollup.latency_histogram)):
+            histogram[i] += count
+        latency_max = max(latency_max, rollup.latency_max_ms)
+        day = daily.setdefault(rollup.day, {"day": rollup.day, "requests": 0, "input_tokens": 0, "output_tokens": 0, "cost_usd": 0.0})
+        day["requests"] += rollup.requests
+        day["input_tokens"] += rollup.input_tokens
+        day["output_tokens"] += rollup.output_tokens
+        day["cost_usd"] += rollup.cost_usd
+
+    total_requests = sum(r.requests for r in rollups)
+    latency_sum = sum(r.latency_sum_ms for r in rollups)
+    upload_hits = sum(r.upload_cache_hits for r in rollups)
+    upload_misses = sum(r.upload_cache_misses for r in rollups)
+
+    return {
+        "total_requests": total_requests,
+        "failed_requests": sum(r.failures for r in rollups),
+        "total_input_tokens": sum(r.input_tokens for r in rollups),
+        "total_output_tokens": sum(r.output_tokens for r in rollups),
+        "avg_latency_ms": latency_sum / total_requests if total_requests else 0.0,
+        "p50_latency_ms": latency_percentile(histogram, 0.50, latency_max),
+        "p95_latency_ms": latency_percentile(histogram, 0.95, latency_max),
+        "p99_latency_ms": latency_percentile(histogram, 0.99, latency_max),
+        "total_cost_est": float(sum(r.cost_usd for r in rollups)),
+        # Requests served by another in-flight analysis of the same act (this process)
+        "coalesced_requests": base_analysis_flights.coalesced,
+        "analyses_in_flight": base_analysis_flights.in_flight(),
+        "upload_cache_hits": upload_hits,
+        "upload_cache_misses": upload_misses,
+        "upload_cache_hit_rate": upload_hits / (upload_hits + upload_misses) if (upload_hits + upload_misses) else 0.0,
+        # Rows waiting in / dropped by the background telemetry writer
+        "telemetry_backlog": telemetry_sink.backlog(),
+        "telemetry_dropped": telemetry_sink.dropped,
+        "range": {"start": start, "end": end},
+        "daily": list(daily.values()),
+        "logs": logs
+    }
 
 @app.get("/acts/{doc_id}/history")
 def get_analysis_history(doc_id: str):
     """Get analysis history for a specific document."""
     from pylegislation.research.db import Session, engine, select, AnalysisHistory
+    from pylegislation.research.blobs import get_texts
     
     with Session(engine) as session:
         statement = select(AnalysisHistory).where(AnalysisHistory.doc_id == doc_id).order_by(AnalysisHistory.timestamp.desc())
         history = session.exec(statement).all()
+        # Refreshes and base analyses often share a blob; each is decoded once
+        responses = get_texts(session, (h.response_sha256 for h in history))
         
     return [
         {
             "id": h.id,
             "timestamp": h.timestamp.isoformat(),
             "prompt": h.prompt,
-            "response": h.response,
+            "response": responses.get(h.response_sha256),
             "model": h.model
         }
         for h in history
@@ -366,6 +952,7 @@ def get_analysis_history(doc_id: str):
 def get_history_item(history_id: int):
     """Get a specific analysis history item."""
     from pylegislation.research.db import Session, engine, select, AnalysisHistory
+    from pylegislation.research.blobs import get_text
     
     with Session(engine) as session:
         item = session.get(AnalysisHistory, history_id)
@@ -376,7 +963,7 @@ def get_history_item(history_id: int):
             "id": item.id,
             "timestamp": item.timestamp.isoformat(),
             "prompt": item.prompt,
-            "response": item.response,
+            "response": get_text(session, item.response_sha256),
             "model": item.model,
             "doc_id": item.doc_id
         }
@@ -0,0 +1,244 @@
+import json
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+# Defaults sized for the Gemini 2.0 Flash free tier
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RPM = 15
+DEFAULT_TPM = 1_000_000
+# Tokens reserved per analysis before the real usage is known
+ESTIMATED_TOKENS_PER_ANALYSIS = 40_000
+# BatchItem rows updated per statement (SQLite bound-parameter limit)
+CHECKPOINT_CHUNK = 500
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter over requests/minute and tokens/minute.
+    Callers reserve an estimate up front and settle the real usage later.
+    """
+
+    def __init__(self, rpm: int, tpm: int):
+        if rpm < 1 or tpm < 1:
+            raise ValueError("rpm and tpm must be at least 1")
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens: int) -> int:
+        """Blocks until one request and `tokens` fit in the budget. Returns the reservation."""
+        tokens = min(tokens, self.tpm)
+        with self._cond:
+            while True:
+                self._refill()
+                if self._requests >= 1 and self._tokens >= tokens:
+                    self._requests -= 1
+                    self._tokens -= tokens
+                    return tokens
+                wait_requests = (1 - self._requests) * 60 / self.rpm if self._requests < 1 else 0
+                wait_tokens = (tokens - self._tokens) * 60 / self.tpm if self._tokens < tokens else 0
+                self._cond.wait(max(wait_requests, wait_tokens, 0.05))
+
+    def settle(self, reserved: int, actual: int):
+        """Returns over-reserved tokens to the bucket (or charges the shortfall)."""
+        with self._cond:
+            self._tokens = min(self.tpm, self._tokens + reserved - actual)
+            self._cond.notify_all()
+
+
+def select_doc_ids(ids: Optional[Iterable[str]] = None, domain: Optional[str] = None,
+                   year: Optional[str] = None, limit: Optional[int] = None) -> List[str]:
+    """Resolves a batch selection against the HEAD act index."""
+    from pylegislation.research.act_index import get_act_index
+
+    index = get_act_index()
+    if ids:
+        selected = []
+        for doc_id in ids:
+            if doc_id in index:
+                selected.append(doc_id)
+            else:
+                print(f"WARN: Unknown doc_id {doc_id}, skipping", file=sys.stderr)
+    else:
+        selected = []
+        for row in index.rows():
+            if domain and (row.get('domain') or '').lower() != domain.lower():
+                continue
+            if year and not (row.get('date_str') or '').startswith(str(year)):
+                continue
+            selected.append(row['doc_id'])
+    if limit:
+        selected = selected[:limit]
+    return selected
+
+
+def _create_run(doc_ids: List[str], params: dict) -> str:
+    from pylegislation.research.db import Session, engine, BatchRun, BatchItem
+
+    run_id = datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+    with Session(engine) as session:
+        session.add(BatchRun(id=run_id, params_json=json.dumps(params)))
+        session.add_all(BatchItem(run_id=run_id, doc_id=doc_id) for doc_id in dict.fromkeys(doc_ids))
+        session.commit()
+    return run_id
+
+
+def _checkpoint(run_id: str, doc_id: str, **fields):
+    from pylegislation.research.db import Session, engine, BatchItem
+
+    with Session(engine) as session:
+        item = session.get(BatchItem, (run_id, doc_id))
+        for key, value in fields.items():
+            setattr(item, key, value)
+        item.finished_at = datetime.utcnow()
+        session.add(item)
+        session.commit()
+
+
+def _checkpoint_many(run_id: str, doc_ids: List[str], **fields):
+    """Same as _checkpoint for many items, in one transaction."""
+    from sqlalchemy import update
+    from pylegislation.research.db import Session, engine, BatchItem
+
+    values = {**fields, "finished_at": datetime.utcnow()}
+    with Session(engine) as session:
+        for start in range(0, len(doc_ids), CHECKPOINT_CHUNK):
+            chunk = doc_ids[start:start + CHECKPOINT_CHUNK]
+            session.execute(
+                update(BatchItem).where(BatchItem.run_id == run_id, BatchItem.doc_id.in_(chunk)).values(**values)
+            )
+        session.commit()
+
+
+def run_batch(api_key: str, project_root: Path, doc_ids: Optional[List[str]] = None,
+              resume_run_id: Optional[str] = None, retry_failed: bool = False,
+              force_refresh: bool = False, concurrency: int = DEFAULT_CONCURRENCY,
+              rpm: int = DEFAULT_RPM, tpm: int = DEFAULT_TPM) -> dict:
+    """
+    Analyzes many acts concurrently under RPM/TPM budgets, checkpointing each
+    item to BatchItem so an interrupted run can be resumed by id.
+    """
+    from pylegislation.research.analyze import analyze_act_by_id
+    from pylegislation.research.db import Session, engine, select, ActAnalysis, BatchRun, BatchItem, create_db_and_tables
+    from pylegislation.research.telemetry import estimate_cost, record_telemetry, telemetry_sink
+
+    create_db_and_tables()
+
+    if resume_run_id:
+        run_id = resume_run_id
+        with Session(engine) as session:
+            run = session.get(BatchRun, run_id)
+            if not run:
+                raise ValueError(f"Batch run {run_id} not found")
+            force_refresh = json.loads(run.params_json).get("force_refresh", force_refresh)
+            statuses = ["PENDING", "FAIL"] if retry_failed else ["PENDING"]
+            pending = session.exec(
+                select(BatchItem.doc_id).where(BatchItem.run_id == run_id, BatchItem.status.in_(statuses))
+            ).all()
+        print(f"Resuming batch {run_id}: {len(pending)} acts remaining")
+    else:
+        run_id = _create_run(doc_ids or [], {"force_refresh": force_refresh})
+        pending = list(dict.fromkeys(doc_ids or []))
+        print(f"Started batch {run_id}: {len(pending)} acts")
+
+    # Skip acts already in the analysis cache with one query
+    if not force_refresh and pending:
+        with Session(engine) as session:
+            cached = set(session.exec(select(ActAnalysis.doc_id).where(ActAnalysis.doc_id.in_(pending))).all())
+        if cached:
+            _checkpoint_many(run_id, sorted(cached), status="SKIPPED")
+        pending = [d for d in pending if d not in cached]
+        if cached:
+            print(f"Skipped {len(cached)} already analyzed acts")
+
+    limiter = RateLimiter(rpm, tpm)
+    totals = {"success": 0, "failed": 0, "input_tokens": 0, "output_tokens": 0}
+    totals_lock = threading.Lock()
+    started = time.time()
+
+    def work(doc_id: str):
+        reserved = limiter.acquire(ESTIMATED_TOKENS_PER_ANALYSIS)
+        t0 = time.time()
+        try:
+            result = analyze_act_by_id(doc_id, api_key, None, project_root, force_refresh=force_refresh)
+        except Exception as e:
+            limiter.settle(reserved, 0)
+            latency_ms = int((time.time() - t0) * 1000)
+            record_telemetry(doc_id, "failed", 0, 0, latency_ms, "FAIL")
+            _checkpoint(run_id, doc_id, status="FAIL", error=str(e), latency_ms=latency_ms)
+            with totals_lock:
+                totals["failed"] += 1
+            print(f"FAIL {doc_id}: {e}", file=sys.stderr)
+            return
+
+        latency_ms = int((time.time() - t0) * 1000)
+        input_tokens = result.get("input_tokens", 0)
+        output_tokens = result.get("output_tokens", 0)
+        limiter.settle(reserved, input_tokens + output_tokens)
+        record_telemetry(
+            doc_id, result.get("model", "unknown"), input_tokens, output_tokens, latency_ms, "SUCCESS",
+            estimate_cost(input_tokens, output_tokens),
+            result.get("upload_cache_hits"), result.get("upload_cache_misses")
+        )
+        _checkpoint(run_id, doc_id, status="SUCCESS", error=None, input_tokens=input_tokens,
+                    output_tokens=output_tokens, latency_ms=latency_ms)
+        with totals_lock:
+            totals["success"] += 1
+            totals["input_tokens"] += input_tokens
+            totals["output_tokens"] += output_tokens
+            done = totals["success"] + totals["failed"]
+        print(f"[{done}/{len(pending)}] {doc_id} ({latency_ms} ms, {input_tokens + output_tokens} tokens)")
+
+    started_sink = telemetry_sink.start()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch") as executor:
+            futures = [executor.submit(work, doc_id) for doc_id in pending]
+            for future in as_completed(futures):
+                future.result()
+    finally:
+        if started_sink:
+            telemetry_sink.stop()
+
+    elapsed = time.time() - started
+    with Session(engine) as session:
+        run = session.get(BatchRun, run_id)
+        remaining = session.exec(
+            select(BatchItem.doc_id).where(BatchItem.run_id == run_id, BatchItem.status == "PENDING")
+        ).first()
+        if not remaining:
+            run.status = "DONE"
+            run.finished_at = datetime.utcnow()
+        session.add(run)
+        session.commit()
+
+    cost = estimate_cost(totals["input_tokens"], totals["output_tokens"])
+    summary = {
+        "run_id": run_id,
+        "analyzed": totals["success"],
+        "failed": totals["failed"],
+        "input_tokens": totals["input_tokens"],
+        "output_tokens": totals["output_tokens"],
+        "cost_usd": cost,
+        "elapsed_s": round(elapsed, 1),
+        "acts_per_min": round(totals["success"] * 60 / elapsed, 2) if elapsed > 0 else 0.0,
+        "tokens_per_min": round((totals["input_tokens"] + totals["output_tokens"]) * 60 / elapsed) if elapsed > 0 else 0,
+    }
+    print(f"Batch {run_id}: {summary['analyzed']} analyzed, {summary['failed']} failed in {summary['elapsed_s']}s "
+          f"({summary['acts_per_min']} acts/min, {summary['tokens_per_min']} tokens/min), est. cost ${cost:.4f}")
+    return summary
@@ -0,0 +1,173 @@
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+# Indexes added for the API's access patterns; dropped for the "before" run
+ACCESS_PATTERN_INDEXES = [
+    "ix_analysishistory_doc_id_timestamp",
+    "ix_telemetrylog_timestamp",
+    "ix_batchitem_run_id_status",
+]
+SEED_ROWS = 20_000
+DEFAULT_SCENARIOS = [("legacy", False), ("production", True)]
+
+
+def _prepare_database(source: Optional[Path], path: Path, with_indexes: bool, seed_rows: int) -> List[str]:
+    """Copies (or creates) a research.db at path, seeds history/telemetry rows. Returns doc_ids."""
+    from sqlmodel import create_engine
+    from pylegislation.research.db import init_schema
+
+    if source and source.exists():
+        # sqlite3 backup copies a consistent snapshot even if the source is in WAL mode
+        with sqlite3.connect(source) as src, sqlite3.connect(path) as dst:
+            src.backup(dst)
+    setup_engine = create_engine(f"sqlite:///{path}")
+    init_schema(setup_engine)
+    setup_engine.dispose()
+
+    from pylegislation.research.blobs import encode_text
+
+    empty = encode_text("{}")
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT OR IGNORE INTO analysisblob (sha256, codec, size, data) VALUES (:sha256, :codec, :size, :data)",
+                 empty)
+    doc_ids = [row[0] for row in conn.execute("SELECT doc_id FROM actmetadata")] or [f"bench-{i}" for i in range(500)]
+    start = datetime.utcnow() - timedelta(days=90)
+    rng = random.Random(0)
+    conn.executemany(
+        "INSERT INTO analysishistory (doc_id, timestamp, prompt, response_sha256, model) VALUES (?, ?, ?, ?, ?)",
+        ((rng.choice(doc_ids), start + timedelta(minutes=i), "Base Analysis", empty["sha256"], "bench") for i in range(seed_rows)),
+    )
+    conn.executemany(
+        "INSERT INTO telemetrylog (doc_id, timestamp, model, input_tokens, output_tokens, latency_ms, status) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((rng.choice(doc_ids), start + timedelta(minutes=i), "bench", 1000, 100, rng.randint(200, 30000), "SUCCESS")
+         for i in range(seed_rows)),
+    )
+    if not with_indexes:
+        for name in ACCESS_PATTERN_INDEXES:
+            conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+    conn.commit()
+    conn.close()
+    return doc_ids
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_scenario(profile: str, with_indexes: bool, seconds: float = 5.0, readers: int = 4, writers: int = 2,
+                 source: Optional[Path] = None, seed_rows: int = SEED_ROWS) -> dict:
+    """
+    Runs the mixed workload against a scratch copy of research.db:
+    readers fetch an act's history (newest first) and the recent telemetry,
+    writers record a telemetry row and a history row per committed request.
+    """
+    from sqlmodel import create_engine
+    from pylegislation.research.blobs import text_sha256
+    from pylegislation.research.db import apply_storage_profile
+
+    # _prepare_database stores this blob; writers only reference it
+    response_sha256 = text_sha256("{}")
+    with tempfile.TemporaryDirectory(prefix="db-bench-") as tmp:
+        path = Path(tmp) / "research.db"
+        doc_ids = _prepare_database(source, path, with_indexes, seed_rows)
+        engine = apply_storage_profile(create_engine(f"sqlite:///{path}", pool_size=readers + writers), profile)
+
+        stop = threading.Event()
+        lock = threading.Lock()
+        stats = {"reads": 0, "writes": 0, "errors": 0, "read_ms": [], "write_ms": []}
+
+        def reader(seed: int):
+            rng = random.Random(seed)
+            with engine.connect() as conn:
+                while not stop.is_set():
+                    t0 = time.perf_counter()
+                    try:
+                        conn.exec_driver_sql(
+                            "SELECT id, timestamp, prompt FROM analysishistory WHERE doc_id = ? "
+                            "ORDER BY timestamp DESC LIMIT 20", (rng.choice(doc_ids),)
+                        ).all()
+                        conn.exec_driver_sql("SELECT * FROM telemetrylog ORDER BY timestamp DESC LIMIT 50").all()
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        with lock:
+                            stats["errors"] += 1
+                        continue
+                    elapsed = (time.perf_counter() - t0) * 1000
+                    with lock:
+                        stats["reads"] += 1
+                        stats["read_ms"].append(elapsed)
+
+        def writer(seed: int):
+            rng = random.Random(seed)
+            with engine.connect() as conn:
+                while not stop.is_set():
+                    t0 = time.perf_counter()
+                    doc_id = rng.choice(doc_ids)
+                    try:
+                        conn.exec_driver_sql(
+                            "INSERT INTO telemetrylog (doc_id, timestamp, model, input_tokens, output_tokens, "
+                            "latency_ms, status) VALUES (?, ?, 'bench', 1000, 100, ?, 'SUCCESS')",
+                            (doc_id, datetime.utcnow(), rng.randint(200, 30000))
+                        )
+                        conn.exec_driver_sql(
+                            "INSERT INTO analysishistory (doc_id, timestamp, prompt, response_sha256, model) "
+                            "VALUES (?, ?, 'bench', ?, 'bench')", (doc_id, datetime.utcnow(), response_sha256)
+                        )
+                        conn.commit()
+                    except Exception:
+                        conn.rollback()
+                        with lock:
+                            stats["errors"] += 1
+                        continue
+                    elapsed = (time.perf_counter() - t0) * 1000
+                    with lock:
+                        stats["writes"] += 1
+                        stats["write_ms"].append(elapsed)
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        threads += [threading.Thread(target=writer, args=(1000 + i,)) for i in range(writers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    return {
+        "profile": profile,
+        "indexes": with_indexes,
+        "reads_per_s": round(stats["reads"] / elapsed, 1),
+        "writes_per_s": round(stats["writes"] / elapsed, 1),
+        "errors": stats["errors"],
+        "read_p95_ms": round(_percentile(stats["read_ms"], 0.95), 2),
+        "write_p95_ms": round(_percentile(stats["write_ms"], 0.95), 2),
+    }
+
+
+def run_storage_benchmark(seconds: float = 5.0, readers: int = 4, writers: int = 2,
+                          source: Optional[Path] = None, scenarios=DEFAULT_SCENARIOS) -> List[dict]:
+    """Before (legacy profile, no access-pattern indexes) vs after (production profile + indexes)."""
+    results = []
+    for profile, with_indexes in scenarios:
+        print(f"Benchmarking profile={profile} indexes={'on' if with_indexes else 'off'} for {seconds}s...")
+        results.append(run_scenario(profile, with_indexes, seconds, readers, writers, source))
+
+    print(f"{'profile':<12}{'indexes':<9}{'reads/s':>10}{'writes/s':>10}{'errors':>8}{'read p95':>11}{'write p95':>11}")
+    for r in results:
+        print(f"{r['profile']:<12}{'on' if r['indexes'] else 'off':<9}{r['reads_per_s']:>10}{r['writes_per_s']:>10}"
+              f"{r['errors']:>8}{r['read_p95_ms']:>9}ms{r['write_p95_ms']:>9}ms")
+    return results
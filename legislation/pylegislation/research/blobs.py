@@ -0,0 +1,162 @@
+import hashlib
+import sys
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+
+# Content-addressed storage for analysis payloads.
+#
+# ActAnalysis.content_sha256 and AnalysisHistory.response_sha256 reference
+# AnalysisBlob rows keyed by the SHA-256 of the UTF-8 text. A base analysis
+# saved to both the cache and history, refreshed to the same result, or
+# restored again from a dump is stored once. Payloads are zlib-compressed
+# unless that does not make them smaller.
+
+CODEC = "zlib"
+COMPRESS_LEVEL = 6
+# Texts shorter than this are stored raw (compression would not pay off)
+MIN_COMPRESS_BYTES = 256
+# Bound on the number of shas in one IN (...) lookup
+LOOKUP_CHUNK = 500
+# Rows moved per statement by migrate_inline_content
+MIGRATE_CHUNK = 500
+
+# Cached base analysis of one act: (model, codec, data)
+CACHED_ANALYSIS_SQL = text("""
+    SELECT a.model, b.codec, b.data FROM actanalysis AS a
+    JOIN analysisblob AS b ON b.sha256 = a.content_sha256
+    WHERE a.doc_id = :doc_id
+""")
+
+# (table, key column, inline text column, blob reference column)
+INLINE_COLUMNS = [
+    ("actanalysis", "doc_id", "content_json", "content_sha256"),
+    ("analysishistory", "id", "response", "response_sha256"),
+]
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def encode_text(text: str) -> dict:
+    """AnalysisBlob row values for text."""
+    raw = text.encode("utf-8")
+    codec, data = "raw", raw
+    if len(raw) >= MIN_COMPRESS_BYTES:
+        compressed = zlib.compress(raw, COMPRESS_LEVEL)
+        if len(compressed) < len(raw):
+            codec, data = CODEC, compressed
+    return {"sha256": hashlib.sha256(raw).hexdigest(), "codec": codec, "size": len(raw), "data": data}
+
+
+def decode_blob(codec: str, data: bytes) -> str:
+    if codec == "zlib":
+        data = zlib.decompress(data)
+    elif codec != "raw":
+        raise ValueError(f"Unknown blob codec {codec!r}")
+    return bytes(data).decode("utf-8")
+
+
+def _insert_blobs():
+    from sqlalchemy import insert
+    from pylegislation.research.db import AnalysisBlob
+    return insert(AnalysisBlob).prefix_with("OR IGNORE")
+
+
+def put_blobs(executor, rows: List[dict]):
+    """Stores encoded rows (see encode_text); existing hashes are left alone."""
+    if rows:
+        executor.execute(_insert_blobs(), rows)
+
+
+def put_texts(executor, texts: Iterable[str]) -> List[str]:
+    """
+    Stores texts as blobs and returns their hashes, in order. `executor` is
+    a Session or Connection; the blobs are part of its transaction.
+    """
+    rows = {}
+    shas = []
+    for text in texts:
+        row = encode_text(text)
+        rows.setdefault(row["sha256"], row)
+        shas.append(row["sha256"])
+    put_blobs(executor, list(rows.values()))
+    return shas
+
+
+def put_text(executor, text: str) -> str:
+    return put_texts(executor, [text])[0]
+
+
+def get_texts(executor, shas: Iterable[str]) -> Dict[str, str]:
+    """{sha256: text} for the given hashes (missing ones are left out)."""
+    from sqlmodel import select
+    from pylegislation.research.db import AnalysisBlob
+
+    wanted = list(dict.fromkeys(s for s in shas if s))
+    texts = {}
+    for start in range(0, len(wanted), LOOKUP_CHUNK):
+        chunk = wanted[start:start + LOOKUP_CHUNK]
+        statement = select(AnalysisBlob.sha256, AnalysisBlob.codec, AnalysisBlob.data).where(
+            AnalysisBlob.sha256.in_(chunk)
+        )
+        for sha, codec, data in executor.execute(statement):
+            texts[sha] = decode_blob(codec, data)
+    return texts
+
+
+def get_text(executor, sha: str) -> Optional[str]:
+    return get_texts(executor, [sha]).get(sha)
+
+
+def _rebuild_table(conn, table: str):
+    """
+    Recreates `table` from its current model definition (dropping columns the
+    model no longer has), keeping the rows of the columns both share.
+    Indexes are recreated afterwards by upgrade_schema.
+    """
+    from sqlalchemy import MetaData
+    from sqlalchemy.schema import CreateTable
+    from sqlmodel import SQLModel
+
+    model_table = SQLModel.metadata.tables[table]
+    existing = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table}")')}
+    shared = ", ".join(f'"{c.name}"' for c in model_table.columns if c.name in existing)
+    rebuilt = model_table.to_metadata(MetaData(), name=f"{table}__rebuild")
+    conn.execute(CreateTable(rebuilt))
+    conn.exec_driver_sql(f'INSERT INTO "{rebuilt.name}" ({shared}) SELECT {shared} FROM "{table}"')
+    conn.exec_driver_sql(f'DROP TABLE "{table}"')
+    conn.exec_driver_sql(f'ALTER TABLE "{rebuilt.name}" RENAME TO "{table}"')
+
+
+def migrate_inline_content(engine):
+    """
+    Moves analysis text stored inline by older versions (content_json,
+    response) into AnalysisBlob and drops the inline columns.
+    Each table is migrated in one transaction; a no-op once done.
+    """
+    for table, key, inline, ref in INLINE_COLUMNS:
+        with engine.begin() as conn:
+            columns = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table}")')}
+            if inline not in columns:
+                continue
+            if ref not in columns:
+                conn.exec_driver_sql(f'ALTER TABLE "{table}" ADD COLUMN "{ref}" VARCHAR')
+            moved = 0
+            while True:
+                rows = conn.exec_driver_sql(
+                    f'SELECT "{key}", "{inline}" FROM "{table}" WHERE "{ref}" IS NULL LIMIT {MIGRATE_CHUNK}'
+                ).all()
+                if not rows:
+                    break
+                shas = put_texts(conn, [text or "" for _, text in rows])
+                conn.exec_driver_sql(
+                    f'UPDATE "{table}" SET "{ref}" = ? WHERE "{key}" = ?',
+                    [(sha, row_key) for sha, (row_key, _) in zip(shas, rows)],
+                )
+                moved += len(rows)
+            _rebuild_table(conn, table)
+        if moved:
+            print(f"Moved {moved} {table}.{inline} values into analysisblob", file=sys.stderr)
@@ -0,0 +1,331 @@
+import json
+import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from pypdf import PdfReader, PdfWriter
+
+# Documents above these sizes are analyzed as parallel chunks (map) and
+# merged deterministically (reduce) instead of one 65k-token generation
+# that tends to truncate. A chunk whose output is still truncated is split
+# in half and retried rather than repaired. The whole-act summary and
+# category come from a text-only call over the chunk summaries, so the
+# full document is never sent.
+CHUNK_PAGE_THRESHOLD = 30
+CHUNK_PAGES = 12
+CHUNK_CHAR_THRESHOLD = 120_000
+CHUNK_CHARS = 50_000
+CHUNK_WORKERS = 4
+CHUNK_MAX_OUTPUT_TOKENS = 16384
+OVERVIEW_MAX_OUTPUT_TOKENS = 2048
+
+LIST_FIELDS = ["referenced_acts", "sections", "amendments", "entities", "meeting_details", "board_members"]
+
+OVERVIEW_PROMPT = """
+    Below are summaries of the consecutive parts of one legislative act, in order.
+    Return a JSON object describing the act as a whole, with only these fields:
+
+    1. "summary": A concise summary of what this act is based on and its primary purpose.
+    2. "category": Choose the most relevant major category from this list: {categories}.
+    3. "sub_category": A specific sub-category or keyword within the chosen category that matches the content.
+
+    Ensure the output is pure JSON.
+
+    {summaries}
+    """
+
+CHUNK_PREFACE = """
+    The attached document is PART {part} of {total} ({span}) of a longer legislative act.
+    Only extract content that appears in this part. For "sections", include every section
+    or clause that appears in this part, even if it started in an earlier part or continues
+    in a later one; keep its original section number.
+    """
+
+
+def _is_html(doc_path: Path) -> bool:
+    return doc_path.suffix.lower() in ['.html', '.htm']
+
+
+def _read_html(doc_path: Path) -> str:
+    try:
+        return doc_path.read_text(encoding='utf-8')
+    except UnicodeDecodeError:
+        return doc_path.read_text(encoding='latin-1', errors='replace')
+
+
+def should_chunk(doc_path: Path) -> bool:
+    """True if the document is large enough to benefit from chunked analysis."""
+    try:
+        if _is_html(doc_path):
+            return len(_read_html(doc_path)) > CHUNK_CHAR_THRESHOLD
+        return len(PdfReader(doc_path).pages) > CHUNK_PAGE_THRESHOLD
+    except Exception as e:
+        print(f"WARN: Could not size {doc_path.name} for chunking ({e}); using single-shot analysis", file=sys.stderr)
+        return False
+
+
+def split_pdf(doc_path: Path, out_dir: Path, pages_per_chunk: int = CHUNK_PAGES,
+              first_page: int = 1) -> List[Tuple[Path, str]]:
+    """
+    Writes page-range PDFs into out_dir. Returns [(path, 'pages a-b')],
+    numbered from first_page (the page doc_path starts at in the act).
+    """
+    reader = PdfReader(doc_path)
+    total = len(reader.pages)
+    offset = first_page - 1
+    chunks = []
+    for start in range(0, total, pages_per_chunk):
+        end = min(start + pages_per_chunk, total)
+        writer = PdfWriter()
+        for i in range(start, end):
+            writer.add_page(reader.pages[i])
+        span = f"{start + 1 + offset}-{end + offset}"
+        chunk_path = out_dir / f"{doc_path.stem}_p{span}.pdf"
+        with open(chunk_path, 'wb') as f:
+            writer.write(f)
+        chunks.append((chunk_path, f"pages {span}"))
+    return chunks
+
+
+def split_html(doc_path: Path, out_dir: Path, chunk_chars: int = CHUNK_CHARS) -> List[Tuple[Path, str]]:
+    """Splits HTML/text on line boundaries into ~chunk_chars pieces."""
+    text = _read_html(doc_path)
+    pieces, current, size = [], [], 0
+    for line in text.splitlines(keepends=True):
+        if size + len(line) > chunk_chars and current:
+            pieces.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        pieces.append("".join(current))
+
+    chunks = []
+    for i, piece in enumerate(pieces, start=1):
+        chunk_path = out_dir / f"{doc_path.stem}_part{i}.html"
+        chunk_path.write_text(piece, encoding='utf-8')
+        chunks.append((chunk_path, f"characters part {i}"))
+    return chunks
+
+
+def split_chunk(chunk_path: Path, span: str, out_dir: Path) -> List[Tuple[Path, str]]:
+    """
+    Halves a chunk whose analysis was truncated. Returns [(path, span)] for
+    the two halves, or [] if the chunk is a single page (or line).
+    """
+    if _is_html(chunk_path):
+        text = _read_html(chunk_path)
+        halves = split_html(chunk_path, out_dir, chunk_chars=(len(text) + 1) // 2)
+        halves = [(path, f"{span}, half {i}") for i, (path, _) in enumerate(halves, start=1)]
+    else:
+        pages = len(PdfReader(chunk_path).pages)
+        first_page = int(span.split()[1].split("-")[0])
+        halves = split_pdf(chunk_path, out_dir, (pages + 1) // 2, first_page) if pages > 1 else []
+    return halves if len(halves) > 1 else []
+
+
+def _canonical(item) -> str:
+    return json.dumps(item, sort_keys=True, ensure_ascii=False)
+
+
+def _dedupe(items: list, key) -> list:
+    seen = set()
+    out = []
+    for item in items:
+        k = key(item)
+        if k in seen:
+            continue
+        seen.add(k)
+        out.append(item)
+    return out
+
+
+def _section_key(section) -> str:
+    return str(section.get("section_number", "")).strip().lower() if isinstance(section, dict) else ""
+
+
+def merge_chunk_results(parts: List[dict], overview: Optional[dict] = None) -> dict:
+    """
+    Deterministically merges per-chunk analyses (in document order).
+
+    - sections: concatenated; a section split across a chunk boundary (same
+      number at the end of one chunk and the start of the next) is joined
+    - entities: deduped by (name, type), first excerpt wins
+    - referenced_acts: deduped case-insensitively, first spelling wins
+    - amendments / meeting_details / board_members: exact duplicates dropped
+    - summary / category / sub_category: from the overview of the chunk summaries,
+      falling back to the first chunk summary and the majority category
+    """
+    sections = []
+    for part in parts:
+        part_sections = [s for s in part.get("sections") or [] if isinstance(s, dict)]
+        if sections and part_sections and _section_key(sections[-1]) and \
+                _section_key(sections[-1]) == _section_key(part_sections[0]):
+            prev, cont = sections[-1], part_sections.pop(0)
+            prev_content = prev.get("content") or ""
+            cont_content = cont.get("content") or ""
+            if cont_content and cont_content not in prev_content:
+                prev["content"] = f"{prev_content}\n{cont_content}".strip()
+            prev["footnotes"] = _dedupe((prev.get("footnotes") or []) + (cont.get("footnotes") or []), _canonical)
+        sections.extend(part_sections)
+
+    def collect(field):
+        items = []
+        for part in parts:
+            value = part.get(field) or []
+            if isinstance(value, list):
+                items.extend(value)
+        return items
+
+    merged = {
+        "summary": "",
+        "referenced_acts": _dedupe(
+            [r for r in collect("referenced_acts") if isinstance(r, str)], lambda r: r.strip().casefold()
+        ),
+        "sections": sections,
+        "amendments": _dedupe(collect("amendments"), _canonical),
+        "entities": _dedupe(
+            [e for e in collect("entities") if isinstance(e, dict)],
+            lambda e: (str(e.get("entity_name", "")).strip().casefold(), e.get("entity_type"))
+        ),
+        "category": None,
+        "sub_category": None,
+        "meeting_details": _dedupe(collect("meeting_details"), _canonical),
+        "board_members": _dedupe(collect("board_members"), _canonical),
+    }
+
+    overview = overview or {}
+    summaries = [p.get("summary") for p in parts if p.get("summary")]
+    merged["summary"] = overview.get("summary") or (summaries[0] if summaries else "")
+
+    categories = [p.get("category") for p in parts if p.get("category")]
+    if overview.get("category"):
+        merged["category"] = overview["category"]
+        merged["sub_category"] = overview.get("sub_category")
+    elif categories:
+        # Majority vote; ties go to the earliest chunk
+        counts = Counter(categories)
+        best = max(counts.values())
+        merged["category"] = next(c for c in categories if counts[c] == best)
+        merged["sub_category"] = next(
+            (p.get("sub_category") for p in parts if p.get("category") == merged["category"]), None
+        )
+    return merged
+
+
+def _json_config(max_output_tokens: int):
+    from google.genai import types
+
+    return types.GenerateContentConfig(response_mime_type="application/json", max_output_tokens=max_output_tokens)
+
+
+def _truncated(response) -> bool:
+    """True if generation stopped at max_output_tokens."""
+    candidates = getattr(response, "candidates", None) or []
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    return getattr(reason, "name", reason) == "MAX_TOKENS"
+
+
+def _parse_json(text: str, label: str) -> dict:
+    """The JSON object in text; ValueError (never a repair) if it is malformed or not an object."""
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON for {label}: {e}") from e
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object for {label}")
+    return data
+
+
+def analyze_chunked(doc_path: Path, api_key: str) -> dict:
+    """
+    Map-reduce base analysis: one extraction call per chunk, run in
+    parallel and merged, then a text-only overview call over the chunk
+    summaries. Truncated chunks are re-split (split_chunk) down to single
+    pages; a page that still cannot be analyzed is left out with a warning
+    instead of failing the other chunks. Returns the same shape as
+    analyze_base.
+    """
+    from pylegislation.research.analyze import build_base_prompt, strip_code_fence, usage_tokens
+    from pylegislation.research.categorize import DOMAIN_KEYWORDS
+    from pylegislation.research.gemini import generate_with_document, get_client, MODEL
+
+    json_config = _json_config(CHUNK_MAX_OUTPUT_TOKENS)
+    base_prompt = build_base_prompt()
+
+    with tempfile.TemporaryDirectory(prefix="chunks-") as tmp:
+        out_dir = Path(tmp)
+        chunks = split_html(doc_path, out_dir) if _is_html(doc_path) else split_pdf(doc_path, out_dir, CHUNK_PAGES)
+        print(f"Running chunked analysis of {doc_path.name} in {len(chunks)} parts...", file=sys.stderr)
+
+        def run_chunk(index: int, chunk_path: Path, span: str) -> dict:
+            """{'parts', 'input_tokens', 'output_tokens', 'upload_hits', 'skipped'} for one chunk (and its halves)."""
+            preface = CHUNK_PREFACE.format(part=index + 1, total=len(chunks), span=span)
+            response, cache_hit = generate_with_document(api_key, chunk_path, preface + base_prompt, config=json_config)
+            tokens_in, tokens_out = usage_tokens(response)
+            result = {"parts": [], "input_tokens": tokens_in, "output_tokens": tokens_out,
+                      "upload_hits": [cache_hit], "skipped": []}
+            try:
+                if _truncated(response):
+                    raise ValueError(f"output for {span} reached {CHUNK_MAX_OUTPUT_TOKENS} tokens")
+                result["parts"].append(_parse_json(strip_code_fence(response.text), span))
+                return result
+            except ValueError as e:
+                halves = split_chunk(chunk_path, span, out_dir)
+                if not halves:
+                    print(f"WARN: Leaving {span} of {doc_path.name} out of the analysis: {e}", file=sys.stderr)
+                    result["skipped"].append(span)
+                    return result
+                print(f"INFO: Re-splitting {span} of {doc_path.name} ({e})", file=sys.stderr)
+            for half_path, half_span in halves:
+                half = run_chunk(index, half_path, half_span)
+                for key in ("parts", "upload_hits", "skipped"):
+                    result[key].extend(half[key])
+                result["input_tokens"] += half["input_tokens"]
+                result["output_tokens"] += half["output_tokens"]
+            return result
+
+        with ThreadPoolExecutor(max_workers=CHUNK_WORKERS, thread_name_prefix="chunk") as executor:
+            chunk_results = list(executor.map(lambda args: run_chunk(*args),
+                                              [(i, path, span) for i, (path, span) in enumerate(chunks)]))
+
+    parts = [part for result in chunk_results for part in result["parts"]]
+    input_tokens = sum(result["input_tokens"] for result in chunk_results)
+    output_tokens = sum(result["output_tokens"] for result in chunk_results)
+    upload_hits = [hit for result in chunk_results for hit in result["upload_hits"]]
+    skipped = [span for result in chunk_results for span in result["skipped"]]
+    if not parts:
+        raise ValueError(f"No part of {doc_path.name} could be analyzed")
+
+    overview = None
+    summaries = [p.get("summary") for p in parts if isinstance(p.get("summary"), str) and p.get("summary")]
+    if len(summaries) > 1:
+        prompt = OVERVIEW_PROMPT.format(
+            categories=list(DOMAIN_KEYWORDS.keys()),
+            summaries="\n".join(f"Part {i}: {summary}" for i, summary in enumerate(summaries, start=1)),
+        )
+        try:
+            response = get_client(api_key).models.generate_content(
+                model=MODEL, contents=[prompt], config=_json_config(OVERVIEW_MAX_OUTPUT_TOKENS))
+            tokens_in, tokens_out = usage_tokens(response)
+            input_tokens += tokens_in
+            output_tokens += tokens_out
+            overview = _parse_json(strip_code_fence(response.text), "overview")
+        except Exception as e:
+            # First chunk summary and majority category are an acceptable fallback
+            print(f"WARN: Overview call failed for {doc_path.name}: {e}", file=sys.stderr)
+
+    merged = merge_chunk_results(parts, overview)
+    pdf_hits = [h for h in upload_hits if h is not None]
+    return {
+        "text": json.dumps(merged),
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "model": MODEL,
+        "upload_cache_hit": all(pdf_hits) if pdf_hits else None,
+        "chunks": len(chunks),
+        "skipped_spans": skipped
+    }
@@ -0,0 +1,333 @@
+import difflib
+import re
+import sys
+import threading
+import weakref
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pylegislation.research.title_index import TitleIndex, normalize_title
+
+# Cross-act citation graph.
+#
+# Analyses list the acts they reference by title ("Inland Revenue Act, No.
+# 24 of 2017"); AnalysisReference holds those titles (see structured.py).
+# CitationResolver maps each title to an ActMetadata row and the result is
+# stored as ActCitation edges, rewritten whenever an analysis is saved or
+# restored. Titles that match nothing stay as unresolved edges and are
+# retried when the act catalogue changes. Acts are only ever appended, so
+# the cached resolver is extended with new rows rather than rebuilt, and
+# only the unresolved titles the new acts could match are re-resolved.
+
+# A number/year match also needs the names to agree this much (guards
+# against a misread number)
+NUMBER_NAME_CUTOFF = 0.6
+# Fuzzy fallback: stricter than duplicate detection, a wrong edge is worse than none
+FUZZY_CUTOFF = 0.85
+# References read per round trip
+RESOLVE_CHUNK = 500
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+_ACT_NUMBER = re.compile(r"\bno\.?\s*(\d+)\s*(?:of|ot)\s*(\d{4})\b", re.IGNORECASE)
+_DOC_NUMBER = re.compile(r"(\d+)\s*/\s*(\d{4})")  # ActMetadata.doc_number "26/2025"
+_NUM = re.compile(r"-(\d+)-(\d{4})-[a-z]+$")  # ActMetadata.num "2025-12-26-26-2025-en"
+_SUFFIX = re.compile(r"\s+(?:act|law|ordinance)$")
+
+
+def title_key(title: str) -> str:
+    """Normalized act name without a trailing Act/Law/Ordinance ("Companies Act" -> "companies")."""
+    return _SUFFIX.sub("", normalize_title(title))
+
+
+def parse_reference(title: str) -> Tuple[str, Optional[int], Optional[str]]:
+    """(name key, act number, year) of a referenced title; number and year are None if not stated."""
+    match = _ACT_NUMBER.search(title)
+    if not match:
+        return title_key(title), None, None
+    return title_key(title[:match.start()]), int(match.group(1)), match.group(2)
+
+
+def act_number(doc_number: Optional[str], num: Optional[str]) -> Tuple[Optional[int], Optional[str]]:
+    match = _DOC_NUMBER.search(doc_number or "") or _NUM.search(num or "")
+    return (int(match.group(1)), match.group(2)) if match else (None, None)
+
+
+def _is_amendment(key: str) -> bool:
+    return "amendment" in key.split()
+
+
+class CitationResolver:
+    """
+    Resolves referenced titles against a snapshot of the act catalogue:
+    1. "No. N of YYYY" -> the act with that number and year (if the names agree)
+    2. exact normalized name, restricted to the stated year if any
+    3. fuzzy name match (trigram candidates, SequenceMatcher ratio), never
+       crossing between principal acts and amendments
+    """
+
+    def __init__(self, acts: Iterable[tuple]):
+        self._key: Dict[str, str] = {}
+        self._year: Dict[str, str] = {}
+        self._by_key: Dict[str, List[str]] = defaultdict(list)
+        self._by_number: Dict[tuple, List[str]] = defaultdict(list)
+        self._fuzzy = TitleIndex()
+        for act in acts:
+            self.add(*act)
+
+    def add(self, doc_id: str, description: Optional[str], year: Optional[str], doc_number: Optional[str],
+            num: Optional[str]):
+        """Adds one ActMetadata row (doc_id, description, year, doc_number, num)."""
+        if doc_id in self._key:
+            return
+        key = title_key(description or "")
+        number, number_year = act_number(doc_number, num)
+        self._key[doc_id] = key
+        self._year[doc_id] = number_year or year
+        self._by_key[key].append(doc_id)
+        if number is not None:
+            self._by_number[(number, number_year)].append(doc_id)
+        if key:
+            self._fuzzy.add(doc_id, key)
+
+    def resolve(self, title: str) -> Tuple[Optional[str], Optional[str], Optional[float]]:
+        """(doc_id, method, score); doc_id is None if unresolved, with method "ambiguous" if several acts fit."""
+        key, number, year = parse_reference(title)
+        if number is not None:
+            best = None
+            for doc_id in self._by_number.get((number, year), ()):
+                score = 1.0 if self._key[doc_id] == key else \
+                    difflib.SequenceMatcher(None, key, self._key[doc_id]).ratio()
+                if score >= NUMBER_NAME_CUTOFF and (best is None or score > best[1]):
+                    best = (doc_id, score)
+            if best:
+                return best[0], "number", round(best[1], 4)
+        if not key:
+            return None, None, None
+
+        candidates, method, score = self._by_key.get(key, []), "title", 1.0
+        if not candidates:
+            matches = [m for m in self._fuzzy.query(key, cutoff=FUZZY_CUTOFF)
+                       if _is_amendment(m["title"]) == _is_amendment(key)]
+            if matches:
+                candidates, method, score = self._by_key[matches[0]["title"]], "fuzzy", round(matches[0]["score"], 4)
+        if year:
+            # A stated year that no candidate has means the cited act is not in the catalogue
+            candidates = [doc_id for doc_id in candidates if self._year[doc_id] == year]
+        if len(candidates) == 1:
+            return candidates[0], method, score
+        return None, ("ambiguous" if candidates else None), None
+
+
+_resolvers = weakref.WeakKeyDictionary()
+_resolvers_lock = threading.Lock()
+
+_ACT_ROWS = "SELECT doc_id, description, year, doc_number, num FROM actmetadata"
+
+
+def _catalogue_state(conn) -> Tuple[int, int]:
+    from sqlalchemy import text
+
+    # Act rows are insert-only, so count + max rowid changes whenever the catalogue does
+    count, max_rowid = conn.execute(text("SELECT count(*), max(rowid) FROM actmetadata")).one()
+    return count, max_rowid or 0
+
+
+def _version_rowid(version: str) -> int:
+    """The max rowid a catalogue version was taken at (0 if unknown)."""
+    try:
+        return int(version.rsplit(":", 1)[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def get_resolver(conn) -> Tuple[str, CitationResolver]:
+    """
+    (catalogue version, resolver) for conn's database. When acts were only
+    appended since the cached version the resolver is extended with them;
+    otherwise it is rebuilt.
+    """
+    from sqlalchemy import text
+
+    count, max_rowid = _catalogue_state(conn)
+    version = f"{count}:{max_rowid}"
+    with _resolvers_lock:
+        cached = _resolvers.get(conn.engine)
+        if cached and cached[0] == version:
+            return cached
+        if cached:
+            cached_count, cached_rowid = map(int, cached[0].split(":"))
+            if cached_count < count and cached_rowid < max_rowid:
+                rows = conn.execute(text(_ACT_ROWS + " WHERE rowid > :rowid"), {"rowid": cached_rowid}).all()
+                if cached_count + len(rows) == count:
+                    resolver = cached[1]
+                    for row in rows:
+                        resolver.add(*row)
+                    cached = _resolvers[conn.engine] = (version, resolver)
+                    return cached
+        cached = _resolvers[conn.engine] = (version, CitationResolver(conn.execute(text(_ACT_ROWS)).all()))
+        return cached
+
+
+def _edge(source_doc_id: str, position: int, title: str, version: str, resolved: tuple) -> dict:
+    target, method, score = resolved
+    if target == source_doc_id:
+        target, method, score = None, "self", None
+    return {
+        "source_doc_id": source_doc_id, "position": position, "referenced_title": title,
+        "target_doc_id": target, "method": method, "score": score, "catalogue_version": version,
+    }
+
+
+def index_citations(conn, doc_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Replaces the citation edges of the given acts (all acts with None) from
+    their extracted references, inside conn's transaction. Returns the
+    number of edges written.
+    """
+    from sqlalchemy import insert, text
+    from pylegislation.research.db import ActCitation
+
+    table = ActCitation.__table__
+    version, resolver = get_resolver(conn)
+    resolved = {}
+    if doc_ids is None:
+        conn.execute(table.delete())
+        batches = [None]
+    else:
+        doc_ids = list(dict.fromkeys(doc_ids))
+        batches = [doc_ids[i:i + RESOLVE_CHUNK] for i in range(0, len(doc_ids), RESOLVE_CHUNK)]
+
+    written = 0
+    for batch in batches:
+        sql = "SELECT doc_id, position, title FROM analysisreference"
+        params = {}
+        if batch is not None:
+            conn.execute(table.delete().where(table.c.source_doc_id.in_(batch)))
+            params = {f"d{i}": doc_id for i, doc_id in enumerate(batch)}
+            sql += f" WHERE doc_id IN ({', '.join(':' + name for name in params)})"
+        edges = []
+        for doc_id, position, title in conn.execute(text(sql), params).all():
+            if title not in resolved:
+                resolved[title] = resolver.resolve(title)
+            edges.append(_edge(doc_id, position, title, version, resolved[title]))
+        if edges:
+            conn.execute(insert(table), edges)
+            written += len(edges)
+    return written
+
+
+def resolve_pending(conn) -> int:
+    """
+    Retries unresolved edges last resolved against an older catalogue.
+    Only titles that one of the acts added since could match are resolved
+    again; the rest are just stamped with the current version. Returns how
+    many now resolve.
+    """
+    from sqlalchemy import text
+
+    version, resolver = get_resolver(conn)
+    pending = conn.execute(text("""
+        SELECT source_doc_id, position, referenced_title, method, catalogue_version FROM actcitation
+        WHERE target_doc_id IS NULL AND method IS NOT 'self' AND catalogue_version != :version
+    """), {"version": version}).all()
+    if not pending:
+        return 0
+    # Acts added after the oldest pending version; a title none of them
+    # matches (not even ambiguously) resolves exactly as before
+    since = min(_version_rowid(row[4]) for row in pending)
+    added = CitationResolver(conn.execute(text(_ACT_ROWS + " WHERE rowid > :rowid"), {"rowid": since}).all())
+    resolved, updates = {}, []
+    for source_doc_id, position, title, method, _ in pending:
+        if title not in resolved:
+            resolved[title] = resolver.resolve(title) if added.resolve(title)[1] else None
+        if resolved[title] is None:
+            updates.append({"source_doc_id": source_doc_id, "position": position, "target_doc_id": None,
+                            "method": method, "score": None, "catalogue_version": version})
+        else:
+            updates.append(_edge(source_doc_id, position, title, version, resolved[title]))
+    conn.execute(text("""
+        UPDATE actcitation SET target_doc_id = :target_doc_id, method = :method, score = :score,
+            catalogue_version = :catalogue_version
+        WHERE source_doc_id = :source_doc_id AND position = :position
+    """), updates)
+    return sum(1 for edge in updates if edge["target_doc_id"])
+
+
+def sync_citations(engine=None) -> int:
+    """
+    Builds edges for references that have none yet (backfill) or changed,
+    and retries unresolved edges if acts were added since. Returns the
+    number of edges written or newly resolved.
+    """
+    if engine is None:
+        from pylegislation.research.db import engine
+
+    with engine.begin() as conn:
+        stale = [row[0] for row in conn.exec_driver_sql("""
+            SELECT r.doc_id FROM analysisreference AS r
+            LEFT JOIN actcitation AS c ON c.source_doc_id = r.doc_id AND c.position = r.position
+            WHERE c.referenced_title IS NOT r.title
+            UNION
+            SELECT c.source_doc_id FROM actcitation AS c
+            LEFT JOIN analysisreference AS r ON r.doc_id = c.source_doc_id AND r.position = c.position
+            WHERE r.doc_id IS NULL
+        """)]
+        written = index_citations(conn, stale) if stale else 0
+        resolved = resolve_pending(conn)
+    if written or resolved:
+        print(f"Citation graph: {written} edges rebuilt, {resolved} references newly resolved", file=sys.stderr)
+    return written + resolved
+
+
+def resolve_new_acts(engine=None) -> int:
+    """
+    After acts were added: resolves the unresolved references that name
+    them (see resolve_pending). Cheaper than sync_citations, which also
+    looks for changed references. Returns how many now resolve.
+    """
+    if engine is None:
+        from pylegislation.research.db import engine
+
+    with engine.begin() as conn:
+        resolved = resolve_pending(conn)
+    if resolved:
+        print(f"Citation graph: {resolved} references newly resolved", file=sys.stderr)
+    return resolved
+
+
+# --- Queries ---
+
+def get_citations(engine, doc_id: str) -> List[dict]:
+    """Acts cited by doc_id's analysis, in referenced_acts order (unresolved titles have doc_id None)."""
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT c.position, c.referenced_title, c.target_doc_id, m.description, m.year, c.method, c.score
+            FROM actcitation AS c LEFT JOIN actmetadata AS m ON m.doc_id = c.target_doc_id
+            WHERE c.source_doc_id = :doc_id ORDER BY c.position
+        """), {"doc_id": doc_id}).all()
+    return [
+        {"position": position, "referenced_title": referenced, "doc_id": target, "title": title, "year": year,
+         "method": method, "score": score}
+        for position, referenced, target, title, year, method, score in rows
+    ]
+
+
+def get_cited_by(engine, doc_id: str, limit: int = DEFAULT_LIMIT, offset: int = 0) -> List[dict]:
+    """Analysed acts whose referenced_acts resolve to doc_id, in doc_id order."""
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        rows = conn.execute(text("""
+            SELECT c.source_doc_id, m.description, m.year, c.referenced_title, c.method, c.score
+            FROM actcitation AS c LEFT JOIN actmetadata AS m ON m.doc_id = c.source_doc_id
+            WHERE c.target_doc_id = :doc_id ORDER BY c.source_doc_id, c.position
+            LIMIT :limit OFFSET :offset
+        """), {"doc_id": doc_id, "limit": max(1, min(limit, MAX_LIMIT)), "offset": max(0, offset)}).all()
+    return [
+        {"doc_id": source, "title": title, "year": year, "referenced_title": referenced, "method": method,
+         "score": score}
+        for source, title, year, referenced, method, score in rows
+    ]
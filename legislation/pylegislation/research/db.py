@@ -2,6 +2,7 @@ from datetime import datetime
 from typing import Optional
 from sqlmodel import Field, SQLModel, create_engine, Session, select, func
 from pathlib import Path
+from sqlalchemy import Index, event, inspect
 
 import os
 
@@ -11,50 +12,283 @@ sqlite_file_name = "research.db"
 BASE_DIR = Path(__file__).parent.parent.parent
 sqlite_url = f"sqlite:///{BASE_DIR}/data/{sqlite_file_name}"
 
-engine = create_engine(sqlite_url)
+# Storage profiles: PRAGMAs applied to every new SQLite connection.
+# "production" suits the API server (concurrent readers with one writer);
+# "legacy" keeps SQLite's defaults (rollback journal, synchronous=FULL).
+STORAGE_PROFILES = {
+    "legacy": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,           # ms to wait for the write lock instead of failing
+        "cache_size": -64000,           # negative = KiB, i.e. ~64 MB page cache
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+STORAGE_PROFILE = os.environ.get("RESEARCH_DB_PROFILE", "production")
+
+def apply_storage_profile(target_engine, profile: str = STORAGE_PROFILE):
+    """Registers a connect hook that applies the profile's PRAGMAs."""
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile {profile!r}; choose from {', '.join(STORAGE_PROFILES)}")
+    pragmas = STORAGE_PROFILES[profile]
+    if not pragmas:
+        return target_engine
+
+    @event.listens_for(target_engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return target_engine
+
+engine = apply_storage_profile(create_engine(sqlite_url))
 
 def create_db_and_tables():
     # Ensure data dir exists
     (BASE_DIR / "data").mkdir(parents=True, exist_ok=True)
-    SQLModel.metadata.create_all(engine)
+    init_schema(engine)
+
+def init_schema(target_engine):
+    """Creates/upgrades all tables, indexes and triggers on target_engine."""
+    SQLModel.metadata.create_all(target_engine)
+    # Before upgrade_schema: rebuilds tables whose indexes it would create
+    from pylegislation.research.blobs import migrate_inline_content
+    migrate_inline_content(target_engine)
+    upgrade_schema(target_engine)
+    from pylegislation.research.search import ensure_search_index
+    ensure_search_index(target_engine)
+    from pylegislation.research.structured import sync_structured
+    sync_structured(target_engine)
+    from pylegislation.research.citations import sync_citations
+    sync_citations(target_engine)
+    from pylegislation.research.telemetry import ensure_telemetry_rollups
+    ensure_telemetry_rollups(target_engine)
+    with target_engine.connect() as conn:
+        # Refresh query planner statistics (cheap; only analyzes tables that need it)
+        conn.exec_driver_sql("PRAGMA optimize")
+
+def upgrade_schema(target_engine=None):
+    """
+    Adds columns and indexes introduced after a table was first created.
+    create_all() only creates missing tables, so older research.db files
+    need nullable columns and new indexes added in place.
+    """
+    target_engine = target_engine or engine
+    inspector = inspect(target_engine)
+    with target_engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=target_engine.dialect)
+                conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {col_type}')
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
 def get_session():
     with Session(engine) as session:
         yield session
 
 # Export for use
-__all__ = ["TelemetryLog", "ActMetadata", "ActAnalysis", "AnalysisHistory", "engine", "create_db_and_tables", "Session", "select", "func"]
+__all__ = ["TelemetryLog", "TelemetryRollup", "ActMetadata", "ActAnalysis", "AnalysisHistory", "AnalysisBlob", "AnalysisOutline", "AnalysisSection", "AnalysisEntity", "AnalysisBoardMember", "AnalysisMeeting", "AnalysisReference", "ActCitation", "StoredDocument", "DumpRestore", "AnalysisJob", "AnalysisLease", "BatchRun", "BatchItem", "engine", "create_db_and_tables", "Session", "select", "func"]
 
 # Models
 
 class TelemetryLog(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     doc_id: str = Field(index=True)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=datetime.utcnow, index=True)
     model: str
     input_tokens: int
     output_tokens: int
     latency_ms: int
     status: str # "SUCCESS" or "FAIL"
     cost_usd: Optional[float] = None
+    # Gemini uploaded-file reuse for this request (see gemini.py)
+    upload_cache_hits: Optional[int] = None
+    upload_cache_misses: Optional[int] = None
+
+class TelemetryRollup(SQLModel, table=True):
+    # Per (UTC day, model) aggregates of TelemetryLog, maintained by an SQL
+    # trigger on insert (see telemetry.py)
+    day: str = Field(primary_key=True) # YYYY-MM-DD
+    model: str = Field(primary_key=True)
+    requests: int = 0
+    failures: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    latency_sum_ms: int = 0
+    latency_max_ms: int = 0
+    # JSON array of counts per telemetry.LATENCY_BUCKETS_MS bucket (+ overflow)
+    latency_histogram: str = "[]"
+    upload_cache_hits: int = 0
+    upload_cache_misses: int = 0
 
 class ActAnalysis(SQLModel, table=True):
     doc_id: str = Field(primary_key=True)
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     model: str
-    # Storing the full JSON result as a string/text blob
-    content_json: str
+    # The full JSON result, stored in AnalysisBlob (see blobs.py)
+    content_sha256: str
     # We can separate base tokens schema if needed, but keeping it simple for now
+
+class AnalysisBlob(SQLModel, table=True):
+    # Content-addressed analysis payloads shared by ActAnalysis and AnalysisHistory (see blobs.py)
+    sha256: str = Field(primary_key=True)
+    codec: str = "zlib" # "zlib" or "raw"
+    size: int # uncompressed UTF-8 bytes
+    data: bytes
     
 class AnalysisHistory(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     doc_id: str = Field(index=True)
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     prompt: str
-    response: str
+    # Response text, stored in AnalysisBlob (see blobs.py)
+    response_sha256: str
     # We could store model used here too if needed, but keeping it simple
     model: str = "gemini-2.0-flash"
 
+    # History of an act, newest first
+    __table_args__ = (Index("ix_analysishistory_doc_id_timestamp", "doc_id", "timestamp"),)
+
+# Normalized copies of parts of the base analysis JSON (see structured.py).
+# *_key columns hold the casefolded, whitespace-collapsed value for lookups.
+
+class AnalysisOutline(SQLModel, table=True):
+    # One row per extracted analysis; content_sha256 is the blob it came from
+    doc_id: str = Field(primary_key=True)
+    content_sha256: str
+    category: Optional[str] = Field(default=None, index=True)
+    sub_category: Optional[str] = None
+    section_count: int = 0
+    entity_count: int = 0
+    board_member_count: int = 0
+    meeting_count: int = 0
+    referenced_act_count: int = 0
+
+class AnalysisSection(SQLModel, table=True):
+    doc_id: str = Field(primary_key=True)
+    position: int = Field(primary_key=True)
+    section_number: Optional[str] = None
+    content: str
+    # JSON list; section lookups ("5A of act X") go through the (doc_id, position) key
+    footnotes_json: str = "[]"
+
+class AnalysisEntity(SQLModel, table=True):
+    doc_id: str = Field(primary_key=True)
+    position: int = Field(primary_key=True)
+    entity_name: str
+    name_key: str
+    entity_type: Optional[str] = None
+    excerpt: Optional[str] = None
+
+    # Acts mentioning an entity; entity directory by type
+    __table_args__ = (
+        Index("ix_analysisentity_name_key_doc_id", "name_key", "doc_id"),
+        Index("ix_analysisentity_entity_type_name_key", "entity_type", "name_key"),
+    )
+
+class AnalysisBoardMember(SQLModel, table=True):
+    doc_id: str = Field(primary_key=True)
+    position: int = Field(primary_key=True)
+    role_name: Optional[str] = None
+    role_key: Optional[str] = None
+    appointing_authority: Optional[str] = None
+    removal_criteria: Optional[str] = None
+    composition_criteria: Optional[str] = None
+    excerpt: Optional[str] = None
+
+    __table_args__ = (Index("ix_analysisboardmember_role_key_doc_id", "role_key", "doc_id"),)
+
+class AnalysisMeeting(SQLModel, table=True):
+    doc_id: str = Field(primary_key=True)
+    position: int = Field(primary_key=True)
+    description: Optional[str] = None
+    frequency: Optional[str] = None
+    frequency_key: Optional[str] = None
+    location: Optional[str] = None
+    time: Optional[str] = None
+    excerpt: Optional[str] = None
+
+    __table_args__ = (Index("ix_analysismeeting_frequency_key_doc_id", "frequency_key", "doc_id"),)
+
+class AnalysisReference(SQLModel, table=True):
+    # One entry of an analysis's referenced_acts
+    doc_id: str = Field(primary_key=True)
+    position: int = Field(primary_key=True)
+    title: str
+    title_key: str
+
+    # Acts referencing a title
+    __table_args__ = (Index("ix_analysisreference_title_key_doc_id", "title_key", "doc_id"),)
+
+class ActCitation(SQLModel, table=True):
+    # Citation graph edge: entry `position` of the source analysis's
+    # referenced_acts, resolved to an act in the catalogue (see citations.py)
+    source_doc_id: str = Field(primary_key=True)
+    position: int = Field(primary_key=True)
+    referenced_title: str
+    target_doc_id: Optional[str] = None # None while unresolved
+    method: Optional[str] = None # "number", "title", "fuzzy"; or why unresolved: "ambiguous", "self"
+    score: Optional[float] = None
+    # ActMetadata (count, max rowid) the title was resolved against
+    catalogue_version: str = ""
+
+    # Reverse lookups ("which acts cite this one")
+    __table_args__ = (Index("ix_actcitation_target_doc_id_source_doc_id", "target_doc_id", "source_doc_id"),)
+
+class AnalysisJob(SQLModel, table=True):
+    # Queued /analyze requests (see jobs.py). API keys are never persisted.
+    id: str = Field(primary_key=True)
+    doc_id: str = Field(index=True)
+    status: str = Field(default="QUEUED", index=True) # QUEUED, RUNNING, SUCCESS, FAIL
+    custom_prompt: Optional[str] = None
+    force_refresh: bool = False
+    fetch_only: bool = False
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    # The result lives in AnalysisBlob: the base analysis and the custom answer, if any
+    content_sha256: Optional[str] = None
+    answer_sha256: Optional[str] = None
+    error: Optional[str] = None
+
+class AnalysisLease(SQLModel, table=True):
+    # Cross-process single-flight lease for a running base analysis (see singleflight.py)
+    key: str = Field(primary_key=True)
+    owner: str
+    expires_at: datetime
+
+class BatchRun(SQLModel, table=True):
+    # `legislation research analyze-batch` checkpoints (see batch.py)
+    id: str = Field(primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    status: str = "RUNNING" # RUNNING, DONE
+    params_json: str = "{}"
+
+class BatchItem(SQLModel, table=True):
+    run_id: str = Field(primary_key=True)
+    doc_id: str = Field(primary_key=True)
+    status: str = Field(default="PENDING", index=True) # PENDING, SUCCESS, SKIPPED, FAIL
+    error: Optional[str] = None
+    input_tokens: int = 0
+    output_tokens: int = 0
+    latency_ms: int = 0
+    finished_at: Optional[datetime] = None
+
+    # Pending/failed items of one run (resume)
+    __table_args__ = (Index("ix_batchitem_run_id_status", "run_id", "status"),)
+
 class ActMetadata(SQLModel, table=True):
     doc_id: str = Field(primary_key=True)
     doc_type: str
@@ -67,3 +301,35 @@ class ActMetadata(SQLModel, table=True):
     doc_number: Optional[str] = None
     domain: Optional[str] = None
     year: str
+
+    # Filter column + doc_id: serves the /acts filters in keyset (doc_id) order
+    __table_args__ = (
+        Index("ix_actmetadata_domain_doc_id", "domain", "doc_id"),
+        Index("ix_actmetadata_year_doc_id", "year", "doc_id"),
+        Index("ix_actmetadata_doc_type_doc_id", "doc_type", "doc_id"),
+        Index("ix_actmetadata_lang_doc_id", "lang", "doc_id"),
+    )
+
+class StoredDocument(SQLModel, table=True):
+    # doc_id -> content hash index for the local document store (see documents.py)
+    doc_id: str = Field(primary_key=True)
+    sha256: str = Field(index=True)
+    suffix: str = ".pdf"
+    url: str
+    size: int
+    content_type: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: datetime = Field(default_factory=datetime.utcnow)
+    checked_at: datetime = Field(default_factory=datetime.utcnow)
+    last_accessed: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class DumpRestore(SQLModel, table=True):
+    # Dump files restored into this database (see dump.py), so startup can skip them
+    sha256: str = Field(primary_key=True)
+    file: str = Field(index=True)
+    size: int
+    mtime_ns: int
+    # Table row counts right after the restore (JSON)
+    counts_json: str = "{}"
+    restored_at: datetime = Field(default_factory=datetime.utcnow)
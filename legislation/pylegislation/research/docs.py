@@ -1,15 +1,26 @@
 import os
 import json
-import glob
 import csv
 from pathlib import Path
 from pylegislation.utils import find_project_root
+from pylegislation.research.dump import content_text, dump_dir_paths, iter_dump_records
 
-def get_latest_dump(dump_dir):
-    list_of_files = glob.glob(os.path.join(dump_dir, '*.json'))
-    if not list_of_files:
-        return None
-    return max(list_of_files, key=os.path.getctime)
+def read_dumped_analyses(dump_dir):
+    """Latest act_analysis row per doc_id across the dump directory's full dump and deltas."""
+    analyses = {}
+    texts = {}
+    for path in dump_dir_paths(Path(dump_dir)):
+        print(f"Reading dump: {path}")
+        for table, item in iter_dump_records(path):
+            if table == "content":
+                texts[item["sha256"]] = content_text(item)
+            elif table == "act_analysis":
+                analyses[item.get("doc_id")] = item
+    for item in analyses.values():
+        # v3 dumps reference the analysis text by hash
+        if "content_json" not in item:
+            item["content_json"] = texts.get(item.get("content_sha256"), "{}")
+    return list(analyses.values())
 
 def format_title(doc_id):
     return doc_id.replace("-", " ").title()
@@ -36,16 +47,12 @@ def update_docs_data():
     output_all_acts = output_dir / "all_acts.json"
 
     # 1. Process Dump (Analyzed Acts)
-    latest_dump = get_latest_dump(dump_dir)
+    dumped_analyses = read_dumped_analyses(dump_dir) if dump_dir.exists() else []
     analyzed_ids = set()
     
-    if latest_dump:
-        print(f"Reading dump: {latest_dump}")
-        with open(latest_dump, "r") as f:
-            data = json.load(f)
-
+    if dumped_analyses:
         acts_list = []
-        for item in data.get("act_analysis", []):
+        for item in dumped_analyses:
             try:
                 content = json.loads(item.get("content_json", "{}"))
                 doc_id = item.get("doc_id")
@@ -0,0 +1,319 @@
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from pylegislation.research.db import BASE_DIR
+
+# Local, content-addressed store for act PDFs/HTML.
+# Objects live at data/documents/objects/<sha[:2]>/<sha><suffix>; the
+# doc_id -> sha256 index (plus validators and LRU bookkeeping) is the
+# StoredDocument table.
+STORE_DIR = BASE_DIR / "data/documents"
+MAX_STORE_BYTES = 2 * 1024 ** 3
+REVALIDATE_AFTER = timedelta(hours=24)
+# Don't write last_accessed more often than this per document
+ACCESS_TOUCH_INTERVAL = timedelta(minutes=1)
+REQUEST_TIMEOUT = (10, 60)  # (connect, read) seconds
+BASE_DOMAIN = "https://documents.gov.lk"
+
+_http_session = None
+_http_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """Process-wide pooled session for upstream document requests."""
+    global _http_session
+    if _http_session is None:
+        with _http_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=2)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _http_session = session
+    return _http_session
+
+
+def resolve_url(url: str) -> str:
+    """Expands site-relative document URLs found in the TSV."""
+    if url.startswith('/'):
+        return BASE_DOMAIN + url
+    return url
+
+
+def infer_suffix(url: str) -> str:
+    lowered = url.lower()
+    if lowered.endswith('.html') or lowered.endswith('.htm'):
+        return '.html'
+    return '.pdf'
+
+
+class DocumentStore:
+    """
+    Content-addressed document cache with conditional revalidation
+    (ETag / Last-Modified) and a size cap enforced by LRU eviction.
+    """
+
+    def __init__(self, root: Path = STORE_DIR, max_bytes: int = MAX_STORE_BYTES,
+                 revalidate_after: timedelta = REVALIDATE_AFTER):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+
+    def object_path(self, sha256: str, suffix: str) -> Path:
+        return self.root / "objects" / sha256[:2] / f"{sha256}{suffix}"
+
+    # -- Local reads --
+
+    def lookup(self, doc_id: str):
+        """Returns the StoredDocument entry if its object is on disk, else None."""
+        from pylegislation.research.db import Session, engine, StoredDocument
+
+        with Session(engine) as session:
+            entry = session.get(StoredDocument, doc_id)
+            if not entry or not self.object_path(entry.sha256, entry.suffix).exists():
+                return None
+            now = datetime.utcnow()
+            if now - entry.last_accessed > ACCESS_TOUCH_INTERVAL:
+                entry.last_accessed = now
+                session.add(entry)
+                session.commit()
+                session.refresh(entry)
+            session.expunge(entry)
+            return entry
+
+    def get_path(self, doc_id: str) -> Optional[Path]:
+        """Local copy of a document, without contacting upstream."""
+        entry = self.lookup(doc_id)
+        if not entry:
+            return None
+        return self.object_path(entry.sha256, entry.suffix)
+
+    def is_fresh(self, entry) -> bool:
+        return datetime.utcnow() - entry.checked_at < self.revalidate_after
+
+    # -- Writes --
+
+    def _ingest(self, tmp_path: Path, sha256: str, suffix: str) -> Path:
+        target = self.object_path(sha256, suffix)
+        if target.exists():
+            tmp_path.unlink()
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, target)
+        return target
+
+    def _save_entry(self, doc_id: str, url: str, sha256: str, suffix: str, size: int,
+                    content_type: Optional[str] = None, etag: Optional[str] = None,
+                    last_modified: Optional[str] = None):
+        from pylegislation.research.db import Session, engine, StoredDocument
+
+        now = datetime.utcnow()
+        with Session(engine) as session:
+            entry = session.get(StoredDocument, doc_id)
+            previous = (entry.sha256, entry.suffix) if entry else None
+            if not entry:
+                entry = StoredDocument(doc_id=doc_id, sha256=sha256, url=url, size=size)
+            entry.sha256 = sha256
+            entry.suffix = suffix
+            entry.url = url
+            entry.size = size
+            entry.content_type = content_type
+            entry.etag = etag
+            entry.last_modified = last_modified
+            entry.fetched_at = now
+            entry.checked_at = now
+            entry.last_accessed = now
+            session.add(entry)
+            session.commit()
+            if previous and previous != (sha256, suffix):
+                self._drop_if_unreferenced(session, *previous)
+        # Never evict what was just stored, even if it alone exceeds max_bytes:
+        # callers return its path
+        self.evict(keep=(sha256, suffix))
+
+    def put_file(self, doc_id: str, src: Path, url: str = "") -> Path:
+        """Copies an existing local file into the store (e.g. legacy web/public/pdfs copies)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        hasher = hashlib.sha256()
+        fd, tmp_name = tempfile.mkstemp(dir=self.root, suffix=".part")
+        with os.fdopen(fd, 'wb') as out, open(src, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                hasher.update(chunk)
+                out.write(chunk)
+        sha256 = hasher.hexdigest()
+        size = Path(tmp_name).stat().st_size
+        path = self._ingest(Path(tmp_name), sha256, src.suffix.lower() or ".pdf")
+        self._save_entry(doc_id, url, sha256, path.suffix, size)
+        return path
+
+    def fetch(self, doc_id: str, url: str, revalidate: Optional[bool] = None) -> Path:
+        """
+        Returns a local path for the document, downloading or revalidating it
+        against upstream when needed. revalidate=None revalidates only entries
+        older than `revalidate_after`; True/False force or skip it.
+        """
+        url = resolve_url(url)
+        entry = self.lookup(doc_id)
+        local = self.object_path(entry.sha256, entry.suffix) if entry else None
+
+        if entry and entry.url == url:
+            if revalidate is False or (revalidate is None and self.is_fresh(entry)):
+                return local
+
+        headers = {}
+        if entry and entry.url == url:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        try:
+            response = get_http_session().get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            if local:
+                print(f"WARN: Revalidation of {doc_id} failed ({e}); serving stale copy", file=sys.stderr)
+                return local
+            raise
+
+        with response:
+            if response.status_code == 304 and local:
+                self._mark_checked(doc_id)
+                return local
+            response.raise_for_status()
+
+            self.root.mkdir(parents=True, exist_ok=True)
+            hasher = hashlib.sha256()
+            size = 0
+            fd, tmp_name = tempfile.mkstemp(dir=self.root, suffix=".part")
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        hasher.update(chunk)
+                        out.write(chunk)
+                        size += len(chunk)
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+
+        sha256 = hasher.hexdigest()
+        suffix = infer_suffix(url)
+        path = self._ingest(Path(tmp_name), sha256, suffix)
+        self._save_entry(
+            doc_id, url, sha256, suffix, size,
+            content_type=response.headers.get("Content-Type"),
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        return path
+
+    def _mark_checked(self, doc_id: str):
+        from pylegislation.research.db import Session, engine, StoredDocument
+
+        with Session(engine) as session:
+            entry = session.get(StoredDocument, doc_id)
+            if entry:
+                entry.checked_at = datetime.utcnow()
+                session.add(entry)
+                session.commit()
+
+    # -- Eviction --
+
+    def _drop_if_unreferenced(self, session, sha256: str, suffix: str):
+        from pylegislation.research.db import select, StoredDocument
+
+        still_used = session.exec(
+            select(StoredDocument.doc_id).where(StoredDocument.sha256 == sha256, StoredDocument.suffix == suffix)
+        ).first()
+        if not still_used:
+            self.object_path(sha256, suffix).unlink(missing_ok=True)
+
+    def total_size(self) -> int:
+        from pylegislation.research.db import Session, engine, select, func, StoredDocument
+
+        with Session(engine) as session:
+            # Objects are shared between doc_ids with identical content; count each once
+            sizes = session.exec(
+                select(func.max(StoredDocument.size)).group_by(StoredDocument.sha256, StoredDocument.suffix)
+            ).all()
+        return sum(sizes)
+
+    def evict(self, keep: Optional[tuple] = None):
+        """
+        Drops least recently used documents until the store fits in max_bytes.
+        The object `keep` ((sha256, suffix)) is never dropped.
+        """
+        from pylegislation.research.db import Session, engine, select, StoredDocument
+
+        total = self.total_size()
+        if total <= self.max_bytes:
+            return
+
+        with Session(engine) as session:
+            entries = session.exec(select(StoredDocument).order_by(StoredDocument.last_accessed)).all()
+            for entry in entries:
+                if total <= self.max_bytes:
+                    break
+                if (entry.sha256, entry.suffix) == keep:
+                    continue
+                doc_id, sha256, suffix, size = entry.doc_id, entry.sha256, entry.suffix, entry.size
+                session.delete(entry)
+                session.commit()
+                if not self.object_path(sha256, suffix).exists():
+                    continue
+                self._drop_if_unreferenced(session, sha256, suffix)
+                if not self.object_path(sha256, suffix).exists():
+                    total -= size
+                    print(f"Evicted {doc_id} from document store", file=sys.stderr)
+
+
+_fill_executor = None
+_fills = {}
+_fills_lock = threading.Lock()
+FILL_WORKERS = 4
+
+
+def fill_in_background(store: DocumentStore, doc_id: str, url: str, revalidate: Optional[bool] = None) -> Future:
+    """
+    Schedules store.fetch() on a small background pool. Concurrent calls for
+    the same doc_id share a single in-flight fill.
+    """
+    global _fill_executor
+    with _fills_lock:
+        future = _fills.get(doc_id)
+        if future is not None and not future.done():
+            return future
+        if _fill_executor is None:
+            _fill_executor = ThreadPoolExecutor(max_workers=FILL_WORKERS, thread_name_prefix="doc-fill")
+        future = _fill_executor.submit(store.fetch, doc_id, url, revalidate)
+        _fills[doc_id] = future
+
+    def _done(f: Future):
+        with _fills_lock:
+            if _fills.get(doc_id) is f:
+                del _fills[doc_id]
+        if f.exception():
+            print(f"WARN: Background fill of {doc_id} failed: {f.exception()}", file=sys.stderr)
+
+    future.add_done_callback(_done)
+    return future
+
+
+_store = None
+
+
+def get_document_store() -> DocumentStore:
+    """Returns the process-wide document store."""
+    global _store
+    if _store is None:
+        _store = DocumentStore()
+    return _store
@@ -1,208 +1,790 @@
 from datetime import datetime
+import gzip
+import hashlib
+import io
 import json
+import os
 import sys
+import threading
+import time
 from pathlib import Path
-from sqlmodel import Session, select
-from pylegislation.research.db import engine, ActAnalysis, TelemetryLog, AnalysisHistory, create_db_and_tables
+from typing import Iterator, List, Optional, Tuple
 
-def dump_analysis_to_json(output_paths: list[Path]):
-    """Dumps DB records (Analysis + Telemetry + History) to one or more JSON files."""
+# Dump format (version 4): newline-delimited JSON, optionally gzip/zstd
+# compressed. The first line is a header, then each table is a
+# {"table": name} line followed by one line per row:
+#
+#   {"format": "pylegislation-research-dump", "version": 4, "created": "..."}
+#   {"table": "content"}
+#   {"sha256": "...", "json": {...}, "indent": 2}
+#   {"sha256": "...", "text": "..."}
+#   {"table": "analysis_history"}
+#   {"id": 1, "doc_id": "...", "response_sha256": "...", ...}
+#   {"table": "act_analysis"}
+#   ...
+#
+# "content" holds each analysis/response text the dumped rows reference
+# once (see blobs.py); rows refer to it by hash. Analysis JSON is written as
+# the parsed object plus the layout ("indent", "ascii") that reproduces the
+# stored text byte for byte, so the hash still verifies on restore; texts
+# no layout reproduces (non-JSON responses) stay a "text" string. Rows are
+# streamed from the database and written one at a time, so dumping and
+# restoring run in constant memory. Version 3 dumps (content as "text"
+# only), version 2 dumps (text inline in content_json/response) and version 1 dumps (a single indented JSON document, or a bare list of
+# analyses) are still read.
+#
+# Versioned dumps in DUMP_DIR are either full or deltas. A delta holds only
+# the rows past the previous dump's per-table high-water mark (HIGH_WATER);
+# manifest.json records the chain so a restore replays the latest full dump
+# and the deltas written after it, in order.
+DUMP_FORMAT = "pylegislation-research-dump"
+DUMP_VERSION = 4
+DUMP_PREFIX = "analysis_dump_"
+DUMP_DIR = "reports/database/dump"
+# Rows fetched per round trip when dumping / flushed per batch when restoring
+DUMP_CHUNK = 1000
+COMPRESSIONS = ("none", "gzip", "zstd")
+MANIFEST_NAME = "manifest.json"
+# Deltas chained onto one full dump before the next dump is a full one again
+FULL_DUMP_EVERY = 24
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Content comes first so rows never reference text not restored yet.
+# History is written before act_analysis: restoring it first lets the
+# base-analysis backfill see which history rows the dump already carries.
+TABLE_COLUMNS = {
+    "content": ["sha256", "json", "indent", "ascii", "text"],
+    "analysis_history": ["id", "doc_id", "timestamp", "prompt", "response_sha256", "model"],
+    "act_analysis": ["doc_id", "timestamp", "model", "content_sha256"],
+    "telemetry_log": ["id", "doc_id", "timestamp", "model", "input_tokens", "output_tokens", "latency_ms",
+                      "status", "cost_usd", "upload_cache_hits", "upload_cache_misses"],
+}
+
+
+# json.dumps layouts tried when writing analysis text as an object: model
+# output is indented or compact, with or without escaped non-ASCII
+JSON_LAYOUTS = [(2, True), (2, False), (None, True), (None, False)]
+
+# Column each table's high-water mark is taken from. History and telemetry
+# are append-only (autoincrement ids); analyses are rewritten in place on
+# re-analysis, so their mark is the newest timestamp. Content has no mark: a
+# dump carries the texts its rows reference.
+HIGH_WATER = {"analysis_history": "id", "act_analysis": "timestamp", "telemetry_log": "id"}
+
+
+def _table_models():
+    from pylegislation.research.db import ActAnalysis, TelemetryLog, AnalysisHistory, AnalysisBlob
+    return {"content": AnalysisBlob, "analysis_history": AnalysisHistory, "act_analysis": ActAnalysis,
+            "telemetry_log": TelemetryLog}
+
+
+def compression_for(path: Path) -> str:
+    """Compression implied by a dump file name (.gz / .zst)."""
+    suffix = path.suffix.lower()
+    if suffix == ".gz":
+        return "gzip"
+    if suffix in (".zst", ".zstd"):
+        return "zstd"
+    return "none"
+
+
+def dump_filename(timestamp: str, compression: str = "gzip", delta: bool = False) -> str:
+    kind = ".delta" if delta else ""
+    return f"{DUMP_PREFIX}{timestamp}{kind}.ndjson" + {"none": "", "gzip": ".gz", "zstd": ".zst"}[compression]
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("zstd dumps need the 'zstandard' package (pip install zstandard)")
+    return zstandard
+
+
+def _open_write(path: Path, compression: str):
+    """Binary writer for path plus the underlying file (to close after the writer)."""
+    raw = open(path, "wb")
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6), raw
+    if compression == "zstd":
+        try:
+            return _zstandard().ZstdCompressor(level=3).stream_writer(raw, closefd=False), raw
+        except Exception:
+            raw.close()
+            raise
+    return raw, raw
+
+
+def open_dump(path: Path) -> io.TextIOBase:
+    """Text reader for a dump; the compression is detected from the file content."""
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        stream = gzip.open(path, "rb")
+    elif magic.startswith(ZSTD_MAGIC):
+        stream = _zstandard().ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+    else:
+        stream = open(path, "rb")
+    return io.TextIOWrapper(stream, encoding="utf-8")
+
+
+def _encode(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _window(table: str, since=None, upto=None) -> list:
+    """WHERE clauses for rows with since < mark <= upto (either bound optional)."""
+    mark = getattr(_table_models()[table], HIGH_WATER[table])
+    if HIGH_WATER[table] == "timestamp" and isinstance(since, str):
+        since = datetime.fromisoformat(since)
+    clauses = []
+    if since is not None:
+        clauses.append(mark > since)
+    if upto is not None:
+        clauses.append(mark <= upto)
+    return clauses
+
+
+def _current_marks(session) -> dict:
+    """{table: newest high-water value} (None for an empty table)."""
+    from sqlmodel import select, func
+
+    models = _table_models()
+    return {
+        table: session.execute(select(func.max(getattr(models[table], column)))).scalar()
+        for table, column in HIGH_WATER.items()
+    }
+
+
+def iter_table_rows(session, table: str, since=None, upto=None) -> Iterator[dict]:
+    """
+    Streams one table's rows as dump dicts, DUMP_CHUNK rows at a time, in
+    high-water column order, limited to since < mark <= upto.
+    """
+    from sqlmodel import select
+
+    model = _table_models()[table]
+    columns = TABLE_COLUMNS[table]
+    statement = (
+        select(*[getattr(model, c) for c in columns])
+        .where(*_window(table, since, upto))
+        .order_by(getattr(model, HIGH_WATER[table]))
+    )
+    for row in session.execute(statement.execution_options(yield_per=DUMP_CHUNK)):
+        yield {column: _encode(value) for column, value in zip(columns, row)}
+
+
+def iter_content_rows(session, windows: dict) -> Iterator[dict]:
+    """Decoded texts referenced by the history and analysis rows in `windows` ({table: (since, upto)})."""
+    from sqlmodel import select
+    from sqlalchemy import union
+    from pylegislation.research.db import ActAnalysis, AnalysisHistory, AnalysisBlob
+    from pylegislation.research.blobs import decode_blob
+
+    referenced = union(
+        select(AnalysisHistory.response_sha256).where(*_window("analysis_history", *windows["analysis_history"])),
+        select(ActAnalysis.content_sha256).where(*_window("act_analysis", *windows["act_analysis"])),
+    )
+    statement = (
+        select(AnalysisBlob.sha256, AnalysisBlob.codec, AnalysisBlob.data)
+        .where(AnalysisBlob.sha256.in_(referenced))
+        .order_by(AnalysisBlob.sha256)
+    )
+    for sha, codec, data in session.execute(statement.execution_options(yield_per=DUMP_CHUNK)):
+        yield content_row(sha, decode_blob(codec, data))
+
+
+def content_row(sha256: str, text: str) -> dict:
+    """A content row: the parsed JSON and its layout if a layout reproduces `text` exactly, else the text."""
+    try:
+        value = json.loads(text)
+    except ValueError:
+        value = None
+    if isinstance(value, (dict, list)):
+        for indent, ensure_ascii in JSON_LAYOUTS:
+            if json.dumps(value, indent=indent, ensure_ascii=ensure_ascii) == text:
+                row = {"sha256": sha256, "json": value, "indent": indent}
+                if not ensure_ascii:
+                    row["ascii"] = False
+                return row
+    return {"sha256": sha256, "text": text}
+
+
+def content_text(item: dict) -> str:
+    """The stored text of a content row (see content_row)."""
+    if "json" in item:
+        return json.dumps(item["json"], indent=item.get("indent"), ensure_ascii=item.get("ascii", True))
+    return item["text"]
+
+
+def dump_analysis_to_json(output_paths: List[Path], since: Optional[dict] = None) -> Optional[dict]:
+    """
+    Streams DB records (History + Analysis + Telemetry) to one or more dump
+    files in the NDJSON format. Each file is written to a temporary name and
+    renamed when complete.
+
+    With `since` ({table: high-water mark}), writes a delta of the rows past
+    those marks. Returns {"counts": {table: rows}, "high_water": {table: mark}};
+    a table's mark is carried over from `since` when it has no new rows.
+    The newest marks are read first and bound every table, so rows committed
+    while dumping (and the texts they reference) go in the next delta.
+    """
     if not output_paths:
-        return
+        return None
+
+    from sqlmodel import Session
+    from pylegislation.research.db import engine, create_db_and_tables
 
     # Ensure tables exist (to avoid crash if dumping on fresh system)
     create_db_and_tables()
 
+    writers = []
+    counts = {table: 0 for table in TABLE_COLUMNS}
+    since = since or {}
+    high_water = {}
+    try:
+        for path in output_paths:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + ".tmp")
+            writer, raw = _open_write(tmp_path, compression_for(path))
+            writers.append((path, tmp_path, writer, raw))
+
+        def write(obj):
+            line = (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+            for _, _, writer, _ in writers:
+                writer.write(line)
+
+        header = {"format": DUMP_FORMAT, "version": DUMP_VERSION, "created": datetime.utcnow().isoformat(),
+                  "kind": "delta" if since else "full"}
+        if since:
+            header["since"] = since
+        write(header)
+        with Session(engine) as session:
+            upto = _current_marks(session)
+            windows = {table: (since.get(table), upto[table]) for table in HIGH_WATER}
+            for table in TABLE_COLUMNS:
+                write({"table": table})
+                if table == "content":
+                    rows = iter_content_rows(session, windows)
+                else:
+                    rows = iter_table_rows(session, table, *windows[table])
+                for row in rows:
+                    write(row)
+                    counts[table] += 1
+            for table in HIGH_WATER:
+                high_water[table] = _encode(upto[table]) if upto[table] is not None else since.get(table)
+
+        for _, _, writer, raw in writers:
+            writer.close()
+            if not raw.closed:
+                raw.close()
+        for path, tmp_path, _, _ in writers:
+            os.replace(tmp_path, path)
+    except BaseException:
+        for _, tmp_path, writer, raw in writers:
+            try:
+                writer.close()
+                raw.close()
+            except Exception:
+                pass
+            tmp_path.unlink(missing_ok=True)
+        raise
+
+    for path in output_paths:
+        print(f"Dumped {counts['act_analysis']} analyses, {counts['telemetry_log']} logs, "
+              f"{counts['analysis_history']} history items ({counts['content']} distinct texts) to {path}")
+    return {"counts": counts, "high_water": high_water}
+
+
+def read_manifest(dump_dir: Path) -> List[dict]:
+    """Entries of dump_dir's manifest, oldest first ([] if there is none)."""
+    path = dump_dir / MANIFEST_NAME
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("dumps", [])
+
+
+def _write_manifest(dump_dir: Path, entries: List[dict]):
+    path = dump_dir / MANIFEST_NAME
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"format": DUMP_FORMAT, "dumps": entries}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def dump_chain(entries: List[dict]) -> List[dict]:
+    """The latest full dump and the deltas written after it."""
+    for i in range(len(entries) - 1, -1, -1):
+        if entries[i].get("kind") == "full":
+            return entries[i:]
+    return []
+
+
+def _behind_marks(since: dict) -> List[str]:
+    """Tables whose newest row is older than `since` (the database was replaced or reset)."""
+    from sqlmodel import Session, select, func
+    from pylegislation.research.db import engine
+
+    models = _table_models()
+    behind = []
     with Session(engine) as session:
-        analyses = session.exec(select(ActAnalysis)).all()
-        telemetry = session.exec(select(TelemetryLog)).all()
-        history = session.exec(select(AnalysisHistory)).all()
-
-    data = {
-        "act_analysis": [],
-        "telemetry_log": [],
-        "analysis_history": []
+        for table, mark in since.items():
+            if mark is None:
+                continue
+            column = HIGH_WATER[table]
+            current = session.exec(select(func.max(getattr(models[table], column)))).one()
+            if column == "timestamp":
+                mark = datetime.fromisoformat(mark)
+            if current is None or current < mark:
+                behind.append(table)
+    return behind
+
+
+def write_versioned_dump(dump_dir: Path, compression: str = "gzip", full: bool = False,
+                         timestamp: Optional[str] = None) -> Optional[dict]:
+    """
+    Writes the next dump in dump_dir and records it in the manifest: a delta
+    on top of the current chain, or a full dump when asked, when there is no
+    chain yet, after FULL_DUMP_EVERY deltas, or when the database no longer
+    reaches the chain's marks (e.g. it was recreated). An empty delta is
+    not kept. Returns the manifest entry written, or None.
+    """
+    from pylegislation.research.db import create_db_and_tables
+
+    create_db_and_tables()
+    dump_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = timestamp or datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    entries = read_manifest(dump_dir)
+    chain = dump_chain(entries)
+    since = None
+    if not full and chain and len(chain) <= FULL_DUMP_EVERY:
+        since = chain[-1]["high_water"]
+        missing = [e["file"] for e in chain if not (dump_dir / e["file"]).exists()]
+        behind = _behind_marks(since)
+        if missing or behind:
+            reason = f"missing {', '.join(missing)}" if missing else f"{', '.join(behind)} behind the last dump"
+            print(f"WARN: Dump chain unusable ({reason}); writing a full dump.", file=sys.stderr)
+            since = None
+
+    path = dump_dir / dump_filename(timestamp, compression, delta=since is not None)
+    result = dump_analysis_to_json([path], since)
+    if since is not None and not any(result["counts"].values()):
+        path.unlink()
+        print("No changes since the last dump; delta not kept.")
+        return None
+
+    entry = {
+        "file": path.name,
+        "kind": "delta" if since is not None else "full",
+        "created": datetime.utcnow().isoformat(),
+        "counts": result["counts"],
+        "high_water": result["high_water"],
+    }
+    if since is not None:
+        entry["base"] = chain[0]["file"]
+    entries.append(entry)
+    _write_manifest(dump_dir, entries)
+    return entry
+
+
+def _legacy_records(data) -> Iterator[Tuple[str, dict]]:
+    # Legacy format (list of analyses) or dict of tables
+    if isinstance(data, list):
+        data = {"act_analysis": data}
+    for table in TABLE_COLUMNS:
+        for row in data.get(table, []):
+            yield table, row
+
+
+def iter_dump_records(input_path: Path) -> Iterator[Tuple[str, dict]]:
+    """
+    Yields (table, row) pairs from a dump in either format. NDJSON dumps are
+    read line by line; legacy JSON dumps have to be parsed whole.
+    """
+    with open_dump(input_path) as f:
+        first = f.readline()
+        try:
+            header = json.loads(first)
+        except json.JSONDecodeError:
+            header = None
+
+        if not (isinstance(header, dict) and header.get("format") == DUMP_FORMAT):
+            yield from _legacy_records(json.loads(first + f.read()))
+            return
+
+        if header.get("version", 0) > DUMP_VERSION:
+            raise ValueError(f"{input_path} is dump version {header['version']}, newer than supported ({DUMP_VERSION})")
+        table = None
+        for line_no, line in enumerate(f, start=2):
+            if not line.strip():
+                continue
+            obj = json.loads(line)
+            if "table" in obj and len(obj) == 1:
+                table = obj["table"]
+            elif table is None:
+                raise ValueError(f"{input_path}:{line_no}: row before any table header")
+            elif table in TABLE_COLUMNS:
+                yield table, obj
+
+
+class RestoreCancelled(Exception):
+    """Raised inside a restore's transaction when it is cancelled (rolls it back)."""
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _table_counts(conn) -> dict:
+    from sqlmodel import select, func
+
+    return {table: conn.execute(select(func.count()).select_from(model)).scalar()
+            for table, model in _table_models().items()}
+
+
+def _existing_keys(conn):
+    """Keys already in the database, one query per table."""
+    from sqlmodel import select
+    from pylegislation.research.db import ActAnalysis, TelemetryLog, AnalysisHistory, AnalysisBlob
+
+    return {
+        "content": set(conn.execute(select(AnalysisBlob.sha256)).scalars()),
+        # doc_id -> timestamp, so newer analyses from a delta replace older ones
+        "act_analysis": {doc_id: ts for doc_id, ts in conn.execute(select(ActAnalysis.doc_id, ActAnalysis.timestamp))},
+        "analysis_history": set(conn.execute(select(AnalysisHistory.id)).scalars()),
+        "telemetry_log": set(conn.execute(select(TelemetryLog.id)).scalars()),
+        # (doc_id, timestamp) of base analyses already in history
+        "base_history": set(conn.execute(
+            select(AnalysisHistory.doc_id, AnalysisHistory.timestamp)
+            .where(AnalysisHistory.prompt == "Base Analysis")
+        ).tuples()),
     }
-    
-    # Dump Analysis
-    for r in analyses:
-        data["act_analysis"].append({
-            "doc_id": r.doc_id,
-            "timestamp": r.timestamp.isoformat(),
-            "model": r.model,
-            "content_json": r.content_json
-        })
-        
-    # Dump Telemetry
-    for t in telemetry:
-        data["telemetry_log"].append({
-            "id": t.id,
-            "doc_id": t.doc_id,
-            "timestamp": t.timestamp.isoformat(),
-            "model": t.model,
-            "input_tokens": t.input_tokens,
-            "output_tokens": t.output_tokens,
-            "latency_ms": t.latency_ms,
-            "status": t.status,
-            "cost_usd": t.cost_usd
-        })
 
-    # Dump History
-    for h in history:
-        data["analysis_history"].append({
-            "id": h.id,
-            "doc_id": h.doc_id,
-            "timestamp": h.timestamp.isoformat(),
-            "prompt": h.prompt,
-            "response": h.response,
-            "model": h.model
-        })
-        
-    for path in output_paths:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-        print(f"Dumped {len(analyses)} analyses, {len(telemetry)} logs, {len(history)} history items to {path}")
 
-def load_analysis_from_json(input_path: Path):
-    """Loads DB records from a JSON file."""
+def load_analysis_from_json(input_path: Path, cancel: Optional[threading.Event] = None) -> Optional[dict]:
+    """
+    Loads DB records from a dump file (NDJSON v3/v2 or legacy JSON).
+
+    Existing keys are read once per table and the dump is deduplicated
+    against them in memory; new rows are written with chunked
+    INSERT OR IGNORE executemany calls in a single transaction. An analysis
+    newer than the cached one (a re-analysis carried by a delta) replaces it.
+    The file's hash and the resulting table counts are recorded in
+    DumpRestore (see restore_is_current). Setting `cancel` rolls the
+    restore back at the next chunk. Returns the number of rows restored per table.
+    """
     if not input_path.exists():
         print(f"File {input_path} not found.")
-        return
-
-    with open(input_path, "r", encoding="utf-8") as f:
-        raw_data = json.load(f)
-        
-    # Handle Legacy format (list of analyses) or dict
-    if isinstance(raw_data, list):
-        analyses_data = raw_data
-        telemetry_data = []
-        history_data = []
-    else:
-        analyses_data = raw_data.get("act_analysis", [])
-        telemetry_data = raw_data.get("telemetry_log", [])
-        history_data = raw_data.get("analysis_history", [])
+        return None
+
+    from sqlalchemy import insert
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+    from pylegislation.research.db import engine, create_db_and_tables, ActAnalysis, DumpRestore
+    from pylegislation.research.blobs import encode_text
+    from pylegislation.research.search import index_analyses
+    from pylegislation.research.structured import index_structured
+    from pylegislation.research.citations import index_citations
 
     create_db_and_tables()
-    
+    stat = input_path.stat()
+    sha256 = file_sha256(input_path)
+
+    tables = _table_models()
+    statements = {name: insert(model).prefix_with("OR IGNORE") for name, model in tables.items()}
+    upsert = sqlite_insert(ActAnalysis)
+    statements["act_analysis"] = upsert.on_conflict_do_update(
+        index_elements=[ActAnalysis.doc_id],
+        set_={c: upsert.excluded[c] for c in ("timestamp", "model", "content_sha256")},
+        where=upsert.excluded.timestamp > ActAnalysis.timestamp,
+    )
+    counts = {table: 0 for table in TABLE_COLUMNS}
+    started = time.perf_counter()
+
+    with engine.begin() as conn:
+        existing = _existing_keys(conn)
+        buffers = {table: [] for table in TABLE_COLUMNS}
+        # Acts whose analysis changed; their search rows are rebuilt at the end
+        analysed_docs = set()
+
+        def queue(table, row):
+            buffers[table].append(row)
+            if len(buffers[table]) >= DUMP_CHUNK:
+                flush(table)
+
+        def flush(table):
+            if cancel is not None and cancel.is_set():
+                raise RestoreCancelled(f"Restore of {input_path} cancelled")
+            if buffers[table]:
+                # Rows actually written: INSERT OR IGNORE skips duplicates and
+                # the analysis upsert skips older-or-equal timestamps
+                counts[table] += conn.execute(statements[table], buffers[table]).rowcount
+                buffers[table] = []
+
+        def store_text(text, sha256=None):
+            """Queues a blob for text unless it is stored already; returns its hash."""
+            if sha256 is not None and sha256 in existing["content"]:
+                return sha256
+            row = encode_text(text)
+            if sha256 is not None and row["sha256"] != sha256:
+                raise ValueError(f"{input_path}: content {sha256} does not match its text")
+            if row["sha256"] not in existing["content"]:
+                existing["content"].add(row["sha256"])
+                queue("content", row)
+            return row["sha256"]
+
+        for table, item in iter_dump_records(input_path):
+            if table == "content":
+                store_text(content_text(item), item["sha256"])
+
+            elif table == "analysis_history":
+                if item.get("id") and item["id"] in existing["analysis_history"]:
+                    continue
+                row = {
+                    # None lets SQLite assign the id
+                    "id": item.get("id") or None,
+                    "doc_id": item["doc_id"],
+                    "timestamp": datetime.fromisoformat(item["timestamp"]),
+                    "prompt": item.get("prompt", ""),
+                    # v3 references dumped content; older dumps carry the text
+                    "response_sha256": item.get("response_sha256") or store_text(item.get("response", "")),
+                    "model": item.get("model", "gemini-2.0-flash"),
+                }
+                if row["id"]:
+                    existing["analysis_history"].add(row["id"])
+                if row["prompt"] == "Base Analysis":
+                    existing["base_history"].add((row["doc_id"], row["timestamp"]))
+                queue(table, row)
+
+            elif table == "act_analysis":
+                target_ts = datetime.fromisoformat(item["timestamp"])
+                content_sha256 = item.get("content_sha256") or store_text(item["content_json"])
+                # 1. Restore ActAnalysis (Cache)
+                cached_ts = existing["act_analysis"].get(item["doc_id"])
+                if cached_ts is None or cached_ts < target_ts:
+                    existing["act_analysis"][item["doc_id"]] = target_ts
+                    analysed_docs.add(item["doc_id"])
+                    queue(table, {
+                        "doc_id": item["doc_id"],
+                        "timestamp": target_ts,
+                        "model": item["model"],
+                        "content_sha256": content_sha256,
+                    })
+                # 2. Backfill History (Base Analysis) if neither the database
+                # nor the dump's history (restored first) has it
+                key = (item["doc_id"], target_ts)
+                if key not in existing["base_history"]:
+                    existing["base_history"].add(key)
+                    queue("analysis_history", {
+                        "id": None,
+                        "doc_id": item["doc_id"],
+                        "timestamp": target_ts,
+                        "prompt": "Base Analysis",
+                        "response_sha256": content_sha256,
+                        "model": item["model"],
+                    })
+
+            elif table == "telemetry_log":
+                if item.get("id") and item["id"] in existing["telemetry_log"]:
+                    continue
+                row = {
+                    "id": item.get("id") or None,
+                    "doc_id": item["doc_id"],
+                    "timestamp": datetime.fromisoformat(item["timestamp"]),
+                    "model": item["model"],
+                    "input_tokens": item["input_tokens"],
+                    "output_tokens": item["output_tokens"],
+                    "latency_ms": item["latency_ms"],
+                    "status": item["status"],
+                    "cost_usd": item.get("cost_usd"),
+                    "upload_cache_hits": item.get("upload_cache_hits"),
+                    "upload_cache_misses": item.get("upload_cache_misses"),
+                }
+                if row["id"]:
+                    existing["telemetry_log"].add(row["id"])
+                queue(table, row)
+
+        for table in TABLE_COLUMNS:
+            flush(table)
+        index_analyses(conn, analysed_docs)
+        index_structured(conn, analysed_docs)
+        index_citations(conn, analysed_docs)
+
+        conn.execute(insert(DumpRestore).prefix_with("OR REPLACE"), {
+            "sha256": sha256,
+            "file": input_path.name,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "counts_json": json.dumps(_table_counts(conn)),
+            "restored_at": datetime.utcnow(),
+        })
+
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    print(f"Restored {counts['act_analysis']} analyses, {counts['telemetry_log']} logs, "
+          f"{counts['analysis_history']} history items ({counts['content']} new texts) from {input_path} "
+          f"in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} rows/s)")
+    return counts
+
+
+def find_latest_dump(dump_dir: Path) -> Optional[Path]:
+    """Newest full analysis_dump_<timestamp>.* in dump_dir (any format), else analysis_dump.json."""
+    dumps = sorted(
+        p for p in dump_dir.glob(f"{DUMP_PREFIX}*")
+        if p.is_file() and not p.name.endswith(".tmp") and ".delta." not in p.name
+    )
+    if dumps:
+        return dumps[-1]
+    fallback = dump_dir / "analysis_dump.json"
+    return fallback if fallback.exists() else None
+
+
+def restore_is_current(path: Path) -> bool:
+    """
+    True when this dump was already restored into the database and its
+    tables still hold at least the rows they had right after. Files are
+    matched by name, size and mtime first, so only a touched or renamed
+    file is hashed.
+    """
+    from sqlmodel import Session, select
+    from pylegislation.research.db import engine, DumpRestore
+
+    stat = path.stat()
     with Session(engine) as session:
-        # Counters
-        count_ana = 0
-        count_tel = 0
-        count_hist = 0
-
-        # Restore Analysis & Backfill History
-        for item in analyses_data:
-            # 1. Restore ActAnalysis (Cache)
-            if not session.get(ActAnalysis, item["doc_id"]): 
-                record = ActAnalysis(
-                    doc_id=item["doc_id"],
-                    timestamp=datetime.fromisoformat(item["timestamp"]),
-                    model=item["model"],
-                    content_json=item["content_json"]
-                )
-                session.add(record)
-                count_ana += 1
-            
-            # 2. Backfill History (Base Analysis) if missing
-            # This ensures legacy dumps or missing logs are restored even if cache existed
-            
-            # Check if this specific base analysis is already in history
-            # We match on doc_id, "Base Analysis", and timestamp to avoid duplicates
-            target_ts = datetime.fromisoformat(item["timestamp"])
-            
-            statement = select(AnalysisHistory).where(
-                AnalysisHistory.doc_id == item["doc_id"],
-                AnalysisHistory.prompt == "Base Analysis",
-                AnalysisHistory.timestamp == target_ts
-            )
-            existing_hist = session.exec(statement).first()
-            
-            if not existing_hist:
-                # Also check if we have it in the history_data list we are about to process
-                # (To avoid double adding if the dump actually HAS history)
-                in_dump_history = False
-                for h in history_data:
-                     if (h["doc_id"] == item["doc_id"] and 
-                         h.get("prompt") == "Base Analysis" and 
-                         h["timestamp"] == item["timestamp"]):
-                         in_dump_history = True
-                         break
-                
-                if not in_dump_history:
-                    base_hist = AnalysisHistory(
-                        doc_id=item["doc_id"],
-                        timestamp=target_ts,
-                        prompt="Base Analysis",
-                        response=item["content_json"],
-                        model=item["model"]
-                    )
-                    session.add(base_hist)
-                    count_hist += 1
-
-        # Restore Telemetry
-        count_tel = 0
-        for item in telemetry_data:
-             if item.get("id") and session.get(TelemetryLog, item["id"]):
-                 continue
-                 
-             rec = TelemetryLog(
-                doc_id=item["doc_id"],
-                timestamp=datetime.fromisoformat(item["timestamp"]),
-                model=item["model"],
-                input_tokens=item["input_tokens"],
-                output_tokens=item["output_tokens"],
-                latency_ms=item["latency_ms"],
-                status=item["status"],
-                cost_usd=item["cost_usd"]
-             )
-             if item.get("id"):
-                 rec.id = item["id"]
-                 
-             session.add(rec)
-             count_tel += 1
-
-        # Restore Explicit History (from dump)
-        for item in history_data:
-             if item.get("id") and session.get(AnalysisHistory, item["id"]):
-                 continue
-                 
-             rec = AnalysisHistory(
-                doc_id=item["doc_id"],
-                timestamp=datetime.fromisoformat(item["timestamp"]),
-                prompt=item.get("prompt", ""),
-                response=item.get("response", ""),
-                model=item.get("model", "gemini-2.0-flash")
-             )
-             if item.get("id"):
-                 rec.id = item["id"]
-                 
-             session.add(rec)
-             count_hist += 1
-        
-        session.commit()
-        
-    print(f"Restored {count_ana} analyses, {count_tel} logs, {count_hist} history items from {input_path}")
-
-def restore_from_latest_dump():
-    """Finds the latest analysis dump and restores it to the database."""
+        record = session.exec(select(DumpRestore).where(
+            DumpRestore.file == path.name,
+            DumpRestore.size == stat.st_size,
+            DumpRestore.mtime_ns == stat.st_mtime_ns,
+        )).first()
+        if record is None:
+            record = session.get(DumpRestore, file_sha256(path))
+            if record is None:
+                return False
+            # Same content under a new name/mtime: skip the hash next time
+            record.file, record.size, record.mtime_ns = path.name, stat.st_size, stat.st_mtime_ns
+            session.add(record)
+            session.commit()
+        recorded = json.loads(record.counts_json)
+        current = _table_counts(session.connection())
+    return all(current.get(table, 0) >= count for table, count in recorded.items())
+
+
+def dump_dir_paths(dump_dir: Path) -> List[Path]:
+    """
+    The dumps that make up dump_dir's current state, in replay order: the
+    manifest's latest full dump plus its deltas, or, without a manifest,
+    the newest standalone dump.
+    """
+    chain = dump_chain(read_manifest(dump_dir))
+    if chain:
+        missing = [e["file"] for e in chain if not (dump_dir / e["file"]).exists()]
+        if missing:
+            raise FileNotFoundError(f"Dump chain in {dump_dir} is missing {', '.join(missing)}")
+        return [dump_dir / e["file"] for e in chain]
+    latest_dump = find_latest_dump(dump_dir)
+    return [latest_dump] if latest_dump else []
+
+
+def dumps_to_restore(dump_dir: Path) -> List[Path]:
+    """The dump_dir_paths not restored into the database yet (from the first one that is not)."""
+    paths = dump_dir_paths(dump_dir)
+
+    from pylegislation.research.db import create_db_and_tables
+
+    create_db_and_tables()
+    for i, path in enumerate(paths):
+        if not restore_is_current(path):
+            return paths[i:]
+    return []
+
+
+def load_dump_dir(dump_dir: Path, cancel: Optional[threading.Event] = None) -> Optional[dict]:
+    """Restores the dumps in dump_dir that are not restored yet (see dumps_to_restore)."""
+    paths = dumps_to_restore(dump_dir)
+    if not paths:
+        print(f"Database is up to date with the dumps in {dump_dir}.")
+        return None
+    totals = {table: 0 for table in TABLE_COLUMNS}
+    for path in paths:
+        counts = load_analysis_from_json(path, cancel)
+        for table, count in counts.items():
+            totals[table] += count
+    return totals
+
+
+def _default_dump_dir() -> Optional[Path]:
     from pylegislation.utils import find_project_root
-    
+
     root = find_project_root()
-    if not root:
-        return
-        
-    dump_dir = root / "acts/database/dump"
-    if not dump_dir.exists():
-        return
-        
-    # Find all dump files
-    dumps = sorted(dump_dir.glob("analysis_dump_*.json"))
-    
-    if not dumps:
-        print("No analysis dumps found to restore.")
-        return
-        
-    latest_dump = dumps[-1]
-    print(f"Auto-restoring from latest dump: {latest_dump.name}")
-    load_analysis_from_json(latest_dump)
+    if not root or not (root / DUMP_DIR).exists():
+        return None
+    return root / DUMP_DIR
+
+
+def restore_from_latest_dump(cancel: Optional[threading.Event] = None):
+    """Restores the project's dump directory (latest dumps not restored yet)."""
+    dump_dir = _default_dump_dir()
+    if dump_dir is None:
+        return None
+
+    print(f"Auto-restoring from {dump_dir}")
+    return load_dump_dir(dump_dir, cancel)
+
+
+class BackgroundRestore:
+    """
+    Runs restore_from_latest_dump on a thread, so the API can serve reads
+    while a dump is loaded. The restore is one transaction per file:
+    readers see the old rows until it commits, and stop() rolls an
+    unfinished file back.
+    """
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._cancel = threading.Event()
+        self.status = {"state": "idle", "error": None, "restored": None, "started_at": None, "finished_at": None}
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._cancel.clear()
+        self.status.update(state="running", error=None, restored=None,
+                           started_at=datetime.utcnow().isoformat(), finished_at=None)
+        self._thread = threading.Thread(target=self._run, name="dump-restore", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            restored = restore_from_latest_dump(self._cancel)
+            # "skipped": the database already had every dump
+            self.status.update(state="done" if restored else "skipped", restored=restored)
+        except RestoreCancelled:
+            self.status["state"] = "cancelled"
+        except Exception as e:
+            print(f"Startup restoration failed: {e}", file=sys.stderr)
+            self.status.update(state="failed", error=str(e))
+        self.status["finished_at"] = datetime.utcnow().isoformat()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Cancels a running restore and waits for its rollback."""
+        if self._thread is None:
+            return
+        self._cancel.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits for the restore to finish; True if it is not running."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+
+background_restore = BackgroundRestore()
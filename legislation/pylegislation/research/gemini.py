@@ -0,0 +1,201 @@
+import hashlib
+import sys
+import threading
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from pylegislation.research.singleflight import SingleFlight
+
+MODEL = "gemini-2.0-flash"
+# Gemini keeps uploaded files for 48h; stop reusing them a bit earlier
+DEFAULT_UPLOAD_TTL = timedelta(hours=47)
+EXPIRY_MARGIN = timedelta(minutes=30)
+# Documents whose content hash is memoized (by path, mtime and size)
+FILE_HASH_MEMO_SIZE = 1024
+
+_clients: Dict[str, object] = {}
+_clients_lock = threading.Lock()
+
+
+def _key_id(api_key: str) -> str:
+    # Never keep raw keys as dict keys in long-lived caches
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def get_client(api_key: str):
+    """Returns a cached genai.Client for the API key."""
+    key_id = _key_id(api_key)
+    client = _clients.get(key_id)
+    if client is None:
+        from google import genai
+
+        with _clients_lock:
+            client = _clients.get(key_id)
+            if client is None:
+                client = genai.Client(api_key=api_key)
+                _clients[key_id] = client
+    return client
+
+
+@lru_cache(maxsize=FILE_HASH_MEMO_SIZE)
+def _hash_file(path: str, mtime_ns: int, size: int) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def file_sha256(path: Path) -> str:
+    """Content hash of a file, memoized on (path, mtime, size)."""
+    st = path.stat()
+    return _hash_file(str(path.resolve()), st.st_mtime_ns, st.st_size)
+
+
+def upload_rejected(error: Exception) -> bool:
+    """
+    Whether a generate call failed because the referenced upload is gone
+    (expired or deleted server-side): 403/404, or a 400 about the file.
+    Quota (429), server (5xx) and network errors are not; retrying those
+    with a fresh upload would only double the cost.
+    """
+    code = getattr(error, "code", None)
+    if code in (403, 404):
+        return True
+    message = str(getattr(error, "message", None) or error).lower()
+    return code == 400 and "file" in message
+
+
+class UploadRegistry:
+    """
+    Uploaded Gemini file handles keyed by (API key, document content hash),
+    reused until shortly before they expire server-side.
+    """
+
+    def __init__(self):
+        self._files: Dict[Tuple[str, str], Tuple[object, datetime]] = {}
+        self._lock = threading.Lock()
+        self._uploads = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    def _expiry(self, uploaded) -> datetime:
+        expiration = getattr(uploaded, "expiration_time", None)
+        now = datetime.now(timezone.utc)
+        if isinstance(expiration, datetime):
+            if expiration.tzinfo is None:
+                expiration = expiration.replace(tzinfo=timezone.utc)
+            return expiration - EXPIRY_MARGIN
+        return now + DEFAULT_UPLOAD_TTL
+
+    def get_or_upload(self, client, api_key: str, doc_path: Path) -> Tuple[object, bool]:
+        """
+        Returns (file handle, cache_hit). Concurrent misses for the same key
+        share one upload; the callers that waited for it count as hits.
+        """
+        key = (_key_id(api_key), file_sha256(doc_path))
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached, True
+        (uploaded, hit), shared = self._uploads.do(":".join(key), self._upload, client, key, doc_path)
+        if shared:
+            with self._lock:
+                self.hits += 1
+        return uploaded, hit or shared
+
+    def _lookup(self, key: Tuple[str, str]) -> Optional[object]:
+        with self._lock:
+            entry = self._files.get(key)
+            if entry and entry[1] > datetime.now(timezone.utc):
+                self.hits += 1
+                return entry[0]
+            return None
+
+    def _upload(self, client, key: Tuple[str, str], doc_path: Path) -> Tuple[object, bool]:
+        # A flight that finished between the caller's lookup and this one may have stored it
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached, True
+        with self._lock:
+            self.misses += 1
+        uploaded = client.files.upload(file=doc_path)
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            # Drop handles that expired unused so the registry does not grow without bound
+            for stale in [k for k, (_, expires) in self._files.items() if expires <= now]:
+                del self._files[stale]
+            self._files[key] = (uploaded, self._expiry(uploaded))
+        return uploaded, False
+
+    def invalidate(self, api_key: str, doc_path: Path):
+        with self._lock:
+            self._files.pop((_key_id(api_key), file_sha256(doc_path)), None)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+upload_registry = UploadRegistry()
+
+
+def document_part(client, api_key: str, doc_path: Path) -> Tuple[object, Optional[bool]]:
+    """
+    Content part for a document: raw text for HTML, an (cached) uploaded
+    file for PDFs. The second value is the upload cache hit (None for HTML).
+    """
+    if doc_path.suffix.lower() in ['.html', '.htm']:
+        # For HTML, we pass the text content directly to Gemini
+        # It handles raw HTML well.
+        try:
+            return doc_path.read_text(encoding='utf-8'), None
+        except UnicodeDecodeError:
+            print(f"Warning: UTF-8 decode failed for {doc_path}, retrying with latin-1", file=sys.stderr)
+            return doc_path.read_text(encoding='latin-1', errors='replace'), None
+    return upload_registry.get_or_upload(client, api_key, doc_path)
+
+
+def generate_with_document(api_key: str, doc_path: Path, prompt: str, config=None, model: str = MODEL):
+    """
+    Runs generate_content on [document, prompt] with a cached client and
+    upload. A reused upload the server no longer has (upload_rejected) is
+    re-uploaded once; other errors propagate. Returns (response, upload_cache_hit).
+    """
+    client = get_client(api_key)
+    part, cache_hit = document_part(client, api_key, doc_path)
+    try:
+        response = client.models.generate_content(model=model, contents=[part, prompt], config=config)
+    except Exception as e:
+        if not cache_hit or not upload_rejected(e):
+            raise
+        print(f"WARN: Cached upload for {doc_path.name} rejected ({e}); re-uploading", file=sys.stderr)
+        upload_registry.invalidate(api_key, doc_path)
+        part, cache_hit = document_part(client, api_key, doc_path)
+        response = client.models.generate_content(model=model, contents=[part, prompt], config=config)
+    return response, cache_hit
+
+
+def stream_with_document(api_key: str, doc_path: Path, prompt: str, config=None, model: str = MODEL):
+    """
+    Streaming counterpart of generate_with_document. Yields
+    (chunk, upload_cache_hit) as the model produces output. A reused upload
+    rejected (upload_rejected) before any output arrives is re-uploaded once.
+    """
+    client = get_client(api_key)
+    part, cache_hit = document_part(client, api_key, doc_path)
+    started = False
+    try:
+        for chunk in client.models.generate_content_stream(model=model, contents=[part, prompt], config=config):
+            started = True
+            yield chunk, cache_hit
+        return
+    except Exception as e:
+        if started or not cache_hit or not upload_rejected(e):
+            raise
+        print(f"WARN: Cached upload for {doc_path.name} rejected ({e}); re-uploading", file=sys.stderr)
+    upload_registry.invalidate(api_key, doc_path)
+    part, cache_hit = document_part(client, api_key, doc_path)
+    for chunk in client.models.generate_content_stream(model=model, contents=[part, prompt], config=config):
+        yield chunk, cache_hit
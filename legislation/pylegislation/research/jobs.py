@@ -0,0 +1,251 @@
+import json
+import sys
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+
+# Analyses are slow (uploads + generation), so they run on a bounded pool
+# off the API event loop. Jobs are persisted in the AnalysisJob table; their
+# results are references to the analysis blobs, not copies. Cache reads
+# (cached_analysis) are served without a job.
+MAX_WORKERS = 4
+TERMINAL_STATUSES = ("SUCCESS", "FAIL")
+# Finished jobs are deleted after JOB_RETENTION;
+# the pruning runs at startup and at most every PRUNE_INTERVAL_SECONDS on submit
+JOB_RETENTION = timedelta(days=7)
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+def job_result(job) -> Optional[dict]:
+    """The analysis a finished job returned, read back from its blobs (None if it has none)."""
+    from pylegislation.research.db import Session, engine
+    from pylegislation.research.blobs import get_texts
+
+    if not job.content_sha256:
+        return None
+    with Session(engine) as session:
+        texts = get_texts(session, [sha for sha in (job.content_sha256, job.answer_sha256) if sha])
+    if job.content_sha256 not in texts:
+        return None
+    try:
+        result = json.loads(texts[job.content_sha256])
+    except json.JSONDecodeError:
+        return None
+    result["custom_analysis"] = texts.get(job.answer_sha256) if job.answer_sha256 else None
+    result["custom_prompt"] = job.custom_prompt if job.answer_sha256 else None
+    return result
+
+
+def job_to_dict(job) -> dict:
+    """API view of a job; reads the result blobs once the job has succeeded."""
+    return {
+        "job_id": job.id,
+        "doc_id": job.doc_id,
+        "status": job.status,
+        "custom_prompt": job.custom_prompt,
+        "force_refresh": job.force_refresh,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "error": job.error,
+        "result": job_result(job),
+    }
+
+
+def record_analysis_telemetry(doc_id: str, result_dict: dict, start_time: float):
+    from pylegislation.research.telemetry import estimate_cost, record_telemetry
+
+    latency_ms = int((time.time() - start_time) * 1000)
+    input_tokens = result_dict.get("input_tokens", 0)
+    output_tokens = result_dict.get("output_tokens", 0)
+    record_telemetry(
+        doc_id,
+        result_dict.get("model", "unknown"),
+        input_tokens,
+        output_tokens,
+        latency_ms,
+        "SUCCESS",
+        estimate_cost(input_tokens, output_tokens),
+        result_dict.get("upload_cache_hits"),
+        result_dict.get("upload_cache_misses")
+    )
+
+
+def cached_analysis(doc_id: str) -> Optional[dict]:
+    """
+    The /analyze response for a cached base analysis without a custom
+    prompt, or None if none is cached. Runs in the caller's thread with no
+    AnalysisJob row: cache reads must not queue behind generations.
+    """
+    from pylegislation.research.analyze import load_cached_analysis
+
+    start_time = time.time()
+    cached = load_cached_analysis(doc_id)
+    if not cached:
+        return None
+    data = json.loads(cached["text"])
+    data["custom_analysis"] = None
+    data["custom_prompt"] = None
+    record_analysis_telemetry(doc_id, {"model": cached["model"], "upload_cache_hits": 0, "upload_cache_misses": 0},
+                              start_time)
+    return data
+
+
+class AnalysisJobQueue:
+    """Runs analyze_act_by_id jobs on a bounded worker pool and records their state."""
+
+    def __init__(self, project_root: Path, max_workers: int = MAX_WORKERS):
+        self.project_root = project_root
+        self.max_workers = max_workers
+        self._executor = None
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis")
+            return self._executor
+
+    def submit(self, doc_id: str, api_key: str, custom_prompt: Optional[str] = None,
+               force_refresh: bool = False, fetch_only: bool = False):
+        """Persists a new job and schedules it. Returns (AnalysisJob row, Future)."""
+        from pylegislation.research.db import Session, engine, AnalysisJob
+
+        job = AnalysisJob(
+            id=uuid.uuid4().hex,
+            doc_id=doc_id,
+            custom_prompt=custom_prompt,
+            force_refresh=force_refresh,
+            fetch_only=fetch_only
+        )
+        with Session(engine) as session:
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+            session.expunge(job)
+
+        if time.monotonic() - self._last_prune >= PRUNE_INTERVAL_SECONDS:
+            self.prune_finished()
+
+        future = self._get_executor().submit(self._run, job.id, api_key)
+        with self._lock:
+            self._futures[job.id] = future
+        future.add_done_callback(lambda f, job_id=job.id: self._forget(job_id))
+        return job, future
+
+    def _forget(self, job_id: str):
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def future(self, job_id: str) -> Optional[Future]:
+        """In-process future resolving to the job's result dict (None if not running here)."""
+        with self._lock:
+            return self._futures.get(job_id)
+
+    def _update(self, job_id: str, **fields):
+        from pylegislation.research.db import Session, engine, AnalysisJob
+
+        with Session(engine) as session:
+            job = session.get(AnalysisJob, job_id)
+            for key, value in fields.items():
+                setattr(job, key, value)
+            session.add(job)
+            session.commit()
+
+    def _run(self, job_id: str, api_key: str) -> Optional[dict]:
+        from pylegislation.research.analyze import analyze_act_by_id
+        from pylegislation.research.db import Session, engine, AnalysisJob
+        from pylegislation.research.telemetry import record_telemetry
+
+        with Session(engine) as session:
+            job = session.get(AnalysisJob, job_id)
+            session.expunge(job)
+
+        self._update(job_id, status="RUNNING", started_at=datetime.utcnow())
+        start_time = time.time()
+        try:
+            result_dict = analyze_act_by_id(
+                job.doc_id,
+                api_key,
+                None,
+                self.project_root,
+                job.custom_prompt,
+                job.force_refresh,
+                job.fetch_only
+            )
+        except Exception as e:
+            traceback.print_exc()
+            latency_ms = int((time.time() - start_time) * 1000)
+            record_telemetry(job.doc_id, "failed", 0, 0, latency_ms, "FAIL")
+            self._update(job_id, status="FAIL", error=str(e), finished_at=datetime.utcnow())
+            raise
+
+        if result_dict is None:
+            # fetch_only and nothing cached
+            self._update(job_id, status="SUCCESS", finished_at=datetime.utcnow())
+            return None
+
+        record_analysis_telemetry(job.doc_id, result_dict, start_time)
+        self._update(job_id, status="SUCCESS", content_sha256=result_dict.get("content_sha256"),
+                     answer_sha256=result_dict.get("answer_sha256"), finished_at=datetime.utcnow())
+        return result_dict
+
+    def get(self, job_id: str):
+        from pylegislation.research.db import Session, engine, AnalysisJob
+
+        with Session(engine) as session:
+            job = session.get(AnalysisJob, job_id)
+            if job:
+                session.expunge(job)
+            return job
+
+    def recover_interrupted(self) -> int:
+        """
+        Marks jobs left QUEUED/RUNNING by a previous process as failed.
+        They cannot be resumed because API keys are not persisted.
+        """
+        from pylegislation.research.db import Session, engine, select, AnalysisJob
+
+        with Session(engine) as session:
+            jobs = session.exec(select(AnalysisJob).where(AnalysisJob.status.in_(["QUEUED", "RUNNING"]))).all()
+            for job in jobs:
+                job.status = "FAIL"
+                job.error = "Interrupted by server restart"
+                job.finished_at = datetime.utcnow()
+                session.add(job)
+            session.commit()
+        if jobs:
+            print(f"Marked {len(jobs)} interrupted analysis jobs as failed", file=sys.stderr)
+        return len(jobs)
+
+    def prune_finished(self, retention: timedelta = JOB_RETENTION) -> int:
+        """Deletes SUCCESS/FAIL jobs that finished more than `retention` ago."""
+        from sqlalchemy import delete
+        from pylegislation.research.db import Session, engine, AnalysisJob
+
+        self._last_prune = time.monotonic()
+        cutoff = datetime.utcnow() - retention
+        with Session(engine) as session:
+            result = session.execute(
+                delete(AnalysisJob).where(
+                    AnalysisJob.status.in_(TERMINAL_STATUSES),
+                    AnalysisJob.finished_at < cutoff
+                )
+            )
+            session.commit()
+        if result.rowcount:
+            print(f"Pruned {result.rowcount} analysis jobs finished before {cutoff:%Y-%m-%d %H:%M}", file=sys.stderr)
+        return result.rowcount
+
+    def shutdown(self, wait: bool = False):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from pylegislation.research.lineage import base_title, build_lineage, read_lineage_rows
+
+# In-memory act lineage for the API.
+#
+# The same families as ui/public/data/lineage.json (HEAD TSV + patches, see
+# lineage.py), indexed by slug, doc_id, domain and year so one family or
+# chain can be served without shipping the whole file. The graph is rebuilt
+# when the HEAD version, its TSV or the patches change.
+
+# How often (seconds) a lookup may stat the HEAD TSV and patches for changes
+CHECK_INTERVAL = 2.0
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def weak_etag(*parts) -> str:
+    return 'W/"' + hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest() + '"'
+
+
+class LineageGraph:
+    """
+    Immutable snapshot of the act families. Families keep lineage.json's
+    order (base_title) and shape; a doc_id belongs to the family named after
+    its own title ("home") and to any family a patch added it to.
+    """
+
+    def __init__(self, families: List[dict]):
+        self.families = families
+        self._etags: List[str] = []
+        self._by_slug: Dict[str, List[int]] = defaultdict(list)
+        self._by_doc: Dict[str, List[int]] = defaultdict(list)
+        self._by_domain: Dict[str, List[int]] = defaultdict(list)
+        self._by_year: Dict[int, List[int]] = defaultdict(list)
+        for i, family in enumerate(families):
+            self._etags.append(weak_etag(json.dumps(family, sort_keys=True)))
+            self._by_slug[family["slug"]].append(i)
+            self._by_domain[family["domain"]].append(i)
+            for year in sorted({v["year"] for v in family["versions"]}):
+                self._by_year[year].append(i)
+            for v in family["versions"]:
+                members = self._by_doc[v["doc_id"]]
+                if i in members:
+                    continue
+                if base_title(v["title"]) == family["base_title"]:
+                    members.insert(0, i)
+                else:
+                    members.append(i)
+        # Content based: unchanged families keep their ETags across rebuilds and restarts
+        self.version = weak_etag(*self._etags)
+
+    def __len__(self) -> int:
+        return len(self.families)
+
+    def by_slug(self, slug: str) -> List[Tuple[dict, str]]:
+        """(family, etag) for each family with this slug (titles differing only in case/punctuation share one)."""
+        return [(self.families[i], self._etags[i]) for i in self._by_slug.get(slug, ())]
+
+    def by_doc_id(self, doc_id: str) -> List[Tuple[dict, str]]:
+        """(family, etag) for each family containing doc_id, its home family first."""
+        return [(self.families[i], self._etags[i]) for i in self._by_doc.get(doc_id, ())]
+
+    def chain(self, doc_id: str) -> Optional[dict]:
+        """
+        The amendment chain doc_id is part of within its home family: the
+        principal act it amends (the latest earlier non-amendment), that act's
+        amendments in order, and the principal act that superseded it, if any.
+        """
+        families = self._by_doc.get(doc_id)
+        if not families:
+            return None
+        family = self.families[families[0]]
+        versions = list({v["doc_id"]: v for v in family["versions"]}.values())
+        position = next(i for i, v in enumerate(versions) if v["doc_id"] == doc_id)
+        start = position
+        while start > 0 and versions[start]["is_amendment"]:
+            start -= 1
+        principal = None if versions[start]["is_amendment"] else versions[start]
+        end = start + 1 if principal else start
+        while end < len(versions) and versions[end]["is_amendment"]:
+            end += 1
+        return {
+            "doc_id": doc_id,
+            "slug": family["slug"],
+            "base_title": family["base_title"],
+            "principal": principal,
+            "amendments": versions[start + 1 if principal else start:end],
+            "superseded_by": versions[end] if end < len(versions) else None,
+        }
+
+    def find(self, domain: Optional[str] = None, year: Optional[int] = None, q: Optional[str] = None,
+             limit: int = DEFAULT_LIMIT, offset: int = 0) -> Tuple[int, List[dict]]:
+        """(total, page) of family summaries in base_title order; q matches base titles case-insensitively."""
+        indexes = None
+        if domain is not None:
+            indexes = self._by_domain.get(domain, [])
+        if year is not None:
+            years = self._by_year.get(year, [])
+            indexes = years if indexes is None else sorted(set(indexes).intersection(years))
+        if indexes is None:
+            indexes = range(len(self.families))
+        if q:
+            q = q.casefold()
+            indexes = [i for i in indexes if q in self.families[i]["base_title"].casefold()]
+        page = [self._summary(self.families[i]) for i in indexes[offset:offset + limit]]
+        return len(indexes), page
+
+    @staticmethod
+    def _summary(family: dict) -> dict:
+        years = [v["year"] for v in family["versions"]]
+        return {
+            "slug": family["slug"],
+            "base_title": family["base_title"],
+            "domain": family["domain"],
+            "versions": len(years),
+            "amendments": sum(1 for v in family["versions"] if v["is_amendment"]),
+            "first_year": min(years),
+            "last_year": max(years),
+        }
+
+
+def _file_stamp(path: Path) -> Optional[tuple]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_size, st.st_mtime_ns)
+
+
+class LineageGraphCache:
+    """Holds the current LineageGraph and rebuilds it when its inputs change."""
+
+    def __init__(self):
+        self._graph: Optional[LineageGraph] = None
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+
+    def _inputs(self) -> tuple:
+        from pylegislation.research.versions import get_head_path, PATCHES_DIR
+
+        tsv_path = get_head_path()
+        patches = sorted(PATCHES_DIR.glob('*.json')) if PATCHES_DIR.exists() else []
+        stamp = (str(tsv_path), _file_stamp(tsv_path), tuple((p.name, _file_stamp(p)) for p in patches))
+        return tsv_path, PATCHES_DIR, stamp
+
+    def load(self) -> LineageGraph:
+        """(Re)builds the graph from the HEAD TSV and patches."""
+        with self._lock:
+            tsv_path, patches_dir, stamp = self._inputs()
+            if self._graph is not None and stamp == self._stamp:
+                self._last_check = time.monotonic()
+                return self._graph
+            start = time.perf_counter()
+            families = []
+            if stamp[1] is not None:
+                families, _ = build_lineage(read_lineage_rows(tsv_path), patches_dir, verbose=False)
+            else:
+                print(f"WARN: Lineage source {tsv_path} not found", file=sys.stderr)
+            self._graph = LineageGraph(families)
+            self._stamp = stamp
+            self._last_check = time.monotonic()
+            print(f"Lineage graph: {len(families)} families from {tsv_path.name} "
+                  f"in {(time.perf_counter() - start) * 1000:.0f} ms", file=sys.stderr)
+            return self._graph
+
+    def expire(self):
+        """Makes the next lookup check the inputs (e.g. after appending to the HEAD TSV)."""
+        self._last_check = 0.0
+
+    def get(self) -> LineageGraph:
+        graph = self._graph
+        if graph is None or time.monotonic() - self._last_check >= CHECK_INTERVAL:
+            try:
+                graph = self.load()
+            except Exception as e:
+                if graph is None:
+                    raise
+                # Keep serving the last good graph
+                print(f"WARN: Lineage graph rebuild failed: {e}", file=sys.stderr)
+                self._last_check = time.monotonic()
+        return graph
+
+
+lineage_graphs = LineageGraphCache()
+
+
+def get_lineage_graph() -> LineageGraph:
+    """Process-wide lineage graph of the current HEAD version."""
+    return lineage_graphs.get()
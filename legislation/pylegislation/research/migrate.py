@@ -56,7 +56,10 @@ def migrate_acts_json_to_sqlite():
                 print(f"Processed {count}...")
         
         session.commit()
-    
+
+    if count:
+        from pylegislation.research.citations import sync_citations
+        sync_citations(engine)
     print(f"Migration Complete. Added {count} new acts.")
 
 if __name__ == "__main__":
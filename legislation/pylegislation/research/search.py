@@ -0,0 +1,265 @@
+import json
+import re
+import sys
+from typing import Iterable, List, Optional
+
+# Full-text search over act titles and analysis content (SQLite FTS5).
+#
+# act_search_source holds one row per act title and analysis summary. Title
+# rows are maintained by SQL triggers on actmetadata. Analysis JSON is
+# stored compressed (see blobs.py), so summary rows are written by
+# index_analyses whenever an analysis is saved or restored. act_search is
+# an external-content FTS5 index over the source table, kept in sync by
+# triggers on it. Section text is not copied: section_search indexes the
+# analysissection rows extracted by structured.py in place, through
+# triggers on that table.
+
+SEARCH_KINDS = ("title", "summary", "section")
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+SNIPPET_TOKENS = 16
+
+SEARCH_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS act_search_source (
+        id INTEGER PRIMARY KEY,
+        doc_id TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        ref TEXT,
+        content TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_act_search_source_doc_kind ON act_search_source (doc_id, kind)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS act_search USING fts5(
+        content, content='act_search_source', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    # source -> FTS index
+    """
+    CREATE TRIGGER IF NOT EXISTS act_search_source_ai AFTER INSERT ON act_search_source BEGIN
+        INSERT INTO act_search (rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS act_search_source_ad AFTER DELETE ON act_search_source BEGIN
+        INSERT INTO act_search (act_search, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS section_search USING fts5(
+        content, content='analysissection', tokenize='porter unicode61'
+    )
+    """,
+    # analysissection -> section index (rows are replaced, never updated)
+    """
+    CREATE TRIGGER IF NOT EXISTS analysissection_search_ai AFTER INSERT ON analysissection BEGIN
+        INSERT INTO section_search (rowid, content) VALUES (new.rowid, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS analysissection_search_ad AFTER DELETE ON analysissection BEGIN
+        INSERT INTO section_search (section_search, rowid, content) VALUES ('delete', old.rowid, old.content);
+    END
+    """,
+    # actmetadata -> title rows
+    """
+    CREATE TRIGGER IF NOT EXISTS actmetadata_search_ai AFTER INSERT ON actmetadata BEGIN
+        INSERT INTO act_search_source (doc_id, kind, content) VALUES (new.doc_id, 'title', new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS actmetadata_search_au AFTER UPDATE OF doc_id, description ON actmetadata BEGIN
+        DELETE FROM act_search_source WHERE doc_id = old.doc_id AND kind = 'title';
+        INSERT INTO act_search_source (doc_id, kind, content) VALUES (new.doc_id, 'title', new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS actmetadata_search_ad AFTER DELETE ON actmetadata BEGIN
+        DELETE FROM act_search_source WHERE doc_id = old.doc_id AND kind = 'title';
+    END
+    """,
+    # Analysis rows used to come from triggers reading actanalysis.content_json
+    "DROP TRIGGER IF EXISTS actanalysis_search_ai",
+    "DROP TRIGGER IF EXISTS actanalysis_search_au",
+    "DROP TRIGGER IF EXISTS actanalysis_search_ad",
+]
+# Analyses read per round trip by index_analyses
+INDEX_CHUNK = 200
+
+
+def analysis_rows(doc_id: str, content_json: str) -> List[tuple]:
+    """(doc_id, kind, ref, content) summary row for one analysis; malformed JSON yields none."""
+    try:
+        analysis = json.loads(content_json)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(analysis, dict):
+        return []
+    if isinstance(analysis.get("summary"), str):
+        return [(doc_id, "summary", None, analysis["summary"])]
+    return []
+
+
+def index_analyses(conn, doc_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Replaces the summary search rows of the given acts (all acts with None)
+    from their stored analyses, inside conn's transaction; section rows
+    follow analysissection (see structured.index_structured). Returns the
+    number of rows written.
+    """
+    from sqlalchemy import text
+    from pylegislation.research.blobs import decode_blob
+
+    if doc_ids is None:
+        conn.execute(text("DELETE FROM act_search_source WHERE kind = 'summary'"))
+        batches = [None]
+    else:
+        doc_ids = list(dict.fromkeys(doc_ids))
+        batches = [doc_ids[i:i + INDEX_CHUNK] for i in range(0, len(doc_ids), INDEX_CHUNK)]
+
+    select_sql = """
+        SELECT a.doc_id, b.codec, b.data FROM actanalysis AS a
+        JOIN analysisblob AS b ON b.sha256 = a.content_sha256
+    """
+    insert_sql = text("INSERT INTO act_search_source (doc_id, kind, ref, content) VALUES (:d, :k, :r, :c)")
+    written = 0
+    for batch in batches:
+        if batch is None:
+            result = conn.execute(text(select_sql).execution_options(yield_per=INDEX_CHUNK))
+        else:
+            params = {f"d{i}": doc_id for i, doc_id in enumerate(batch)}
+            placeholders = ", ".join(f":{name}" for name in params)
+            conn.execute(text(
+                f"DELETE FROM act_search_source WHERE kind = 'summary' AND doc_id IN ({placeholders})"
+            ), params)
+            result = conn.execute(text(select_sql + f" WHERE a.doc_id IN ({placeholders})"), params)
+        rows = []
+        for doc_id, codec, data in result:
+            rows.extend(analysis_rows(doc_id, decode_blob(codec, data)))
+            if len(rows) >= INDEX_CHUNK:
+                conn.execute(insert_sql, [dict(zip("dkrc", row)) for row in rows])
+                written += len(rows)
+                rows = []
+        if rows:
+            conn.execute(insert_sql, [dict(zip("dkrc", row)) for row in rows])
+            written += len(rows)
+    return written
+
+
+def ensure_search_index(engine=None):
+    """
+    Creates the FTS5 index and its triggers if missing, and backfills it the
+    first time it is created on a database that already has acts.
+    """
+    if engine is None:
+        from pylegislation.research.db import engine
+
+    def exists(conn, name):
+        return conn.exec_driver_sql("SELECT 1 FROM sqlite_master WHERE name = ?", (name,)).first() is not None
+
+    with engine.begin() as conn:
+        created = not exists(conn, "act_search_source")
+        sections_created = not exists(conn, "section_search")
+        for statement in SEARCH_SCHEMA:
+            conn.exec_driver_sql(statement)
+        if sections_created and not created:
+            # Indexes built before section_search kept a copy of each section's text
+            conn.exec_driver_sql("DELETE FROM act_search_source WHERE kind = 'section'")
+            conn.exec_driver_sql("INSERT INTO section_search (section_search) VALUES ('rebuild')")
+    if created:
+        rebuild_search_index(engine)
+
+
+def rebuild_search_index(engine=None):
+    """Repopulates the search index from actmetadata, actanalysis and analysissection."""
+    if engine is None:
+        from pylegislation.research.db import engine
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM act_search_source")
+        conn.exec_driver_sql("INSERT INTO act_search (act_search) VALUES ('delete-all')")
+        conn.exec_driver_sql(
+            "INSERT INTO act_search_source (doc_id, kind, content) "
+            "SELECT doc_id, 'title', description FROM actmetadata"
+        )
+        index_analyses(conn)
+        conn.exec_driver_sql("INSERT INTO section_search (section_search) VALUES ('rebuild')")
+        conn.exec_driver_sql("INSERT INTO act_search (act_search) VALUES ('optimize')")
+        count = conn.exec_driver_sql("SELECT count(*) FROM act_search_source").scalar()
+    print(f"Search index rebuilt: {count} entries", file=sys.stderr)
+    return count
+
+
+def build_match_query(text: str) -> Optional[str]:
+    """
+    Turns free text into an FTS5 query: every term is required, quoted so
+    FTS5 operators in user input are literal; a trailing '*' keeps prefix
+    matching ("educ*").
+    """
+    terms = []
+    for term in re.findall(r"[\w*]+", text or ""):
+        prefix = term.endswith("*")
+        term = term.strip("*")
+        if term:
+            terms.append(f'"{term}"' + ("*" if prefix else ""))
+    return " ".join(terms) or None
+
+
+def search_acts(engine, query: str, limit: int = DEFAULT_LIMIT, kind: Optional[str] = None,
+                domain: Optional[str] = None) -> List[dict]:
+    """Ranked hits [{doc_id, title, kind, ref, snippet, score}] (higher score is better)."""
+    match = build_match_query(query)
+    if not match:
+        return []
+
+    # Titles/summaries and sections live in separate FTS indexes; both use
+    # the same tokenizer, so their bm25 ranks are merged directly
+    hits = []
+    if kind != "section":
+        hits.append("""
+            SELECT s.doc_id, s.kind, s.ref,
+                   snippet(act_search, 0, '<mark>', '</mark>', '…', :tokens) AS snippet,
+                   bm25(act_search) AS rank
+            FROM act_search JOIN act_search_source AS s ON s.id = act_search.rowid
+            WHERE act_search MATCH :match
+        """ + (" AND s.kind = :kind" if kind else ""))
+    if kind in (None, "section"):
+        hits.append("""
+            SELECT s.doc_id, 'section', s.section_number,
+                   snippet(section_search, 0, '<mark>', '</mark>', '…', :tokens),
+                   bm25(section_search)
+            FROM section_search JOIN analysissection AS s ON s.rowid = section_search.rowid
+            WHERE section_search MATCH :match
+        """)
+    if not hits:
+        return []
+    sql = f"""
+        SELECT h.doc_id, m.description, h.kind, h.ref, h.snippet, h.rank
+        FROM ({" UNION ALL ".join(hits)}) AS h
+        LEFT JOIN actmetadata AS m ON m.doc_id = h.doc_id
+    """
+    params = {"match": match, "tokens": SNIPPET_TOKENS, "limit": limit}
+    if kind:
+        params["kind"] = kind
+    if domain:
+        sql += " WHERE m.domain = :domain"
+        params["domain"] = domain
+    sql += " ORDER BY h.rank LIMIT :limit"
+
+    from sqlalchemy import text
+
+    with engine.connect() as conn:
+        rows = conn.execute(text(sql), params).all()
+    return [
+        {
+            "doc_id": doc_id,
+            "title": title,
+            "kind": hit_kind,
+            "ref": ref,
+            "snippet": snippet,
+            # bm25() is lower-is-better; negate so clients can sort descending
+            "score": round(-rank, 4),
+        }
+        for doc_id, title, hit_kind, ref, snippet, rank in rows
+    ]
@@ -0,0 +1,149 @@
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    In-process duplicate call suppression: concurrent do() calls with the
+    same key run `fn` once; followers block until the leader finishes and
+    share its result (or exception).
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, bool]:
+        """Returns (result, shared) where shared is True for followers."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.followers += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def record_coalesced(self):
+        """Counts a call that reused another worker's result outside do() (e.g. via a lease)."""
+        with self._lock:
+            self.coalesced += 1
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+# -- Cross-process leases (AnalysisLease rows) --
+
+def lease_owner() -> str:
+    return f"{os.getpid()}:{threading.get_ident()}"
+
+
+def acquire_lease(key: str, owner: str, ttl: timedelta) -> bool:
+    """Takes the lease for `key` unless another live owner holds it. Expired leases are stolen."""
+    from sqlalchemy.exc import IntegrityError
+    from pylegislation.research.db import Session, engine, AnalysisLease
+
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        lease = session.get(AnalysisLease, key)
+        if lease is not None:
+            if lease.expires_at > now and lease.owner != owner:
+                return False
+            session.delete(lease)
+            session.flush()
+        session.add(AnalysisLease(key=key, owner=owner, expires_at=now + ttl))
+        try:
+            session.commit()
+        except IntegrityError:
+            # Another process inserted first
+            session.rollback()
+            return False
+    return True
+
+
+def renew_lease(key: str, owner: str, ttl: timedelta) -> bool:
+    """Pushes the expiry of a lease `owner` holds to now + ttl. False if it was lost (stolen or deleted)."""
+    from sqlalchemy import update
+    from pylegislation.research.db import Session, engine, AnalysisLease
+
+    with Session(engine) as session:
+        result = session.execute(
+            update(AnalysisLease)
+            .where(AnalysisLease.key == key, AnalysisLease.owner == owner)
+            .values(expires_at=datetime.utcnow() + ttl)
+        )
+        session.commit()
+        return result.rowcount > 0
+
+
+@contextmanager
+def keep_lease(key: str, owner: str, ttl: timedelta) -> Iterator[None]:
+    """
+    Renews a held lease every third of its ttl until the block exits, so
+    work that outlives the ttl is not taken over by a waiting process.
+    """
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(ttl.total_seconds() / 3):
+            try:
+                if not renew_lease(key, owner, ttl):
+                    print(f"WARN: Lease {key} was lost while held", file=sys.stderr)
+                    return
+            except Exception as e:
+                print(f"WARN: Failed to renew lease {key}: {e}", file=sys.stderr)
+
+    thread = threading.Thread(target=renew, name=f"lease-{key}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def release_lease(key: str, owner: str):
+    from pylegislation.research.db import Session, engine, AnalysisLease
+
+    try:
+        with Session(engine) as session:
+            lease = session.get(AnalysisLease, key)
+            if lease is not None and lease.owner == owner:
+                session.delete(lease)
+                session.commit()
+    except Exception as e:
+        print(f"WARN: Failed to release lease {key}: {e}", file=sys.stderr)
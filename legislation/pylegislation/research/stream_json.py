@@ -0,0 +1,141 @@
+import json
+from typing import Iterator, List, Optional, Tuple
+
+WHITESPACE = " \t\r\n"
+
+
+class IncrementalJSONScanner:
+    """
+    Incremental scanner for a streamed top-level JSON object.
+
+    feed() accepts arbitrary text fragments and yields events as soon as
+    they are complete:
+      ("field", key, value)  a top-level scalar, e.g. ("field", "summary", "...")
+      ("item", key, value)   one element of a top-level array, e.g. ("item", "sections", {...})
+
+    Nested values are only parsed once their element is complete, so each
+    byte is scanned once and json.loads runs once per emitted value.
+    Text before the first '{' (such as a ```json fence) is ignored.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._value_start: Optional[int] = None
+        self._element_start: Optional[int] = None
+        self.done = False
+
+    def _in_top_array(self) -> bool:
+        return len(self._stack) == 2 and self._stack[1] == '['
+
+    def _emit_scalar(self, kind: str, start: int, end: int) -> Optional[Tuple[str, str, object]]:
+        raw = self._buf[start:end].strip()
+        if not raw:
+            return None
+        try:
+            return (kind, self._key, json.loads(raw))
+        except json.JSONDecodeError:
+            return None
+
+    def feed(self, text: str) -> Iterator[Tuple[str, str, object]]:
+        self._buf += text
+        buf = self._buf
+        i = self._pos
+        n = len(buf)
+        while i < n and not self.done:
+            c = buf[i]
+            depth = len(self._stack)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if depth == 1 and self._key_start is not None:
+                        self._key = json.loads(buf[self._key_start:i + 1])
+                        self._key_start = None
+                    elif depth == 1 and self._value_start is not None:
+                        event = self._emit_scalar("field", self._value_start, i + 1)
+                        self._value_start = None
+                        if event:
+                            yield event
+                    elif self._in_top_array() and self._element_start is not None:
+                        event = self._emit_scalar("item", self._element_start, i + 1)
+                        self._element_start = None
+                        if event:
+                            yield event
+                i += 1
+                continue
+
+            if depth == 0:
+                if c == '{':
+                    self._stack.append('{')
+                    self._expect_key = True
+                i += 1
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if depth == 1 and self._expect_key:
+                    self._key_start = i
+                    self._expect_key = False
+                elif depth == 1 and self._value_start is None:
+                    self._value_start = i
+                elif self._in_top_array() and self._element_start is None:
+                    self._element_start = i
+            elif c in '{[':
+                if self._in_top_array() and self._element_start is None:
+                    self._element_start = i
+                self._stack.append(c)
+            elif c in '}]':
+                if depth == 1 and self._value_start is not None:
+                    event = self._emit_scalar("field", self._value_start, i)
+                    self._value_start = None
+                    if event:
+                        yield event
+                if self._in_top_array() and c == ']' and self._element_start is not None:
+                    event = self._emit_scalar("item", self._element_start, i)
+                    self._element_start = None
+                    if event:
+                        yield event
+                self._stack.pop()
+                if self._in_top_array() and self._element_start is not None:
+                    # A container element of a top-level array just closed
+                    start, self._element_start = self._element_start, None
+                    try:
+                        yield ("item", self._key, json.loads(buf[start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                if not self._stack:
+                    self.done = True
+            elif c == ',':
+                if depth == 1:
+                    if self._value_start is not None:
+                        event = self._emit_scalar("field", self._value_start, i)
+                        self._value_start = None
+                        if event:
+                            yield event
+                    self._expect_key = True
+                elif self._in_top_array() and self._element_start is not None:
+                    event = self._emit_scalar("item", self._element_start, i)
+                    self._element_start = None
+                    if event:
+                        yield event
+            elif c == ':':
+                pass
+            elif c not in WHITESPACE:
+                # Start of a bare scalar (number / true / false / null)
+                if depth == 1 and not self._expect_key and self._value_start is None:
+                    self._value_start = i
+                elif self._in_top_array() and self._element_start is None:
+                    self._element_start = i
+            i += 1
+        self._pos = i
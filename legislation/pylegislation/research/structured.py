@@ -0,0 +1,379 @@
+import json
+import sys
+from typing import Dict, Iterable, List, Optional
+
+# Normalized tables extracted from base analyses.
+#
+# The analysis JSON (see blobs.py) stays the source of truth. Its sections,
+# entities, board members, meetings and referenced acts are copied into
+# indexed tables whenever an analysis is saved or restored, so cross-act
+# questions ("acts mentioning the Ministry of Finance", "section 5A of act
+# X", "boards by domain") are answered in SQL without parsing JSON.
+# AnalysisOutline records the blob each act was extracted from; on startup
+# sync_structured extracts analyses that are missing or out of date.
+
+# Analyses read and rewritten per round trip
+EXTRACT_CHUNK = 200
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+BOARD_FIELDS = ["role_name", "appointing_authority", "removal_criteria", "composition_criteria", "excerpt"]
+MEETING_FIELDS = ["description", "frequency", "location", "time", "excerpt"]
+
+
+def _tables():
+    from pylegislation.research.db import (
+        AnalysisOutline, AnalysisSection, AnalysisEntity, AnalysisBoardMember, AnalysisMeeting, AnalysisReference,
+    )
+    return {
+        "outline": AnalysisOutline.__table__,
+        "sections": AnalysisSection.__table__,
+        "entities": AnalysisEntity.__table__,
+        "board_members": AnalysisBoardMember.__table__,
+        "meeting_details": AnalysisMeeting.__table__,
+        "referenced_acts": AnalysisReference.__table__,
+    }
+
+
+def lookup_key(value: Optional[str]) -> Optional[str]:
+    """Casefolded, whitespace-collapsed form used by the *_key columns."""
+    if value is None:
+        return None
+    return " ".join(value.split()).casefold() or None
+
+
+def _text(value) -> Optional[str]:
+    """Model output is loosely typed; non-string scalars/objects are kept as JSON."""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _dicts(value) -> List[dict]:
+    return [item for item in value if isinstance(item, dict)] if isinstance(value, list) else []
+
+
+def structured_rows(doc_id: str, content_sha256: str, content_json: str) -> Dict[str, List[dict]]:
+    """Rows per table for one analysis; malformed JSON yields only the outline."""
+    try:
+        analysis = json.loads(content_json)
+    except (TypeError, ValueError):
+        analysis = None
+    if not isinstance(analysis, dict):
+        analysis = {}
+
+    sections = []
+    for section in _dicts(analysis.get("sections")):
+        if not isinstance(section.get("content"), str):
+            continue
+        footnotes = section.get("footnotes")
+        sections.append({
+            "doc_id": doc_id,
+            "position": len(sections),
+            "section_number": _text(section.get("section_number")),
+            "content": section["content"],
+            "footnotes_json": json.dumps(footnotes if isinstance(footnotes, list) else []),
+        })
+
+    entities = []
+    for entity in _dicts(analysis.get("entities")):
+        name = entity.get("entity_name")
+        if not isinstance(name, str) or not lookup_key(name):
+            continue
+        entities.append({
+            "doc_id": doc_id,
+            "position": len(entities),
+            "entity_name": name,
+            "name_key": lookup_key(name),
+            "entity_type": _text(entity.get("entity_type")),
+            "excerpt": _text(entity.get("excerpt")),
+        })
+
+    board_members = []
+    for member in _dicts(analysis.get("board_members")):
+        row = {field: _text(member.get(field)) for field in BOARD_FIELDS}
+        row.update(doc_id=doc_id, position=len(board_members), role_key=lookup_key(row["role_name"]))
+        board_members.append(row)
+
+    meetings = []
+    for meeting in _dicts(analysis.get("meeting_details")):
+        row = {field: _text(meeting.get(field)) for field in MEETING_FIELDS}
+        row.update(doc_id=doc_id, position=len(meetings), frequency_key=lookup_key(row["frequency"]))
+        meetings.append(row)
+
+    references = []
+    referenced = analysis.get("referenced_acts")
+    for title in referenced if isinstance(referenced, list) else []:
+        if isinstance(title, str) and lookup_key(title):
+            references.append({"doc_id": doc_id, "position": len(references), "title": title,
+                               "title_key": lookup_key(title)})
+
+    category = analysis.get("category")
+    sub_category = analysis.get("sub_category")
+    return {
+        "outline": [{
+            "doc_id": doc_id,
+            "content_sha256": content_sha256,
+            "category": category if isinstance(category, str) else None,
+            "sub_category": sub_category if isinstance(sub_category, str) else None,
+            "section_count": len(sections),
+            "entity_count": len(entities),
+            "board_member_count": len(board_members),
+            "meeting_count": len(meetings),
+            "referenced_act_count": len(references),
+        }],
+        "sections": sections,
+        "entities": entities,
+        "board_members": board_members,
+        "meeting_details": meetings,
+        "referenced_acts": references,
+    }
+
+
+def index_structured(conn, doc_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    Replaces the normalized rows of the given acts (all acts with None) from
+    their stored analyses, inside conn's transaction. Acts already extracted
+    from their current blob are left alone. Returns the number of analyses
+    extracted.
+    """
+    from sqlalchemy import insert, text
+    from pylegislation.research.blobs import decode_blob
+
+    tables = _tables()
+    if doc_ids is None:
+        for table in tables.values():
+            conn.execute(table.delete())
+        doc_ids = [row[0] for row in conn.execute(text("SELECT doc_id FROM actanalysis"))]
+    else:
+        doc_ids = list(dict.fromkeys(doc_ids))
+
+    extracted = 0
+    for start in range(0, len(doc_ids), EXTRACT_CHUNK):
+        batch = doc_ids[start:start + EXTRACT_CHUNK]
+        params = {f"d{i}": doc_id for i, doc_id in enumerate(batch)}
+        placeholders = ", ".join(f":{name}" for name in params)
+        current = {row[0] for row in conn.execute(text(f"""
+            SELECT o.doc_id FROM analysisoutline AS o
+            JOIN actanalysis AS a ON a.doc_id = o.doc_id AND a.content_sha256 = o.content_sha256
+            WHERE o.doc_id IN ({placeholders})
+        """), params)}
+        if current:
+            batch = [doc_id for doc_id in batch if doc_id not in current]
+            if not batch:
+                continue
+            params = {f"d{i}": doc_id for i, doc_id in enumerate(batch)}
+            placeholders = ", ".join(f":{name}" for name in params)
+        for table in tables.values():
+            conn.execute(table.delete().where(table.c.doc_id.in_(batch)))
+        result = conn.execute(text(f"""
+            SELECT a.doc_id, a.content_sha256, b.codec, b.data FROM actanalysis AS a
+            JOIN analysisblob AS b ON b.sha256 = a.content_sha256
+            WHERE a.doc_id IN ({placeholders})
+        """), params)
+        rows = {name: [] for name in tables}
+        for doc_id, content_sha256, codec, data in result:
+            for name, table_rows in structured_rows(doc_id, content_sha256, decode_blob(codec, data)).items():
+                rows[name].extend(table_rows)
+            extracted += 1
+        for name, table in tables.items():
+            if rows[name]:
+                conn.execute(insert(table), rows[name])
+    return extracted
+
+
+def sync_structured(engine=None) -> int:
+    """Extracts analyses that have no normalized rows yet or changed since (backfill)."""
+    if engine is None:
+        from pylegislation.research.db import engine
+
+    with engine.begin() as conn:
+        stale = [row[0] for row in conn.exec_driver_sql("""
+            SELECT a.doc_id FROM actanalysis AS a
+            LEFT JOIN analysisoutline AS o ON o.doc_id = a.doc_id
+            WHERE o.content_sha256 IS NOT a.content_sha256
+        """)]
+        # Outlines of analyses that no longer exist
+        orphans = [row[0] for row in conn.exec_driver_sql("""
+            SELECT o.doc_id FROM analysisoutline AS o
+            LEFT JOIN actanalysis AS a ON a.doc_id = o.doc_id
+            WHERE a.doc_id IS NULL
+        """)]
+        extracted = index_structured(conn, stale + orphans) if stale or orphans else 0
+    if extracted:
+        print(f"Extracted structured data from {extracted} analyses", file=sys.stderr)
+    return extracted
+
+
+# --- Queries ---
+
+def _key_filter(column: str, value: str, prefix: bool, params: dict, name: str) -> str:
+    """Equality (or indexable prefix range) on a *_key column."""
+    params[name] = lookup_key(value) or ""
+    if not prefix:
+        return f"{column} = :{name}"
+    params[f"{name}_end"] = params[name] + "\U0010ffff"
+    return f"{column} >= :{name} AND {column} < :{name}_end"
+
+
+def _page(sql: str, params: dict, limit: int, offset: int) -> str:
+    params["limit"] = max(1, min(limit, MAX_LIMIT))
+    params["offset"] = max(0, offset)
+    return sql + " LIMIT :limit OFFSET :offset"
+
+
+def get_sections(engine, doc_id: str, number: Optional[str] = None) -> Optional[List[dict]]:
+    """Sections of an act in document order (only those numbered `number` if given); None if not analysed."""
+    from sqlalchemy import text
+
+    sql = "SELECT position, section_number, content, footnotes_json FROM analysissection WHERE doc_id = :doc_id"
+    params = {"doc_id": doc_id}
+    if number is not None:
+        sql += " AND section_number = :number"
+        params["number"] = number
+    with engine.connect() as conn:
+        if not conn.execute(text("SELECT 1 FROM analysisoutline WHERE doc_id = :doc_id"), params).first():
+            return None
+        rows = conn.execute(text(sql + " ORDER BY position"), params).all()
+    return [
+        {"position": position, "section_number": section_number, "content": content,
+         "footnotes": json.loads(footnotes_json)}
+        for position, section_number, content, footnotes_json in rows
+    ]
+
+
+def list_entities(engine, entity_type: Optional[str] = None, q: Optional[str] = None,
+                  limit: int = DEFAULT_LIMIT, offset: int = 0) -> List[dict]:
+    """Distinct (type, name) entities with the number of acts mentioning them, most mentioned first."""
+    from sqlalchemy import text
+
+    where, params = [], {}
+    if entity_type:
+        where.append("entity_type = :entity_type")
+        params["entity_type"] = entity_type
+    if q:
+        where.append(_key_filter("name_key", q, True, params, "q"))
+    sql = f"""
+        SELECT min(entity_name), entity_type, count(DISTINCT doc_id) AS acts, count(*) AS mentions
+        FROM analysisentity {"WHERE " + " AND ".join(where) if where else ""}
+        GROUP BY entity_type, name_key ORDER BY acts DESC, name_key
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(_page(sql, params, limit, offset)), params).all()
+    return [{"entity_name": name, "entity_type": kind, "acts": acts, "mentions": mentions}
+            for name, kind, acts, mentions in rows]
+
+
+def find_entity_mentions(engine, name: str, entity_type: Optional[str] = None, domain: Optional[str] = None,
+                         prefix: bool = False, limit: int = DEFAULT_LIMIT, offset: int = 0) -> List[dict]:
+    """Mentions of an entity (case/whitespace-insensitive name) across acts, in doc_id order."""
+    from sqlalchemy import text
+
+    params = {}
+    where = [_key_filter("e.name_key", name, prefix, params, "name")]
+    if entity_type:
+        where.append("e.entity_type = :entity_type")
+        params["entity_type"] = entity_type
+    if domain:
+        where.append("m.domain = :domain")
+        params["domain"] = domain
+    sql = f"""
+        SELECT e.doc_id, m.description, m.domain, e.entity_name, e.entity_type, e.excerpt
+        FROM analysisentity AS e LEFT JOIN actmetadata AS m ON m.doc_id = e.doc_id
+        WHERE {" AND ".join(where)} ORDER BY e.doc_id, e.position
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(_page(sql, params, limit, offset)), params).all()
+    return [
+        {"doc_id": doc_id, "title": title, "domain": act_domain, "entity_name": entity_name,
+         "entity_type": kind, "excerpt": excerpt}
+        for doc_id, title, act_domain, entity_name, kind, excerpt in rows
+    ]
+
+
+def board_compositions(engine, domain: Optional[str] = None, role: Optional[str] = None,
+                       limit: int = DEFAULT_LIMIT, offset: int = 0) -> dict:
+    """
+    Role counts over the matching acts plus each act's full board
+    ({"roles": [...], "acts": [...]}). `role` keeps acts that have a member
+    with that role; acts are paged in doc_id order.
+    """
+    from sqlalchemy import text
+
+    where, params = [], {}
+    if domain:
+        where.append("m.domain = :domain")
+        params["domain"] = domain
+    if role:
+        where.append(_key_filter("b.role_key", role, False, params, "role"))
+    matching = f"""
+        SELECT DISTINCT b.doc_id FROM analysisboardmember AS b
+        LEFT JOIN actmetadata AS m ON m.doc_id = b.doc_id
+        {"WHERE " + " AND ".join(where) if where else ""}
+    """
+    with engine.connect() as conn:
+        roles = conn.execute(text(f"""
+            SELECT min(role_name), count(DISTINCT doc_id), count(*) FROM analysisboardmember
+            WHERE doc_id IN ({matching}) GROUP BY role_key ORDER BY count(DISTINCT doc_id) DESC, role_key
+        """), params).all()
+        page_params = dict(params)
+        doc_ids = [row[0] for row in conn.execute(
+            text(_page(matching + " ORDER BY b.doc_id", page_params, limit, offset)), page_params
+        )]
+        acts = {}
+        if doc_ids:
+            ids = {f"d{i}": doc_id for i, doc_id in enumerate(doc_ids)}
+            members = conn.execute(text(f"""
+                SELECT b.doc_id, m.description, m.domain, {", ".join("b." + f for f in BOARD_FIELDS)}
+                FROM analysisboardmember AS b LEFT JOIN actmetadata AS m ON m.doc_id = b.doc_id
+                WHERE b.doc_id IN ({", ".join(":" + name for name in ids)}) ORDER BY b.doc_id, b.position
+            """), ids).all()
+            for doc_id, title, act_domain, *values in members:
+                act = acts.setdefault(doc_id, {"doc_id": doc_id, "title": title, "domain": act_domain, "members": []})
+                act["members"].append(dict(zip(BOARD_FIELDS, values)))
+    return {
+        "roles": [{"role_name": name, "acts": acts_count, "members": members_count}
+                  for name, acts_count, members_count in roles],
+        "acts": list(acts.values()),
+    }
+
+
+def find_meetings(engine, frequency: Optional[str] = None, domain: Optional[str] = None,
+                  limit: int = DEFAULT_LIMIT, offset: int = 0) -> List[dict]:
+    """Meeting details across acts, in doc_id order."""
+    from sqlalchemy import text
+
+    where, params = [], {}
+    if frequency:
+        where.append(_key_filter("t.frequency_key", frequency, False, params, "frequency"))
+    if domain:
+        where.append("m.domain = :domain")
+        params["domain"] = domain
+    sql = f"""
+        SELECT t.doc_id, m.description, m.domain, {", ".join("t." + f for f in MEETING_FIELDS)}
+        FROM analysismeeting AS t LEFT JOIN actmetadata AS m ON m.doc_id = t.doc_id
+        {"WHERE " + " AND ".join(where) if where else ""} ORDER BY t.doc_id, t.position
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(_page(sql, params, limit, offset)), params).all()
+    return [
+        {"doc_id": doc_id, "title": title, "domain": act_domain, **dict(zip(MEETING_FIELDS, values))}
+        for doc_id, title, act_domain, *values in rows
+    ]
+
+
+def find_referencing_acts(engine, title: str, prefix: bool = False,
+                          limit: int = DEFAULT_LIMIT, offset: int = 0) -> List[dict]:
+    """Acts whose analysis lists `title` (case/whitespace-insensitive) among its referenced acts."""
+    from sqlalchemy import text
+
+    params = {}
+    sql = f"""
+        SELECT r.doc_id, m.description, m.domain, r.title
+        FROM analysisreference AS r LEFT JOIN actmetadata AS m ON m.doc_id = r.doc_id
+        WHERE {_key_filter("r.title_key", title, prefix, params, "title")} ORDER BY r.doc_id, r.position
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(text(_page(sql, params, limit, offset)), params).all()
+    return [{"doc_id": doc_id, "title": act_title, "domain": act_domain, "referenced_title": referenced}
+            for doc_id, act_title, act_domain, referenced in rows]
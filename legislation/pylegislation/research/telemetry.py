@@ -0,0 +1,271 @@
+import json
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+# Gemini 2.0 Flash pricing (USD per 1M tokens)
+INPUT_COST_PER_M = 0.10
+OUTPUT_COST_PER_M = 0.40
+
+
+def estimate_cost(input_tokens: int, output_tokens: int) -> float:
+    """Estimated request cost in USD."""
+    return (input_tokens * INPUT_COST_PER_M / 1_000_000) + (output_tokens * OUTPUT_COST_PER_M / 1_000_000)
+
+
+def record_telemetry(doc_id: str, model: str, input_tokens: int, output_tokens: int,
+                     latency_ms: int, status: str, cost_usd: Optional[float] = None,
+                     upload_cache_hits: Optional[int] = None, upload_cache_misses: Optional[int] = None):
+    """
+    Records a TelemetryLog row: queued on the background sink when it is
+    running (API server, batch runs), written synchronously otherwise.
+    Failures are reported but never raised.
+    """
+    row = {
+        "doc_id": doc_id,
+        "timestamp": datetime.utcnow(),
+        "model": model,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "latency_ms": latency_ms,
+        "status": status,
+        "cost_usd": cost_usd,
+        "upload_cache_hits": upload_cache_hits,
+        "upload_cache_misses": upload_cache_misses,
+    }
+    if telemetry_sink.running:
+        telemetry_sink.submit(row)
+        return
+    try:
+        write_telemetry_rows([row])
+    except Exception as e:
+        print(f"WARN: Failed to record telemetry for {doc_id}: {e}", file=sys.stderr)
+
+
+def write_telemetry_rows(rows: List[dict]):
+    """Inserts TelemetryLog rows in one transaction."""
+    from sqlalchemy import insert
+    from pylegislation.research.db import Session, engine, TelemetryLog
+
+    for row in rows:
+        # Core inserts bypass the model's default_factory
+        row.setdefault("timestamp", datetime.utcnow())
+    with Session(engine) as session:
+        session.execute(insert(TelemetryLog), rows)
+        session.commit()
+
+
+# --- Background sink ---
+# Rows are flushed every FLUSH_ROWS rows or FLUSH_INTERVAL seconds, whichever
+# comes first, so request threads never wait on the SQLite write lock.
+FLUSH_ROWS = 100
+FLUSH_INTERVAL = 0.5
+MAX_BACKLOG = 10_000
+_WAKE = object()
+
+
+class TelemetrySink:
+    """Batches telemetry rows from a bounded queue into single-transaction inserts."""
+
+    def __init__(self, flush_rows: int = FLUSH_ROWS, flush_interval: float = FLUSH_INTERVAL,
+                 max_backlog: int = MAX_BACKLOG):
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_backlog)
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self) -> bool:
+        """Starts the writer thread. Returns False if it was already running."""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="telemetry-sink", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self, timeout: float = 10.0):
+        """Flushes everything queued and stops the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._stop.set()
+        try:
+            # Wake the writer if it is waiting on an empty queue
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+        # Rows submitted while stopping
+        self._flush(self._drain())
+
+    def submit(self, row: dict) -> bool:
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"WARN: Telemetry backlog full, dropped row for {row.get('doc_id')}", file=sys.stderr)
+            return False
+
+    def backlog(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {"backlog": self.backlog(), "written": self.written, "dropped": self.dropped, "flushes": self.flushes}
+
+    def _drain(self, limit: Optional[int] = None) -> List[dict]:
+        rows = []
+        while limit is None or len(rows) < limit:
+            try:
+                rows.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return rows
+
+    def _flush(self, rows: List[dict]):
+        rows = [row for row in rows if row is not _WAKE]
+        if not rows:
+            return
+        try:
+            write_telemetry_rows(rows)
+            self.written += len(rows)
+            self.flushes += 1
+        except Exception as e:
+            self.dropped += len(rows)
+            print(f"WARN: Failed to write {len(rows)} telemetry rows: {e}", file=sys.stderr)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            rows = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.flush_rows and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(rows)
+        self._flush(self._drain())
+
+
+telemetry_sink = TelemetrySink()
+
+
+# --- Rollups ---
+# TelemetryRollup rows are kept current by an AFTER INSERT trigger on
+# telemetrylog, so /analytics never rescans the log. Latency is tracked as
+# a histogram over these upper bounds (ms); the last bucket is overflow.
+LATENCY_BUCKETS_MS = [250, 500, 1000, 2000, 5000, 10000, 20000, 30000, 60000, 120000, 300000]
+
+
+def _bucket_case(latency: str) -> str:
+    whens = " ".join(f"WHEN {latency} <= {bound} THEN {i}" for i, bound in enumerate(LATENCY_BUCKETS_MS))
+    return f"CASE {whens} ELSE {len(LATENCY_BUCKETS_MS)} END"
+
+
+def _empty_histogram() -> str:
+    return json.dumps([0] * (len(LATENCY_BUCKETS_MS) + 1))
+
+
+ROLLUP_TRIGGER = f"""
+CREATE TRIGGER IF NOT EXISTS telemetrylog_rollup_ai AFTER INSERT ON telemetrylog BEGIN
+    INSERT OR IGNORE INTO telemetryrollup
+        (day, model, requests, failures, input_tokens, output_tokens, cost_usd,
+         latency_sum_ms, latency_max_ms, latency_histogram, upload_cache_hits, upload_cache_misses)
+    VALUES (date(new.timestamp), new.model, 0, 0, 0, 0, 0.0, 0, 0, '{_empty_histogram()}', 0, 0);
+    UPDATE telemetryrollup SET
+        requests = requests + 1,
+        failures = failures + (new.status != 'SUCCESS'),
+        input_tokens = input_tokens + new.input_tokens,
+        output_tokens = output_tokens + new.output_tokens,
+        cost_usd = cost_usd + coalesce(new.cost_usd, 0),
+        latency_sum_ms = latency_sum_ms + new.latency_ms,
+        latency_max_ms = max(latency_max_ms, new.latency_ms),
+        latency_histogram = json_set(
+            latency_histogram,
+            '$[' || ({_bucket_case('new.latency_ms')}) || ']',
+            json_extract(latency_histogram, '$[' || ({_bucket_case('new.latency_ms')}) || ']') + 1
+        ),
+        upload_cache_hits = upload_cache_hits + coalesce(new.upload_cache_hits, 0),
+        upload_cache_misses = upload_cache_misses + coalesce(new.upload_cache_misses, 0)
+    WHERE day = date(new.timestamp) AND model = new.model;
+END
+"""
+
+
+def ensure_telemetry_rollups(engine=None):
+    """Installs the rollup trigger; backfills the rollups the first time it is installed."""
+    if engine is None:
+        from pylegislation.research.db import engine
+
+    with engine.begin() as conn:
+        installed = conn.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'telemetrylog_rollup_ai'"
+        ).first()
+        conn.exec_driver_sql(ROLLUP_TRIGGER)
+    if not installed:
+        rebuild_telemetry_rollups(engine)
+
+
+def rebuild_telemetry_rollups(engine=None) -> int:
+    """Recomputes every TelemetryRollup row from telemetrylog. Returns the row count."""
+    if engine is None:
+        from pylegislation.research.db import engine
+
+    bucket_counts = ", ".join(
+        f"sum(({_bucket_case('latency_ms')}) = {i})" for i in range(len(LATENCY_BUCKETS_MS) + 1)
+    )
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DELETE FROM telemetryrollup")
+        conn.exec_driver_sql(f"""
+            INSERT INTO telemetryrollup
+                (day, model, requests, failures, input_tokens, output_tokens, cost_usd,
+                 latency_sum_ms, latency_max_ms, latency_histogram, upload_cache_hits, upload_cache_misses)
+            SELECT date(timestamp), model, count(*), sum(status != 'SUCCESS'), sum(input_tokens),
+                   sum(output_tokens), coalesce(sum(cost_usd), 0), sum(latency_ms), max(latency_ms),
+                   json_array({bucket_counts}),
+                   coalesce(sum(upload_cache_hits), 0), coalesce(sum(upload_cache_misses), 0)
+            FROM telemetrylog
+            GROUP BY date(timestamp), model
+        """)
+        return conn.exec_driver_sql("SELECT count(*) FROM telemetryrollup").scalar()
+
+
+def latency_percentile(histogram: List[int], fraction: float, max_ms: int = 0) -> float:
+    """
+    Estimates a latency percentile from bucket counts, interpolating
+    linearly inside the bucket (the overflow bucket ends at max_ms).
+    """
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    target = fraction * total
+    seen = 0
+    for i, count in enumerate(histogram):
+        if count and seen + count >= target:
+            lower = LATENCY_BUCKETS_MS[i - 1] if i > 0 else 0
+            upper = LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else max(max_ms, lower)
+            upper = min(upper, max_ms) if max_ms else upper
+            return round(lower + (upper - lower) * (target - seen) / count, 1)
+        seen += count
+    return float(max_ms)
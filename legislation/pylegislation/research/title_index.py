@@ -0,0 +1,195 @@
+import difflib
+import heapq
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, defaultdict
+from typing import Dict, List, Set
+
+# Same defaults as the original difflib.get_close_matches call
+DEFAULT_TOP_K = 5
+DEFAULT_CUTOFF = 0.6
+# Only the best trigram candidates are re-scored with SequenceMatcher
+MAX_CANDIDATES = 25
+# Trigrams in more than this share of titles are not used to find candidates
+STOP_GRAM_SHARE = 0.1
+STOP_GRAM_MIN_DF = 50
+# How often (seconds) a query may count ActMetadata rows to detect writes
+# made outside add_act (dump restores, other processes)
+CHECK_INTERVAL = 5.0
+
+
+def normalize_title(title: str) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^\w\s]", " ", (title or "").casefold())).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """
+    Trigram inverted index over act titles for fuzzy duplicate detection.
+
+    Candidates are the titles sharing the most trigrams with the query
+    (Dice coefficient); the top MAX_CANDIDATES are scored with the same
+    difflib.SequenceMatcher ratio the endpoint has always reported.
+    """
+
+    def __init__(self):
+        self._titles: Dict[str, str] = {}
+        # Identical titles (e.g. yearly "Appropriation Act"s) are indexed once
+        self._docs_by_title: Dict[str, Set[str]] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._last_check = 0.0
+
+    def add(self, doc_id: str, title: str):
+        with self._lock:
+            if doc_id in self._titles:
+                self.remove(doc_id)
+            self._titles[doc_id] = title
+            docs = self._docs_by_title.get(title)
+            if docs is None:
+                docs = self._docs_by_title[title] = set()
+                grams = self._grams[title] = trigrams(normalize_title(title))
+                for gram in grams:
+                    self._postings[gram].add(title)
+            docs.add(doc_id)
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            title = self._titles.pop(doc_id, None)
+            docs = self._docs_by_title.get(title)
+            if docs is None:
+                return
+            docs.discard(doc_id)
+            if docs:
+                return
+            del self._docs_by_title[title]
+            for gram in self._grams.pop(title, ()):
+                posting = self._postings.get(gram)
+                if posting is not None:
+                    posting.discard(title)
+                    if not posting:
+                        del self._postings[gram]
+
+    def load(self, engine):
+        """(Re)builds the index from all ActMetadata rows."""
+        from sqlmodel import Session, select
+        from pylegislation.research.db import ActMetadata
+
+        with Session(engine) as session:
+            rows = session.exec(select(ActMetadata.doc_id, ActMetadata.description)).all()
+        with self._lock:
+            self._titles.clear()
+            self._docs_by_title.clear()
+            self._grams.clear()
+            self._postings.clear()
+            for doc_id, title in rows:
+                self.add(doc_id, title or "")
+            self._loaded = True
+            self._last_check = time.monotonic()
+
+    def ensure_fresh(self, engine):
+        """Loads on first use and reloads if the row count drifted from the index."""
+        if not self._loaded:
+            self.load(engine)
+            return
+        now = time.monotonic()
+        if now - self._last_check < CHECK_INTERVAL:
+            return
+        from sqlmodel import Session, select, func
+        from pylegislation.research.db import ActMetadata
+
+        self._last_check = now
+        try:
+            with Session(engine) as session:
+                count = session.exec(select(func.count()).select_from(ActMetadata)).one()
+        except Exception as e:
+            print(f"WARN: Title index freshness check failed: {e}", file=sys.stderr)
+            return
+        if count != len(self._titles):
+            self.load(engine)
+
+    def _candidates(self, grams: Set[str]) -> List[str]:
+        # Trigrams shared by a large share of titles (e.g. from "(Amendment)")
+        # add the same count to most candidates; skipping them keeps the scan
+        # proportional to the distinctive part of the query.
+        stop_df = max(STOP_GRAM_MIN_DF, int(len(self._docs_by_title) * STOP_GRAM_SHARE))
+        overlap = Counter()
+        for gram in grams:
+            posting = self._postings.get(gram, ())
+            if len(posting) > stop_df:
+                continue
+            overlap.update(posting)
+        scored = (
+            (2 * shared / (len(grams) + len(self._grams[title])), title)
+            for title, shared in overlap.items()
+        )
+        return [title for _, title in heapq.nlargest(MAX_CANDIDATES, scored)]
+
+    def query(self, title: str, k: int = DEFAULT_TOP_K, cutoff: float = DEFAULT_CUTOFF) -> List[dict]:
+        """Top-k [{'title', 'doc_id', 'score'}] with SequenceMatcher ratio >= cutoff."""
+        grams = trigrams(normalize_title(title))
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(title)
+        results = []
+        with self._lock:
+            for candidate in self._candidates(grams):
+                matcher.set_seq1(candidate)
+                # Cheap upper bounds first, as get_close_matches does
+                if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                    continue
+                score = matcher.ratio()
+                if score >= cutoff:
+                    results.extend(
+                        {"title": candidate, "doc_id": doc_id, "score": score}
+                        for doc_id in self._docs_by_title[candidate]
+                    )
+        results.sort(key=lambda r: (-r["score"], r["doc_id"]))
+        return results[:k]
+
+    def query_many(self, titles: List[str], k: int = DEFAULT_TOP_K,
+                   cutoff: float = DEFAULT_CUTOFF) -> List[List[dict]]:
+        """
+        Checks a whole upload in one pass: each title against the index and
+        against the titles earlier in the same upload (reported with
+        doc_id None and 'batch_index').
+        """
+        pending = TitleIndex()
+        pending._loaded = True
+        results = []
+        for i, title in enumerate(titles):
+            matches = self.query(title, k, cutoff)
+            for match in pending.query(title, k, cutoff):
+                position = int(match["doc_id"])
+                matches.append({"title": match["title"], "doc_id": None, "batch_index": position, "score": match["score"]})
+            matches.sort(key=lambda r: -r["score"])
+            results.append(matches[:k])
+            pending.add(str(i), title)
+        return results
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+
+_indexes = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def get_title_index(engine=None) -> TitleIndex:
+    """Process-wide, fresh title index for `engine` (defaults to the research.db engine)."""
+    if engine is None:
+        from pylegislation.research.db import engine
+    with _indexes_lock:
+        index = _indexes.get(engine)
+        if index is None:
+            index = _indexes[engine] = TitleIndex()
+    index.ensure_fresh(engine)
+    return index
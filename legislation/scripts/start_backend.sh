@@ -4,24 +4,15 @@ set -e
 # Migrate metadata
 legislation research migrate
 
-# Restore Analysis & Telemetry if dump exists
 # Restore Analysis & Telemetry
 DUMP_DIR="/app/reports/database/dump"
-# Find latest timestamped dump (lexicographically last is latest time)
-LATEST_DUMP=$(find "$DUMP_DIR" -name "analysis_dump_*.json" -type f | sort | tail -n 1)
-
-if [ -n "$LATEST_DUMP" ]; then
-    echo "Found latest dump file: $LATEST_DUMP. Restoring..."
-    legislation research load-analysis "$LATEST_DUMP"
+# Replays the latest full dump and its deltas (manifest.json), or the newest
+# standalone analysis_dump_* file when there is no manifest
+if [ -d "$DUMP_DIR" ]; then
+    echo "Restoring analysis dumps from $DUMP_DIR..."
+    legislation research load-analysis "$DUMP_DIR"
 else
-    # Fallback to non-timestamped file
-    FALLBACK="$DUMP_DIR/analysis_dump.json"
-    if [ -f "$FALLBACK" ]; then
-        echo "Found fallback dump file at $FALLBACK. Restoring..."
-        legislation research load-analysis "$FALLBACK"
-    else
-        echo "No dump files found in $DUMP_DIR. Skipping restore."
-    fi
+    echo "No dump directory at $DUMP_DIR. Skipping restore."
 fi
 
 # Start Backend
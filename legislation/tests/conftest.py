@@ -0,0 +1,5 @@
+import os
+
+# Tests patch the engine around the app's lifespan; restore dumps before
+# serving rather than on a thread sharing the test connection.
+os.environ.setdefault("RESEARCH_STARTUP_RESTORE", "sync")
@@ -0,0 +1,42 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+from pylegislation.research import act_index
+from pylegislation.research.act_index import ActIndex
+
+HEADER = "doc_type\tdoc_id\tnum\tdate_str\tdescription\turl_metadata\tlang\turl_pdf\tdoc_number\tdomain\n"
+
+
+def write_tsv(path: Path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for doc_id, title in rows:
+            f.write(f"lk_acts\t{doc_id}\t1\t2020-01-01\t{title}\t\ten\thttp://x/{doc_id}.pdf\t1/2020\tOther\n")
+
+
+def test_act_index_lookup_and_invalidation(tmp_path):
+    tsv = tmp_path / "docs.tsv"
+    write_tsv(tsv, [("a-1", "First Act")])
+
+    with patch.object(act_index, "CHECK_INTERVAL", 0):
+        index = ActIndex(tsv)
+        assert index.get("a-1")["description"] == "First Act"
+        assert index.get("missing") is None
+
+        # Appending a row changes mtime/size -> index is rebuilt
+        write_tsv(tsv, [("a-1", "First Act"), ("a-2", "Second Act")])
+        st = tsv.stat()
+        os.utime(tsv, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+        assert index.get("a-2")["description"] == "Second Act"
+        assert len(index) == 2
+
+
+def test_act_index_lookups_skip_io_between_checks(tmp_path):
+    tsv = tmp_path / "docs.tsv"
+    write_tsv(tsv, [("a-1", "First Act")])
+
+    index = ActIndex(tsv)
+    index.refresh(force=True)
+    with patch.object(act_index, "_stat_key", side_effect=AssertionError("stat called")):
+        assert index.get("a-1") is not None
@@ -112,3 +112,88 @@ def test_add_act_flow():
     # Cleanup
     shutil.rmtree(temp_dir)
     print("Tests Passed Successfully!")
+
+
+def test_batch_add_is_transactional():
+    test_engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(test_engine)
+    temp_dir = tempfile.mkdtemp()
+    temp_tsv = Path(temp_dir) / "test_docs.tsv"
+    with open(temp_tsv, "w") as f:
+        f.write("doc_type\tdoc_id\tnum\tdate_str\tdescription\turl_metadata\tlang\turl_pdf\tdoc_number\tdomain\n")
+
+    with patch("pylegislation.research.api.main.engine", test_engine), \
+         patch("pylegislation.research.db.engine", test_engine), \
+         patch("pylegislation.research.api.main.get_head_path", return_value=temp_tsv), \
+         TestClient(app) as client:
+        client.post("/acts/add", json={"title": "Existing Act", "url_pdf": "http://e.pdf", "year": "2020"})
+
+        resp = client.post("/acts/batch", json=[
+            {"title": "Bulk Act 1", "url_pdf": "http://1.pdf", "year": "2020"},
+            {"title": "Bulk Act 1", "url_pdf": "http://1b.pdf", "year": "2020"},
+            {"title": "Existing Act", "url_pdf": "http://e.pdf", "year": "2020"},
+            {"title": "", "url_pdf": "http://x.pdf"},
+            {"title": "Bulk Act 2", "url_pdf": "http://2.pdf", "year": "2020"},
+        ])
+        body = resp.json()
+        assert body["added"] == 2
+        assert [r["status"] for r in body["results"]] == ["added", "duplicate", "exists", "invalid", "added"]
+        assert len(body["errors"]) == 3
+
+        lines = temp_tsv.read_text().splitlines()
+        assert len(lines) == 4
+        assert lines[-1].split("\t")[1] == "custom-2020-bulk-act-2"
+
+        # A failing TSV append leaves the DB untouched
+        with patch("pylegislation.research.api.main.get_head_path", return_value=Path(temp_dir) / "missing" / "x.tsv"):
+            resp = client.post("/acts/batch", json=[{"title": "Bulk Act 3", "url_pdf": "http://3.pdf", "year": "2020"}])
+        assert resp.json()["added"] == 0
+        assert resp.json()["results"][0]["status"] == "failed"
+        with Session(test_engine) as session:
+            assert session.get(ActMetadata, "custom-2020-bulk-act-3") is None
+
+    shutil.rmtree(temp_dir)
+
+
+def test_acts_listing_pagination_and_facets():
+    test_engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    SQLModel.metadata.create_all(test_engine)
+    with Session(test_engine) as session:
+        for i in range(5):
+            session.add(ActMetadata(
+                doc_id=f"act-{i}", doc_type="lk_acts", num=str(i), date_str=f"202{i % 2}-01-01",
+                description=f"Act {i}", lang="en", url_pdf="", domain="Education" if i % 2 else "Finance",
+                year=f"202{i % 2}"
+            ))
+        session.commit()
+
+    with patch("pylegislation.research.api.main.engine", test_engine), \
+         patch("pylegislation.research.db.engine", test_engine), \
+         TestClient(app) as client:
+        assert len(client.get("/acts").json()) == 5
+
+        resp = client.get("/acts", params={"limit": 2, "fields": "doc_id,description"})
+        assert resp.json() == [{"doc_id": "act-0", "description": "Act 0"}, {"doc_id": "act-1", "description": "Act 1"}]
+        resp = client.get("/acts", params={"limit": 2, "cursor": resp.headers["X-Next-Cursor"], "fields": "doc_id"})
+        assert [a["doc_id"] for a in resp.json()] == ["act-2", "act-3"]
+
+        resp = client.get("/acts", params={"domain": "Education"})
+        assert [a["doc_id"] for a in resp.json()] == ["act-1", "act-3"]
+        assert client.get("/acts", params={"domain": "Education"},
+                          headers={"If-None-Match": resp.headers["ETag"]}).status_code == 304
+
+        facets = client.get("/acts/facets", params={"domain": "Education"}).json()
+        assert facets["total"] == 2
+        assert facets["domain"] == [{"value": "Finance", "count": 3}, {"value": "Education", "count": 2}]
+        assert facets["year"] == [{"value": "2021", "count": 2}]
+
+        assert client.get("/acts", params={"fields": "bogus"}).status_code == 400
+        assert client.get("/acts", params={"cursor": "%%%"}).status_code == 400
@@ -0,0 +1,82 @@
+import time
+from contextlib import ExitStack
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlmodel import Session, create_engine, select
+from sqlalchemy.pool import StaticPool
+
+from pylegislation.research.batch import RateLimiter, run_batch
+from pylegislation.research.blobs import put_text
+from pylegislation.research.db import ActAnalysis, BatchItem, BatchRun, init_schema
+
+
+def test_rate_limiter_waits_for_tokens_and_settles():
+    with pytest.raises(ValueError):
+        RateLimiter(0, 1000)
+
+    # 60k tokens/minute refills 1000 tokens per second
+    limiter = RateLimiter(rpm=600, tpm=60_000)
+    reserved = limiter.acquire(60_000)
+    t0 = time.monotonic()
+    limiter.acquire(100)
+    assert time.monotonic() - t0 >= 0.08
+
+    # Unused reservation goes back to the bucket: no wait
+    limiter.settle(reserved, 1_000)
+    t0 = time.monotonic()
+    limiter.acquire(50_000)
+    assert time.monotonic() - t0 < 0.05
+
+
+class Crash(BaseException):
+    """Stands in for the process dying mid-run (not caught like an analysis error)."""
+
+
+def _batch_env(engine, analyze):
+    stack = ExitStack()
+    stack.enter_context(patch("pylegislation.research.db.engine", engine))
+    stack.enter_context(patch("pylegislation.research.db.create_db_and_tables", lambda: init_schema(engine)))
+    stack.enter_context(patch("pylegislation.research.analyze.analyze_act_by_id", analyze))
+    stack.enter_context(patch("pylegislation.research.telemetry.record_telemetry", MagicMock()))
+    stack.enter_context(patch("pylegislation.research.telemetry.telemetry_sink", MagicMock(**{"start.return_value": False})))
+    return stack
+
+
+def _statuses(engine, run_id):
+    with Session(engine) as session:
+        return dict(session.exec(select(BatchItem.doc_id, BatchItem.status).where(BatchItem.run_id == run_id)).all())
+
+
+def test_batch_skips_cached_acts_and_resumes_after_crash(tmp_path):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    init_schema(engine)
+    with Session(engine) as session:
+        session.add(ActAnalysis(doc_id="cached", model="m", content_sha256=put_text(session, "{}")))
+        session.commit()
+
+    calls = []
+
+    def crashing(doc_id, *args, **kwargs):
+        calls.append(doc_id)
+        if doc_id == "b":
+            raise Crash()
+        return {"model": "m", "input_tokens": 10, "output_tokens": 5}
+
+    with _batch_env(engine, crashing), pytest.raises(Crash):
+        run_batch("key", tmp_path, doc_ids=["a", "cached", "b", "c"], concurrency=1)
+    with Session(engine) as session:
+        run_id = session.exec(select(BatchRun.id)).one()
+    statuses = _statuses(engine, run_id)
+    assert statuses["a"] == "SUCCESS" and statuses["cached"] == "SKIPPED" and statuses["b"] == "PENDING"
+    assert "cached" not in calls
+
+    calls.clear()
+    with _batch_env(engine, lambda doc_id, *a, **k: calls.append(doc_id) or {"model": "m"}):
+        summary = run_batch("key", tmp_path, resume_run_id=run_id)
+    # Only the acts the crashed run did not finish are analyzed
+    assert sorted(calls) == sorted(d for d, s in statuses.items() if s == "PENDING")
+    assert summary["analyzed"] == len(calls)
+    assert set(_statuses(engine, run_id).values()) == {"SUCCESS", "SKIPPED"}
+    with Session(engine) as session:
+        assert session.get(BatchRun, run_id).status == "DONE"
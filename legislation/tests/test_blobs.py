@@ -0,0 +1,50 @@
+import json
+
+from sqlmodel import create_engine
+from sqlalchemy import inspect
+from sqlalchemy.pool import StaticPool
+
+from pylegislation.research.blobs import decode_blob, encode_text, get_texts
+from pylegislation.research.db import init_schema
+from pylegislation.research.search import search_acts
+
+
+def test_encode_round_trip_and_small_texts_stay_raw():
+    text = json.dumps({"summary": "Établishes " * 200})
+    row = encode_text(text)
+    assert row["codec"] == "zlib" and len(row["data"]) < row["size"]
+    assert decode_blob(row["codec"], row["data"]) == text
+    assert encode_text("{}")["codec"] == "raw"
+
+
+def test_inline_content_is_migrated_to_blobs():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    analysis = json.dumps({"summary": "Regulates inland fisheries."})
+    with engine.begin() as conn:
+        # Layout written by earlier versions: text inline, NOT NULL
+        conn.exec_driver_sql("CREATE TABLE actanalysis (doc_id VARCHAR PRIMARY KEY, timestamp DATETIME NOT NULL, "
+                             "model VARCHAR NOT NULL, content_json VARCHAR NOT NULL)")
+        conn.exec_driver_sql("CREATE TABLE analysishistory (id INTEGER PRIMARY KEY, doc_id VARCHAR NOT NULL, "
+                             "timestamp DATETIME NOT NULL, prompt VARCHAR NOT NULL, response VARCHAR NOT NULL, "
+                             "model VARCHAR NOT NULL)")
+        conn.exec_driver_sql("INSERT INTO actanalysis VALUES ('fish', '2026-01-01 00:00:00', 'm', ?)", (analysis,))
+        conn.exec_driver_sql("INSERT INTO analysishistory VALUES (1, 'fish', '2026-01-01 00:00:00', "
+                             "'Base Analysis', ?, 'm')", (analysis,))
+        conn.exec_driver_sql("INSERT INTO analysishistory VALUES (2, 'fish', '2026-01-02 00:00:00', 'q', 'a', 'm')")
+
+    init_schema(engine)
+    init_schema(engine)  # idempotent
+
+    inspector = inspect(engine)
+    assert "content_json" not in {c["name"] for c in inspector.get_columns("actanalysis")}
+    assert "response" not in {c["name"] for c in inspector.get_columns("analysishistory")}
+    assert "ix_analysishistory_doc_id_timestamp" in {i["name"] for i in inspector.get_indexes("analysishistory")}
+    with engine.connect() as conn:
+        refs = conn.exec_driver_sql("SELECT response_sha256 FROM analysishistory ORDER BY id").scalars().all()
+        content_sha256 = conn.exec_driver_sql("SELECT content_sha256 FROM actanalysis").scalar()
+        assert conn.exec_driver_sql("SELECT count(*) FROM analysisblob").scalar() == 2
+        texts = get_texts(conn, refs)
+    # The cache and its base history entry share one blob
+    assert refs[0] == content_sha256
+    assert [texts[sha] for sha in refs] == [analysis, "a"]
+    assert search_acts(engine, "fisheries")[0]["kind"] == "summary"
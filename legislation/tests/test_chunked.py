@@ -0,0 +1,107 @@
+import json
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from pypdf import PdfReader, PdfWriter
+
+from pylegislation.research.chunked import analyze_chunked, merge_chunk_results, split_pdf
+
+PDF_DIR = Path(__file__).parent.parent / "web/public/pdfs"
+
+
+def test_merge_chunk_results_is_deterministic():
+    parts = [
+        {
+            "summary": "Part one",
+            "category": "Education",
+            "referenced_acts": ["Universities Act", "Finance Act"],
+            "sections": [
+                {"section_number": "1", "content": "Short title.", "footnotes": []},
+                {"section_number": "2", "content": "The Board shall", "footnotes": ["a"]},
+            ],
+            "entities": [{"entity_name": "Minister of Education", "entity_type": "Ministry", "excerpt": "x"}],
+            "amendments": [{"type": "Repeal"}],
+        },
+        {
+            "summary": "Part two",
+            "category": "Finance & Economy",
+            "referenced_acts": ["universities act"],
+            "sections": [
+                {"section_number": "2", "content": "consist of five members.", "footnotes": ["b"]},
+                {"section_number": "3", "content": "Interpretation.", "footnotes": []},
+            ],
+            "entities": [{"entity_name": "minister of education ", "entity_type": "Ministry", "excerpt": "y"}],
+            "amendments": [{"type": "Repeal"}],
+        },
+    ]
+
+    merged = merge_chunk_results(parts, {"summary": "Whole act", "category": "Education", "sub_category": "Universities"})
+
+    assert merged["summary"] == "Whole act"
+    assert merged["category"] == "Education"
+    assert [s["section_number"] for s in merged["sections"]] == ["1", "2", "3"]
+    assert merged["sections"][1]["content"] == "The Board shall\nconsist of five members."
+    assert merged["sections"][1]["footnotes"] == ["a", "b"]
+    assert merged["referenced_acts"] == ["Universities Act", "Finance Act"]
+    assert len(merged["entities"]) == 1
+    assert merged["amendments"] == [{"type": "Repeal"}]
+
+    # Without an overview the first chunk summary / majority category are used
+    fallback = merge_chunk_results(parts)
+    assert fallback["summary"] == "Part one"
+    assert fallback["category"] == "Education"
+
+
+def test_split_pdf_covers_all_pages(tmp_path):
+    pdf = PDF_DIR / "universities-act-16-1978.pdf"
+
+    total = len(PdfReader(pdf).pages)
+    chunks = split_pdf(pdf, tmp_path, pages_per_chunk=10)
+    assert sum(len(PdfReader(path).pages) for path, _ in chunks) == total
+    assert chunks[0][1] == f"pages 1-{min(10, total)}"
+
+
+def _response(text, finish_reason="STOP"):
+    return SimpleNamespace(text=text, usage_metadata=None,
+                           candidates=[SimpleNamespace(finish_reason=SimpleNamespace(name=finish_reason))])
+
+
+def test_truncated_chunks_are_resplit_not_repaired(tmp_path):
+    source = PdfReader(PDF_DIR / "universities-act-16-1978.pdf")
+    writer = PdfWriter()
+    for page in source.pages[:10]:
+        writer.add_page(page)
+    doc = tmp_path / "act.pdf"
+    with open(doc, "wb") as f:
+        writer.write(f)
+
+    def generate(api_key, path, prompt, config=None):
+        first, last = map(int, path.stem.rsplit("_p", 1)[1].split("-"))
+        if last - first >= 2:
+            # Over two pages the output does not fit
+            return _response('{"sections": [{"section_number": "1", "content": "Sho', "MAX_TOKENS"), True
+        if first <= 7 <= last:
+            # Page 7 never yields valid JSON; it is narrowed down to that page
+            return _response('{"sections": ['), True
+        return _response(json.dumps({
+            "summary": f"Pages {first}-{last}", "category": "Education",
+            "sections": [{"section_number": f"{first}-{last}", "content": "x"}],
+        })), True
+
+    client = MagicMock()
+    client.models.generate_content.return_value = _response(json.dumps({"summary": "Whole act", "category": "Education"}))
+    with patch("pylegislation.research.chunked.CHUNK_PAGES", 4), \
+            patch("pylegislation.research.chunked._json_config", lambda tokens: None), \
+            patch("pylegislation.research.gemini.generate_with_document", generate), \
+            patch("pylegislation.research.gemini.get_client", return_value=client):
+        result = analyze_chunked(doc, "key")
+
+    analysis = json.loads(result["text"])
+    # Every other page survives, in order; page 7 alone is left out
+    assert [s["section_number"] for s in analysis["sections"]] == ["1-2", "3-4", "5-6", "8-8", "9-10"]
+    assert result["skipped_spans"] == ["pages 7-7"] and result["chunks"] == 3
+    # The overview reads the chunk summaries, not the document
+    (prompt,) = client.models.generate_content.call_args.kwargs["contents"]
+    assert isinstance(prompt, str) and "Part 5: Pages 9-10" in prompt
+    assert analysis["summary"] == "Whole act"
@@ -0,0 +1,97 @@
+import json
+from unittest.mock import patch
+
+from sqlmodel import Session, create_engine
+from sqlalchemy.pool import StaticPool
+
+from pylegislation.research.citations import (
+    CitationResolver, get_citations, get_cited_by, get_resolver, resolve_new_acts, sync_citations,
+)
+from pylegislation.research.db import ActCitation, ActMetadata
+
+ACTS = [
+    # doc_id, description, year, doc_number
+    ("ird-2017", "Inland Revenue Act", "2017", "24/2017"),
+    ("ird-2006", "Inland Revenue", "2006", "10/2006"),
+    ("ird-2000", "Inland Revenue", "2000", "38/2000"),
+    ("ird-amend-2021", "Inland Revenue (Amendment)", "2021", "10/2021"),
+    ("companies-2007", "Companies Act", "2007", "07/2007"),
+    ("pml-2006", "Prevention of Money Laundering", "2006", "05/2006"),
+    ("penal-amend-2006", "Penal Code (Amendment)", "2006", "16/2006"),
+]
+
+
+def _act(doc_id, description, year, doc_number):
+    return ActMetadata(doc_id=doc_id, doc_type="lk_acts", num=f"x-{doc_number.replace('/', '-')}-en",
+                       date_str=f"{year}-01-01", description=description, lang="en", url_pdf="", year=year,
+                       doc_number=doc_number)
+
+
+def test_resolver_methods():
+    resolver = CitationResolver([(d, t, y, n, None) for d, t, y, n in ACTS])
+    assert resolver.resolve("Inland Revenue Act, No. 24 of 2017") == ("ird-2017", "number", 1.0)
+    assert resolver.resolve("Inland Revenue (Amendment) Act No. 10 of 2021")[0] == "ird-amend-2021"
+    assert resolver.resolve("Companies Act") == ("companies-2007", "title", 1.0)
+    # Several acts share the name
+    assert resolver.resolve("Inland Revenue Act")[:2] == (None, "ambiguous")
+    # A stated number/year that is not in the catalogue does not fall back to another year
+    assert resolver.resolve("Inland Revenue Act, No. 28 of 1979") == (None, None, None)
+    target, method, score = resolver.resolve("Prevention of Money Laundring Act")
+    assert (target, method) == ("pml-2006", "fuzzy") and score >= 0.85
+    # Fuzzy matching never maps a principal act onto an amendment
+    assert resolver.resolve("Penal Code") == (None, None, None)
+
+
+def test_edges_follow_saved_analyses_and_new_acts():
+    from pylegislation.research.analyze import save_base_analysis
+    from pylegislation.research.db import init_schema
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    init_schema(engine)
+    with Session(engine) as session:
+        session.add_all([_act(*act) for act in ACTS])
+        session.commit()
+
+    with patch("pylegislation.research.db.engine", engine):
+        save_base_analysis("companies-2007", "m", json.dumps({"referenced_acts": [
+            "Inland Revenue Act, No. 24 of 2017", "Companies Act", "Bribery Act",
+        ]}))
+        assert [(c["doc_id"], c["method"]) for c in get_citations(engine, "companies-2007")] == [
+            ("ird-2017", "number"), (None, "self"), (None, None),
+        ]
+        assert [c["doc_id"] for c in get_cited_by(engine, "ird-2017")] == ["companies-2007"]
+
+        # Re-analysis rewrites the act's edges
+        save_base_analysis("companies-2007", "m", json.dumps({"referenced_acts": ["Prevention of Money Laundering"]}))
+        assert get_cited_by(engine, "ird-2017") == []
+        assert get_cited_by(engine, "pml-2006")[0]["method"] == "title"
+
+        # Unresolved references are retried once the cited act is added
+        save_base_analysis("pml-2006", "m", json.dumps({"referenced_acts": ["Bribery Act"]}))
+        with Session(engine) as session:
+            session.add(_act("bribery-1954", "Bribery", "1954", "11/1954"))
+            session.commit()
+        assert sync_citations(engine) == 1
+        assert get_citations(engine, "pml-2006")[0]["doc_id"] == "bribery-1954"
+
+        # Appended acts extend the cached resolver, and only titles they could
+        # match are resolved again
+        save_base_analysis("ird-2017", "m", json.dumps({"referenced_acts": ["Customs Ordinance", "Excise Act"]}))
+        with engine.connect() as conn:
+            resolver = get_resolver(conn)[1]
+        with Session(engine) as session:
+            session.add(_act("customs-1869", "Customs Ordinance", "1869", "17/1869"))
+            session.commit()
+        with patch.object(CitationResolver, "resolve", autospec=True, side_effect=CitationResolver.resolve) as resolve:
+            assert resolve_new_acts(engine) == 1
+        assert [call.args[1] for call in resolve.call_args_list if call.args[0] is resolver] == ["Customs Ordinance"]
+        with engine.connect() as conn:
+            assert get_resolver(conn)[1] is resolver
+        assert [c["doc_id"] for c in get_citations(engine, "ird-2017")] == ["customs-1869", None]
+        assert resolve_new_acts(engine) == 0
+
+        # Edges are rebuilt from the extracted references if missing (backfill)
+        with engine.begin() as conn:
+            conn.execute(ActCitation.__table__.delete())
+        init_schema(engine)
+        assert [c["doc_id"] for c in get_cited_by(engine, "bribery-1954")] == ["pml-2006"]
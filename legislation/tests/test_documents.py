@@ -0,0 +1,73 @@
+from datetime import timedelta
+from unittest.mock import patch, MagicMock
+
+from sqlmodel import SQLModel, create_engine
+from sqlalchemy.pool import StaticPool
+
+from pylegislation.research.documents import DocumentStore
+
+
+def make_engine():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def fake_response(status, body=b"", headers=None):
+    r = MagicMock()
+    r.status_code = status
+    r.headers = headers or {}
+    r.iter_content.return_value = [body]
+    r.__enter__.return_value = r
+    r.__exit__.return_value = False
+    if status >= 400:
+        r.raise_for_status.side_effect = Exception(f"HTTP {status}")
+    return r
+
+
+def test_fetch_revalidate_and_evict(tmp_path):
+    engine = make_engine()
+    http = MagicMock()
+    store = DocumentStore(tmp_path, max_bytes=10, revalidate_after=timedelta(0))
+
+    with patch("pylegislation.research.db.engine", engine), \
+         patch("pylegislation.research.documents.get_http_session", return_value=http):
+        http.get.return_value = fake_response(200, b"%PDF-1", {"ETag": '"v1"'})
+        path = store.fetch("act-1", "http://example.com/a.pdf")
+        assert path.read_bytes() == b"%PDF-1"
+
+        # Stale entry -> conditional request; 304 keeps the local copy
+        http.get.return_value = fake_response(304)
+        assert store.fetch("act-1", "http://example.com/a.pdf") == path
+        assert http.get.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+
+        # Identical content under another doc_id shares the object
+        http.get.return_value = fake_response(200, b"%PDF-1")
+        assert store.fetch("act-2", "http://example.com/b.pdf") == path
+
+        # Exceeding the size cap evicts least recently used documents
+        http.get.return_value = fake_response(200, b"%PDF-22222")
+        store.fetch("act-3", "http://example.com/c.pdf")
+        assert store.get_path("act-1") is None
+        assert not path.exists()
+        assert store.get_path("act-3") is not None
+
+
+def test_document_larger_than_store_is_kept(tmp_path):
+    engine = make_engine()
+    http = MagicMock()
+    store = DocumentStore(tmp_path, max_bytes=4)
+
+    with patch("pylegislation.research.db.engine", engine), \
+         patch("pylegislation.research.documents.get_http_session", return_value=http):
+        http.get.return_value = fake_response(200, b"%PDF-first")
+        first = store.fetch("act-1", "http://example.com/a.pdf")
+        assert first.read_bytes() == b"%PDF-first"
+
+        # The next oversized document evicts the older one but not itself
+        second = store.put_file("act-2", first, url="http://example.com/b.pdf")
+        assert second == first and second.exists()
+        http.get.return_value = fake_response(200, b"%PDF-third")
+        third = store.fetch("act-3", "http://example.com/c.pdf")
+        assert third.exists() and not first.exists()
+        assert store.lookup("act-3") and not store.lookup("act-1") and not store.lookup("act-2")
@@ -0,0 +1,153 @@
+import gzip
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlalchemy.pool import StaticPool
+
+from pylegislation.research.blobs import put_text, text_sha256
+from pylegislation.research.db import ActAnalysis, AnalysisBlob, AnalysisHistory, TelemetryLog
+from pylegislation.research.dump import (
+    BackgroundRestore, DUMP_FORMAT, dump_analysis_to_json, dumps_to_restore, load_analysis_from_json, load_dump_dir,
+    read_manifest, write_versioned_dump
+)
+
+
+def _engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def _snapshot(engine):
+    with Session(engine) as session:
+        return (
+            [r.model_dump() for r in session.exec(select(ActAnalysis).order_by(ActAnalysis.doc_id))],
+            [r.model_dump() for r in session.exec(select(AnalysisHistory).order_by(AnalysisHistory.id))],
+            [r.model_dump() for r in session.exec(select(TelemetryLog).order_by(TelemetryLog.id))],
+            session.exec(select(AnalysisBlob.sha256).order_by(AnalysisBlob.sha256)).all(),
+        )
+
+
+def test_ndjson_dump_round_trip(tmp_path):
+    source = _engine()
+    ts = datetime(2026, 1, 2, 3, 4, 5)
+    with Session(source) as session:
+        for i in range(3):
+            session.add(ActAnalysis(doc_id=f"act-{i}", timestamp=ts, model="flash",
+                                    content_sha256=put_text(session, '{"summary": "é"}')))
+            session.add(AnalysisHistory(doc_id=f"act-{i}", timestamp=ts, prompt="Base Analysis",
+                                        response_sha256=put_text(session, "{}"), model="flash"))
+        session.add(AnalysisHistory(doc_id="act-0", timestamp=ts, prompt="Custom",
+                                    response_sha256=put_text(session, "Not JSON"), model="flash"))
+        session.add(TelemetryLog(doc_id="act-0", timestamp=ts, model="flash", input_tokens=10, output_tokens=2,
+                                 latency_ms=300, status="SUCCESS", cost_usd=0.1, upload_cache_hits=1))
+        session.commit()
+
+    path = tmp_path / "dump.ndjson.gz"
+    with patch("pylegislation.research.db.engine", source):
+        result = dump_analysis_to_json([path])
+    # Each distinct text is written once
+    assert result["counts"] == {"content": 3, "analysis_history": 4, "act_analysis": 3, "telemetry_log": 1}
+    assert not list(tmp_path.glob("*.tmp"))
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[0]["format"] == DUMP_FORMAT
+    assert lines[1] == {"table": "content"}
+    # Analysis JSON is written as an object (with the layout that reproduces its hash), other text as a string
+    content = {row["sha256"]: row for row in lines[2:5]}
+    assert sorted(json.dumps(row.get("json", row.get("text"))) for row in content.values()) == \
+        ['"Not JSON"', '{"summary": "\\u00e9"}', '{}']
+    assert "text" not in content[text_sha256('{"summary": "é"}')]
+
+    target = _engine()
+    with patch("pylegislation.research.db.engine", target):
+        assert load_analysis_from_json(path) == result["counts"]
+        # Loading twice adds nothing
+        assert set(load_analysis_from_json(path).values()) == {0}
+    assert _snapshot(target) == _snapshot(source)
+
+
+def test_legacy_json_dump_backfills_history(tmp_path):
+    path = tmp_path / "analysis_dump.json"
+    path.write_text(json.dumps([
+        {"doc_id": "act-1", "timestamp": "2026-01-02T03:04:05", "model": "flash", "content_json": "{}"},
+    ], indent=2))
+
+    target = _engine()
+    with patch("pylegislation.research.db.engine", target):
+        load_analysis_from_json(path)
+    analyses, history, telemetry, blobs = _snapshot(target)
+    assert [a["doc_id"] for a in analyses] == ["act-1"]
+    assert [(h["doc_id"], h["prompt"]) for h in history] == [("act-1", "Base Analysis")]
+    # The backfilled history shares the analysis' blob
+    assert len(blobs) == 1 and history[0]["response_sha256"] == analyses[0]["content_sha256"] == blobs[0]
+    assert telemetry == []
+
+
+def test_delta_dumps_replay_in_order(tmp_path):
+    source = _engine()
+    ts = datetime(2026, 1, 2, 3, 4, 5)
+    with Session(source) as session:
+        v1 = put_text(session, "v1")
+        session.add(ActAnalysis(doc_id="act-1", timestamp=ts, model="flash", content_sha256=v1))
+        session.add(AnalysisHistory(doc_id="act-1", timestamp=ts, prompt="Base Analysis", response_sha256=v1))
+        session.commit()
+
+    with patch("pylegislation.research.db.engine", source):
+        base = write_versioned_dump(tmp_path, timestamp="1")
+        # Nothing changed: no delta is kept
+        assert write_versioned_dump(tmp_path, timestamp="2") is None
+
+        later = datetime(2026, 1, 3)
+        with Session(source) as session:
+            v2 = put_text(session, "v2")
+            session.merge(ActAnalysis(doc_id="act-1", timestamp=later, model="flash", content_sha256=v2))
+            session.add(AnalysisHistory(doc_id="act-1", timestamp=later, prompt="Base Analysis", response_sha256=v2))
+            session.add(TelemetryLog(doc_id="act-1", model="flash", input_tokens=1, output_tokens=1,
+                                     latency_ms=1, status="SUCCESS"))
+            session.commit()
+        delta = write_versioned_dump(tmp_path, timestamp="3")
+
+    assert base["kind"] == "full"
+    assert delta["kind"] == "delta" and delta["base"] == base["file"]
+    assert delta["counts"] == {"content": 1, "analysis_history": 1, "act_analysis": 1, "telemetry_log": 1}
+    assert [e["file"] for e in read_manifest(tmp_path)] == [base["file"], delta["file"]]
+
+    target = _engine()
+    with patch("pylegislation.research.db.engine", target):
+        load_dump_dir(tmp_path)
+    assert _snapshot(target) == _snapshot(source)
+
+
+def test_restore_skips_dumps_already_restored(tmp_path):
+    source = _engine()
+    with Session(source) as session:
+        session.add(ActAnalysis(doc_id="act-1", model="flash", content_sha256=put_text(session, "{}")))
+        session.commit()
+    with patch("pylegislation.research.db.engine", source):
+        write_versioned_dump(tmp_path, timestamp="1")
+
+    target = _engine()
+    with patch("pylegislation.research.db.engine", target), \
+         patch("pylegislation.research.dump._default_dump_dir", return_value=tmp_path):
+        restore = BackgroundRestore()
+        restore.start()
+        assert restore.wait(10)
+        assert restore.status["state"] == "done"
+        assert restore.status["restored"]["act_analysis"] == 1
+
+        # Same file, same rows: nothing to do
+        assert dumps_to_restore(tmp_path) == []
+        restore.start()
+        assert restore.wait(10)
+        assert restore.status["state"] == "skipped"
+
+        # Rows lost since the restore: the dump is restored again
+        with Session(target) as session:
+            session.delete(session.get(ActAnalysis, "act-1"))
+            session.commit()
+        assert [p.name for p in dumps_to_restore(tmp_path)] == [read_manifest(tmp_path)[0]["file"]]
+        assert load_dump_dir(tmp_path)["act_analysis"] == 1
@@ -0,0 +1,97 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pylegislation.research import gemini
+from pylegislation.research.gemini import UploadRegistry, generate_with_document
+
+
+class APIError(Exception):
+    """Shaped like google.genai.errors.APIError (code + message)."""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.message = message
+
+
+def _client(expires_in):
+    client = MagicMock()
+    client.files.upload.side_effect = lambda file: SimpleNamespace(
+        name=f"files/{client.files.upload.call_count}",
+        expiration_time=datetime.now(timezone.utc) + expires_in)
+    return client
+
+
+def test_upload_registry_reuses_until_expiry(tmp_path):
+    doc = tmp_path / "act.pdf"
+    doc.write_bytes(b"%PDF")
+    registry = UploadRegistry()
+
+    client = _client(timedelta(hours=48))
+    first, hit = registry.get_or_upload(client, "key", doc)
+    assert not hit
+    assert registry.get_or_upload(client, "key", doc) == (first, True)
+    # Uploads are per API key
+    assert not registry.get_or_upload(client, "other", doc)[1]
+    assert (registry.hits, registry.misses) == (1, 2) and registry.hit_rate() == pytest.approx(1 / 3)
+
+    # Handles expiring within EXPIRY_MARGIN are not reused
+    client = _client(gemini.EXPIRY_MARGIN - timedelta(minutes=1))
+    short, _ = registry.get_or_upload(client, "key2", doc)
+    again, hit = registry.get_or_upload(client, "key2", doc)
+    assert not hit and again is not short and client.files.upload.call_count == 2
+
+
+def test_concurrent_misses_share_one_upload(tmp_path):
+    doc = tmp_path / "act.pdf"
+    doc.write_bytes(b"%PDF")
+    registry = UploadRegistry()
+    client = _client(timedelta(hours=48))
+    uploading, release = threading.Event(), threading.Event()
+    upload = client.files.upload.side_effect
+
+    def slow_upload(file):
+        uploading.set()
+        release.wait(5)
+        return upload(file)
+
+    client.files.upload.side_effect = slow_upload
+    results = []
+    first = threading.Thread(target=lambda: results.append(registry.get_or_upload(client, "key", doc)))
+    first.start()
+    uploading.wait(5)
+    second = threading.Thread(target=lambda: results.append(registry.get_or_upload(client, "key", doc)))
+    second.start()
+    while registry._uploads.coalesced < 1:
+        threading.Event().wait(0.001)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert client.files.upload.call_count == 1
+    assert results[0][0] is results[1][0] and sorted(hit for _, hit in results) == [False, True]
+    assert (registry.hits, registry.misses) == (1, 1)
+
+
+def test_only_missing_uploads_are_reuploaded(tmp_path):
+    doc = tmp_path / "act.pdf"
+    doc.write_bytes(b"%PDF")
+    client = _client(timedelta(hours=48))
+    registry = UploadRegistry()
+    with patch.object(gemini, "upload_registry", registry), patch.object(gemini, "get_client", return_value=client):
+        registry.get_or_upload(client, "key", doc)
+
+        # Quota errors propagate without a second upload
+        client.models.generate_content.side_effect = APIError(429, "Resource has been exhausted")
+        with pytest.raises(APIError):
+            generate_with_document("key", doc, "prompt")
+        assert client.files.upload.call_count == 1
+
+        # An expired/deleted file reference is re-uploaded once
+        client.models.generate_content.side_effect = [APIError(403, "File files/1 may not exist"), "ok"]
+        assert generate_with_document("key", doc, "prompt") == ("ok", False)
+        assert client.files.upload.call_count == 2
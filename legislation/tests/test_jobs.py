@@ -0,0 +1,140 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, create_engine, select
+
+from pylegislation.research import db
+from pylegislation.research.blobs import put_text
+from pylegislation.research.db import ActAnalysis, AnalysisJob, init_schema
+from pylegislation.research.jobs import AnalysisJobQueue
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # A file database: workers use their own connections concurrently
+    engine = create_engine(f"sqlite:///{tmp_path / 'research.db'}", connect_args={"check_same_thread": False})
+    init_schema(engine)
+    with patch("pylegislation.research.db.engine", engine), \
+            patch("pylegislation.research.telemetry.record_telemetry", MagicMock()):
+        yield engine
+
+
+def _analysis(doc_id, api_key, data_path, project_root, custom_prompt=None, *args):
+    if doc_id == "bad":
+        raise RuntimeError("no such act")
+    # Like analyze_act_by_id: the texts are stored as blobs, the job keeps their hashes
+    with Session(db.engine) as session:
+        content = put_text(session, '{"summary": "ok"}')
+        answer = put_text(session, "Yes") if custom_prompt else None
+        session.commit()
+    return {"text": '{"summary": "ok"}', "model": "m", "input_tokens": 3, "output_tokens": 4,
+            "content_sha256": content, "answer_sha256": answer}
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_queue_runs_at_most_max_workers_jobs(engine, tmp_path):
+    release = threading.Event()
+    queue = AnalysisJobQueue(tmp_path, max_workers=2)
+    with patch("pylegislation.research.analyze.analyze_act_by_id",
+               lambda *a, **k: release.wait(5) and _analysis(*a, **k)):
+        jobs = [queue.submit(doc_id, "key") for doc_id in ("a", "b", "c")]
+        status = lambda: [queue.get(job.id).status for job, _ in jobs]
+        _wait(lambda: status().count("RUNNING") == 2)
+        assert status().count("QUEUED") == 1
+        release.set()
+        assert [f.result(5)["model"] for _, f in jobs] == ["m"] * 3
+    assert status() == ["SUCCESS"] * 3
+    queue.shutdown()
+
+
+def test_recover_interrupted_and_prune(engine, tmp_path):
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        session.add(AnalysisJob(id="queued", doc_id="a"))
+        session.add(AnalysisJob(id="running", doc_id="a", status="RUNNING"))
+        session.add(AnalysisJob(id="old", doc_id="a", status="SUCCESS", finished_at=now - timedelta(days=30)))
+        session.add(AnalysisJob(id="recent", doc_id="a", status="FAIL", finished_at=now - timedelta(hours=1)))
+        session.commit()
+
+    queue = AnalysisJobQueue(tmp_path)
+    assert queue.recover_interrupted() == 2
+    assert queue.get("running").status == "FAIL" and queue.get("running").error
+    assert queue.prune_finished() == 1
+    # Just-recovered jobs are kept for the retention period like any other
+    with Session(engine) as session:
+        assert sorted(session.exec(select(AnalysisJob.id)).all()) == ["queued", "recent", "running"]
+    assert queue.prune_finished(timedelta(0)) == 3
+
+
+def test_job_endpoints_poll_and_stream(engine, tmp_path):
+    from pylegislation.research.api.main import app
+
+    queue = AnalysisJobQueue(tmp_path)
+    # No lifespan: nothing is restored into the test database
+    client = TestClient(app)
+    with patch("pylegislation.research.api.main.engine", engine), \
+            patch("pylegislation.research.api.main.job_queue", queue), \
+            patch("pylegislation.research.api.main.JOB_EVENTS_POLL_SECONDS", 0.01), \
+            patch("pylegislation.research.analyze.analyze_act_by_id", _analysis):
+        response = client.post("/analyze/jobs", json={"doc_id": "uni", "api_key": "key"})
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        _wait(lambda: client.get(f"/analyze/jobs/{job_id}").json()["status"] == "SUCCESS")
+        assert client.get(f"/analyze/jobs/{job_id}").json()["result"] == \
+            {"summary": "ok", "custom_analysis": None, "custom_prompt": None}
+        request = {"doc_id": "uni", "api_key": "key", "custom_prompt": "Q?"}
+        job_id = client.post("/analyze/jobs", json=request).json()["job_id"]
+        _wait(lambda: client.get(f"/analyze/jobs/{job_id}").json()["status"] == "SUCCESS")
+        assert client.get(f"/analyze/jobs/{job_id}").json()["result"] == \
+            {"summary": "ok", "custom_analysis": "Yes", "custom_prompt": "Q?"}
+
+        failed = client.post("/analyze/jobs", json={"doc_id": "bad", "api_key": "key"}).json()["job_id"]
+        with client.stream("GET", f"/analyze/jobs/{failed}/events") as stream:
+            body = "".join(stream.iter_text())
+        # The stream ends with exactly one terminal event
+        assert body.count("event: done") == 1
+        last = body.strip().split("\n\n")[-1]
+        assert last.startswith("event: done") and '"status": "FAIL"' in last and "no such act" in last
+
+        assert client.get("/analyze/jobs/missing").status_code == 404
+        assert client.get("/analyze/jobs/missing/events").status_code == 404
+    queue.shutdown(wait=True)
+
+
+def test_cache_reads_skip_the_job_queue(engine, tmp_path):
+    from pylegislation.research.api.main import app
+
+    def jobs():
+        with Session(engine) as session:
+            return len(session.exec(select(AnalysisJob)).all())
+
+    queue = AnalysisJobQueue(tmp_path)
+    client = TestClient(app)
+    with patch("pylegislation.research.api.main.engine", engine), \
+            patch("pylegislation.research.api.main.job_queue", queue), \
+            patch("pylegislation.research.analyze.analyze_act_by_id", _analysis):
+        request = {"doc_id": "uni", "api_key": "key", "fetch_only": True}
+        assert client.post("/analyze", json=request).json()["status"] == "not_found"
+        with Session(engine) as session:
+            session.add(ActAnalysis(doc_id="uni", model="m", content_sha256=put_text(session, '{"summary": "cached"}')))
+            session.commit()
+        cached = {"summary": "cached", "custom_analysis": None, "custom_prompt": None}
+        assert client.post("/analyze", json=request).json() == cached
+        assert client.post("/analyze", json={**request, "fetch_only": False}).json() == cached
+        assert jobs() == 0
+
+        # Anything that calls the model is still a job
+        assert client.post("/analyze", json={**request, "fetch_only": False, "force_refresh": True}).json() == \
+            {"summary": "ok"}
+        assert jobs() == 1
+    queue.shutdown(wait=True)
@@ -0,0 +1,125 @@
+import contextlib
+import io
+import json
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+from pylegislation.research.lineage import generate_lineage, generate_lineage_json, generate_lineage_markdown
+
+HEADER = "doc_type\tdoc_id\tnum\tdate_str\tdescription\turl_metadata\tlang\turl_pdf\tdoc_number\tdomain"
+ROWS = [
+    ("uni-1978", "1978-12-01", "Universities Act", "16/1978", "Education"),
+    ("uni-1985", "1985-03-01", "Universities (Amendment)", "7/1985", "Education"),
+    ("co-2007", "2007-01-01", "Companies Act", "07/2007", "Finance"),
+    ("co-2021", "2021-01-01", "Companies Act (Amendment)", "10/2021", "Finance"),
+    ("bank-1988", "1988-01-01", "Banking Act", "30/1988", "Finance"),
+]
+
+
+def _tsv(path: Path, rows):
+    lines = [HEADER] + [f"lk_acts\t{d}\t{d}-en\t{date}\t{title}\t\ten\thttps://x/{d}.pdf\t{num}\t{domain}"
+                        for d, date, title, num, domain in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def _run(*args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return generate_lineage(*args, **kwargs)
+
+
+def test_incremental_lineage_matches_full_build(tmp_path):
+    tsv, patches = tmp_path / "docs.tsv", tmp_path / "patches"
+    patches.mkdir()
+    (patches / "uni.json").write_text(json.dumps({
+        "parent_id": "uni-1978", "changes": [{"child_id": "bank-1988", "relationship": "amended_by"}],
+    }), encoding="utf-8")
+    _tsv(tsv, ROWS)
+
+    def reference():
+        ref = tmp_path / "ref"
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_lineage_json(tsv, tmp_path / "ref.json", patches)
+            generate_lineage_markdown(tsv, ref)
+        return (tmp_path / "ref.json").read_bytes(), {p.name: p.read_bytes() for p in ref.iterdir()}
+
+    def outputs():
+        return (tmp_path / "lineage.json").read_bytes(), \
+            {p.name: p.read_bytes() for p in (tmp_path / "md").iterdir() if p.name != ".lineage-state.json"}
+
+    args = (tsv, tmp_path / "lineage.json", patches, tmp_path / "md")
+    first = _run(*args)
+    assert first["families"] == 4 and first["markdown_written"] == 5
+    assert outputs() == reference()
+
+    # Nothing changed: no parse, no writes
+    assert _run(*args)["skipped"]
+
+    # One changed act only re-serializes and rewrites its own family
+    _tsv(tsv, ROWS[:3] + [("co-2021", "2022-01-01", "Companies Act (Amendment)", "10/2021", "Finance")] + ROWS[4:])
+    result = _run(*args)
+    assert (result["json_serialized"], result["markdown_written"]) == (1, 2)  # companies + index
+    assert outputs() == reference()
+
+    # Outputs edited or deleted outside the generator are rewritten
+    (tmp_path / "md" / "banking-act.md").unlink()
+    (tmp_path / "lineage.json").write_text("[]", encoding="utf-8")
+    result = _run(*args)
+    assert not result["skipped"] and result["markdown_written"] == 1 and result["json_serialized"] == 4
+    assert outputs() == reference()
+    assert _run(*args, force=True)["markdown_written"] == 5
+
+
+def test_lineage_graph_endpoints_follow_head(tmp_path):
+    from fastapi.testclient import TestClient
+    from sqlmodel import create_engine
+    from sqlalchemy.pool import StaticPool
+    from pylegislation.research.api.main import app
+    from pylegislation.research.lineage_graph import lineage_graphs
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+
+    tsv, patches = tmp_path / "docs.tsv", tmp_path / "patches"
+    patches.mkdir()
+    (patches / "uni.json").write_text(json.dumps({
+        "parent_id": "uni-1978", "changes": [{"child_id": "bank-1988", "relationship": "amended_by"}],
+    }), encoding="utf-8")
+    _tsv(tsv, ROWS)
+    with patch("pylegislation.research.db.engine", engine), \
+            patch("pylegislation.research.api.main.engine", engine), \
+            patch("pylegislation.research.dump._default_dump_dir", return_value=None), \
+            patch("pylegislation.research.api.main._db_last_modified", return_value=datetime(2026, 1, 1)) \
+            as db_last_modified, \
+            patch("pylegislation.research.versions.get_head_path", return_value=tsv), \
+            patch("pylegislation.research.versions.PATCHES_DIR", patches):
+        with TestClient(app) as client:
+            response = client.get("/lineage/families", params={"domain": "Finance"})
+            assert [f["slug"] for f in response.json()["families"]] == ["banking-act", "companies-act"]
+            assert client.get("/lineage/families", params={"year": 1985}).json()["families"][0]["slug"] == \
+                "universities"
+
+            response = client.get("/lineage/families/companies-act")
+            assert [v["doc_id"] for v in response.json()["families"][0]["versions"]] == ["co-2007", "co-2021"]
+            etag = response.headers["etag"]
+            # research.db's mtime is not a validator for the graph
+            assert "last-modified" not in response.headers and not db_last_modified.called
+            assert client.get("/lineage/families/companies-act", headers={"If-None-Match": etag}).status_code == 304
+
+            # Patched into another family as well as its own
+            act = client.get("/lineage/acts/bank-1988").json()
+            assert (act["family"]["slug"], act["also_in"]) == ("banking-act", ["universities-act"])
+            chain = client.get("/lineage/acts/co-2021/chain").json()
+            assert (chain["principal"]["doc_id"], [v["doc_id"] for v in chain["amendments"]]) == \
+                ("co-2007", ["co-2021"])
+            assert client.get("/lineage/acts/missing").status_code == 404
+
+            # A new HEAD TSV is picked up; unchanged families keep their ETag
+            _tsv(tsv, ROWS + [("co-2025", "2025-01-01", "Companies Act", "1/2025", "Finance")])
+            lineage_graphs.expire()
+            chain = client.get("/lineage/acts/co-2021/chain").json()
+            assert chain["superseded_by"]["doc_id"] == "co-2025"
+            assert client.get("/lineage/families/companies-act", headers={"If-None-Match": etag}).status_code == 200
+            response = client.get("/lineage/families/banking-act")
+            assert client.get("/lineage/families/banking-act",
+                              headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+    lineage_graphs.expire()
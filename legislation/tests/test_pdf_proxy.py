@@ -0,0 +1,55 @@
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.pool import StaticPool
+
+from pylegislation.research.api.main import app
+from pylegislation.research.db import ActMetadata
+from pylegislation.research.documents import DocumentStore
+
+
+def test_proxy_serves_local_copy_with_ranges(tmp_path):
+    test_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(test_engine)
+    url = "http://example.com/act.pdf"
+    with Session(test_engine) as session:
+        session.add(ActMetadata(doc_id="act-1", doc_type="lk_acts", num="1", date_str="2020-01-01",
+                                description="Act", lang="en", url_pdf=url, year="2020"))
+        session.commit()
+
+    src = tmp_path / "act.pdf"
+    src.write_bytes(b"0123456789")
+    store = DocumentStore(tmp_path / "store")
+
+    with patch("pylegislation.research.api.main.engine", test_engine), \
+         patch("pylegislation.research.db.engine", test_engine), \
+         patch("pylegislation.research.api.main.get_document_store", return_value=store), \
+         patch("pylegislation.research.api.main.get_http_session", side_effect=AssertionError("upstream hit")), \
+         TestClient(app) as client:
+        store.put_file("act-1", src, url)
+
+        resp = client.get("/acts/act-1/pdf")
+        assert resp.status_code == 200
+        assert resp.content == b"0123456789"
+        assert resp.headers["accept-ranges"] == "bytes"
+        etag = resp.headers["etag"]
+
+        resp = client.get("/acts/act-1/pdf", headers={"Range": "bytes=2-5"})
+        assert resp.status_code == 206
+        assert resp.content == b"2345"
+        assert resp.headers["content-range"] == "bytes 2-5/10"
+        assert resp.headers["content-length"] == "4"
+
+        resp = client.get("/acts/act-1/pdf", headers={"Range": "bytes=-3"})
+        assert resp.content == b"789"
+
+        resp = client.get("/acts/act-1/pdf", headers={"Range": "bytes=20-"})
+        assert resp.status_code == 416
+
+        resp = client.get("/acts/act-1/pdf", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+        resp = client.head("/acts/act-1/pdf")
+        assert resp.status_code == 200
+        assert resp.headers["content-length"] == "10"
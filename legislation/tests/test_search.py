@@ -0,0 +1,71 @@
+import json
+
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.pool import StaticPool
+
+from pylegislation.research.blobs import put_text
+from pylegislation.research.db import ActAnalysis, ActMetadata
+from pylegislation.research.search import ensure_search_index, index_analyses, rebuild_search_index, search_acts
+from pylegislation.research.structured import index_structured
+
+
+def _save_analysis(engine, doc_id, content_json):
+    with Session(engine) as session:
+        session.merge(ActAnalysis(doc_id=doc_id, model="m", content_sha256=put_text(session, content_json)))
+        session.flush()
+        index_analyses(session.connection(), [doc_id])
+        index_structured(session.connection(), [doc_id])
+        session.commit()
+
+
+def test_search_index_follows_acts_and_saved_analyses():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    ensure_search_index(engine)
+
+    analysis = {
+        "summary": "Establishes the University Grants Commission.",
+        "sections": [
+            {"section_number": "1", "content": "Short title."},
+            {"section_number": "2", "content": "The Commission shall allocate funds to universities."},
+            "not a section object",
+        ],
+    }
+    with Session(engine) as session:
+        session.add(ActMetadata(doc_id="uni", doc_type="lk_acts", num="16", date_str="1978-12-20",
+                                description="Universities", lang="en", url_pdf="", year="1978"))
+        session.add(ActMetadata(doc_id="fish", doc_type="lk_acts", num="2", date_str="1996-01-01",
+                                description="Fisheries and Aquatic Resources", lang="en", url_pdf="", year="1996"))
+        session.commit()
+    _save_analysis(engine, "uni", json.dumps(analysis))
+    _save_analysis(engine, "fish", "{not json")
+
+    hits = search_acts(engine, "commission funds")
+    assert [(h["doc_id"], h["kind"], h["ref"]) for h in hits] == [("uni", "section", "2")]
+    assert "<mark>" in hits[0]["snippet"]
+    assert {h["kind"] for h in search_acts(engine, "university")} == {"title", "summary", "section"}
+    assert search_acts(engine, "fisheries", kind="title")[0]["title"] == "Fisheries and Aquatic Resources"
+
+    # Re-analysis replaces the indexed content
+    _save_analysis(engine, "uni", json.dumps({"summary": "Replaced text."}))
+    assert search_acts(engine, "commission") == []
+    assert search_acts(engine, "replaced")[0]["doc_id"] == "uni"
+
+    assert rebuild_search_index(engine) == 3
+    assert search_acts(engine, 'aquatic" (')[0]["doc_id"] == "fish"
+
+    # Section text is stored once, in analysissection; an index from before
+    # section_search drops its copies
+    _save_analysis(engine, "uni", json.dumps(analysis))
+    with engine.begin() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM act_search_source WHERE kind = 'section'").scalar() == 0
+        conn.exec_driver_sql("DROP TABLE section_search")
+        conn.exec_driver_sql("DROP TRIGGER analysissection_search_ai")
+        conn.exec_driver_sql("DROP TRIGGER analysissection_search_ad")
+        conn.exec_driver_sql("INSERT INTO act_search_source (doc_id, kind, ref, content) "
+                             "VALUES ('uni', 'section', '2', 'The Commission shall allocate funds to universities.')")
+    ensure_search_index(engine)
+    hits = search_acts(engine, "commission funds")
+    assert [(h["doc_id"], h["kind"], h["ref"]) for h in hits] == [("uni", "section", "2")]
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT count(*) FROM act_search_source WHERE kind = 'section'").scalar() == 0
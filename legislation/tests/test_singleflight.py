@@ -0,0 +1,97 @@
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlmodel import Session, create_engine
+
+from pylegislation.research import analyze
+from pylegislation.research.db import AnalysisLease, init_schema
+from pylegislation.research.singleflight import SingleFlight, acquire_lease, keep_lease, release_lease, renew_lease
+
+
+def test_singleflight_coalesces_concurrent_calls():
+    flights = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "done"
+
+    leader = threading.Thread(target=lambda: results.append(flights.do("k", slow)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flights.do("k", slow))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    while flights.coalesced < 3:
+        threading.Event().wait(0.001)
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+
+    assert len(calls) == 1 and flights.in_flight() == 0
+    assert sorted(results) == [("done", False)] + [("done", True)] * 3
+
+    # Errors are shared too, and the key is free again afterwards
+    def boom():
+        raise ValueError("x")
+    with pytest.raises(ValueError):
+        flights.do("k", boom)
+    flights.record_coalesced()
+    assert flights.coalesced == 4 and flights.do("k", lambda: 1) == (1, False)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # A file database: the renewal thread uses its own connection
+    engine = create_engine(f"sqlite:///{tmp_path / 'research.db'}", connect_args={"check_same_thread": False})
+    init_schema(engine)
+    with patch("pylegislation.research.db.engine", engine):
+        yield engine
+
+
+def _expires(engine, key):
+    with Session(engine) as session:
+        lease = session.get(AnalysisLease, key)
+        return lease and lease.expires_at
+
+
+def test_leases_exclude_steal_and_renew(engine):
+    ttl = timedelta(minutes=10)
+    assert acquire_lease("k", "a", ttl)
+    assert not acquire_lease("k", "b", ttl)
+    assert acquire_lease("k", "a", ttl)  # re-entrant for the owner
+
+    release_lease("k", "b")  # not the owner: no-op
+    assert not renew_lease("k", "b", ttl)
+    assert renew_lease("k", "a", timedelta(hours=1))
+    assert _expires(engine, "k") > datetime.utcnow() + ttl
+
+    # An expired lease is stolen, after which the old owner can't renew it
+    assert renew_lease("k", "a", timedelta(seconds=-1))
+    assert acquire_lease("k", "b", ttl)
+    assert not renew_lease("k", "a", ttl)
+    release_lease("k", "b")
+    assert _expires(engine, "k") is None
+
+
+def test_lease_is_renewed_while_analysis_runs(engine):
+    ttl = timedelta(seconds=0.3)
+    assert acquire_lease("k", "a", ttl)
+    with keep_lease("k", "a", ttl):
+        threading.Event().wait(0.6)
+        # Past the original expiry, but still held
+        assert _expires(engine, "k") > datetime.utcnow()
+        assert not acquire_lease("k", "b", ttl)
+
+
+def test_lease_waiter_times_out(engine, tmp_path):
+    assert acquire_lease("doc:False", "other", timedelta(minutes=10))
+    with patch.object(analyze, "LEASE_WAIT_TIMEOUT", timedelta(seconds=0.05)), \
+            patch.object(analyze, "LEASE_POLL_SECONDS", 0.01), pytest.raises(TimeoutError):
+        analyze._run_base_analysis_leased("doc", tmp_path / "doc.pdf", "key", False,
+                                          run=lambda *a: pytest.fail("ran without the lease"))
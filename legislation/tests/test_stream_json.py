@@ -0,0 +1,19 @@
+from pylegislation.research.stream_json import IncrementalJSONScanner
+
+
+def test_scanner_emits_fields_and_items_across_fragments():
+    text = '```json\n{"summary": "An \\"Act\\" {x}", "sections": [{"section_number": "1", "footnotes": ["a]"]}, ' \
+           '{"section_number": "2"}], "referenced_acts": ["Finance Act"], "category": null}\n```'
+    scanner = IncrementalJSONScanner()
+    events = []
+    for i in range(0, len(text), 5):
+        events.extend(scanner.feed(text[i:i + 5]))
+
+    assert events == [
+        ("field", "summary", 'An "Act" {x}'),
+        ("item", "sections", {"section_number": "1", "footnotes": ["a]"]}),
+        ("item", "sections", {"section_number": "2"}),
+        ("item", "referenced_acts", "Finance Act"),
+        ("field", "category", None),
+    ]
+    assert scanner.done
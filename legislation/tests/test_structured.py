@@ -0,0 +1,109 @@
+import json
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.pool import StaticPool
+
+from pylegislation.research.blobs import put_text
+from pylegislation.research.db import ActAnalysis, ActMetadata, AnalysisOutline
+from pylegislation.research.structured import (
+    board_compositions, find_entity_mentions, find_referencing_acts, get_sections, list_entities, sync_structured,
+)
+
+BOARD_ACT = {
+    "category": "Education",
+    "referenced_acts": ["Universities Act, No. 16 of 1978", 42],
+    "sections": [
+        {"section_number": "1", "content": "Short title.", "footnotes": ["Amended by Act No. 7 of 1985"]},
+        {"section_number": "5A", "content": "Powers of the Board."},
+        {"section_number": "6"},
+    ],
+    "entities": [
+        {"entity_name": "Ministry of  Finance", "entity_type": "Ministry", "excerpt": "with the concurrence of"},
+        {"entity_type": "Person"},
+    ],
+    "board_members": [
+        {"role_name": "Chairman", "appointing_authority": "Minister"},
+        {"role_name": "Member", "appointing_authority": "Minister", "composition_criteria": ["lawyer", "accountant"]},
+    ],
+    "meeting_details": [{"description": "Board meeting", "frequency": "Monthly"}],
+}
+
+
+def _engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for doc_id, domain in [("uni", "Education"), ("tax", "Finance")]:
+            session.add(ActMetadata(doc_id=doc_id, doc_type="lk_acts", num="1", date_str="2000-01-01",
+                                    description=doc_id.title(), lang="en", url_pdf="", year="2000", domain=domain))
+        session.commit()
+    return engine
+
+
+def _store(engine, doc_id, analysis):
+    with Session(engine) as session:
+        session.merge(ActAnalysis(doc_id=doc_id, model="m", content_sha256=put_text(session, json.dumps(analysis))))
+        session.commit()
+
+
+def test_backfill_and_cross_act_queries():
+    engine = _engine()
+    _store(engine, "uni", BOARD_ACT)
+    _store(engine, "tax", {"entities": [{"entity_name": "ministry of finance", "entity_type": "Ministry"}],
+                           "board_members": "none"})
+
+    # Existing analyses are extracted once, then only when they change
+    assert sync_structured(engine) == 2
+    assert sync_structured(engine) == 0
+
+    sections = get_sections(engine, "uni")
+    assert [s["section_number"] for s in sections] == ["1", "5A"]
+    assert sections[0]["footnotes"] == ["Amended by Act No. 7 of 1985"]
+    assert get_sections(engine, "uni", "5A")[0]["content"] == "Powers of the Board."
+    assert get_sections(engine, "missing") is None
+
+    mentions = find_entity_mentions(engine, "MINISTRY OF FINANCE")
+    assert [(m["doc_id"], m["domain"]) for m in mentions] == [("tax", "Finance"), ("uni", "Education")]
+    assert [m["doc_id"] for m in find_entity_mentions(engine, "ministry", prefix=True, domain="Finance")] == ["tax"]
+    assert list_entities(engine, entity_type="Ministry")[0]["acts"] == 2
+
+    boards = board_compositions(engine, domain="Education")
+    assert [(r["role_name"], r["acts"]) for r in boards["roles"]] == [("Chairman", 1), ("Member", 1)]
+    assert boards["acts"][0]["members"][1]["composition_criteria"] == '["lawyer", "accountant"]'
+    assert board_compositions(engine, domain="Finance") == {"roles": [], "acts": []}
+
+    assert [r["doc_id"] for r in find_referencing_acts(engine, "universities act, no. 16 of 1978")] == ["uni"]
+
+    # A changed analysis is re-extracted on the next sync
+    _store(engine, "uni", {"sections": [{"section_number": "1", "content": "Replaced."}]})
+    assert sync_structured(engine) == 1
+    assert find_referencing_acts(engine, "Universities", prefix=True) == []
+    with Session(engine) as session:
+        assert session.get(AnalysisOutline, "uni").section_count == 1
+
+
+def test_structured_endpoints():
+    from pylegislation.research.api.main import app
+
+    engine = _engine()
+    _store(engine, "uni", BOARD_ACT)
+    # No dump directory: the startup restore leaves the test database alone
+    with patch("pylegislation.research.db.engine", engine), \
+            patch("pylegislation.research.api.main.engine", engine), \
+            patch("pylegislation.research.dump._default_dump_dir", return_value=None):
+        with TestClient(app) as client:
+            response = client.get("/acts/uni/sections", params={"number": "5A"})
+            assert response.status_code == 200
+            assert response.json()["sections"][0]["position"] == 1
+            assert client.get("/acts/uni/sections", params={"number": "99"}).status_code == 404
+            assert client.get("/acts/tax/sections").status_code == 404
+
+            response = client.get("/entities/mentions", params={"name": "Ministry of Finance"})
+            assert [r["doc_id"] for r in response.json()["results"]] == ["uni"]
+            boards = client.get("/boards", params={"role": "chairman", "domain": "Education"}).json()
+            assert [a["doc_id"] for a in boards["acts"]] == ["uni"]
+            meetings = client.get("/meetings", params={"frequency": "monthly", "domain": "Education"}).json()
+            assert meetings["results"][0]["description"] == "Board meeting"
+            assert client.get("/entities", params={"limit": 0}).status_code == 400
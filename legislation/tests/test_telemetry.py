@@ -0,0 +1,71 @@
+from unittest.mock import patch
+
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlalchemy.pool import StaticPool
+
+from pylegislation.research.db import TelemetryRollup
+from pylegislation.research.telemetry import (
+    ensure_telemetry_rollups, latency_percentile, rebuild_telemetry_rollups, record_telemetry
+)
+
+
+def _rollups(engine):
+    with Session(engine) as session:
+        return [r.model_dump() for r in session.exec(select(TelemetryRollup).order_by(TelemetryRollup.model)).all()]
+
+
+def test_rollups_are_maintained_on_insert():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    ensure_telemetry_rollups(engine)
+
+    with patch("pylegislation.research.db.engine", engine):
+        for latency in (100, 400, 800, 1500, 90000):
+            record_telemetry("a", "flash", 100, 10, latency, "SUCCESS", 0.01, 1, 0)
+        record_telemetry("b", "failed", 0, 0, 50, "FAIL")
+
+    rollups = _rollups(engine)
+    assert [(r["model"], r["requests"], r["failures"]) for r in rollups] == [("failed", 1, 1), ("flash", 5, 0)]
+    flash = rollups[1]
+    assert flash["input_tokens"] == 500
+    assert flash["latency_sum_ms"] == 92800
+    assert flash["latency_max_ms"] == 90000
+    assert flash["upload_cache_hits"] == 5
+
+    # The trigger and a full rebuild agree
+    assert rebuild_telemetry_rollups(engine) == 2
+    assert _rollups(engine) == rollups
+
+
+def test_latency_percentile_interpolates_within_buckets():
+    # 10 requests <= 250 ms and 10 in (250, 500]
+    histogram = [10, 10] + [0] * 10
+    assert latency_percentile(histogram, 0.5, 480) == 250.0
+    # The upper bound is tightened to the observed maximum
+    assert latency_percentile(histogram, 0.75, 480) == 365.0
+    assert latency_percentile(histogram, 0.75) == 375.0
+    assert latency_percentile([0] * 12, 0.5) == 0.0
+    # Overflow bucket ends at the observed maximum
+    assert latency_percentile([0] * 11 + [2], 1.0, 400000) == 400000
+
+
+def test_sink_batches_and_flushes_on_stop():
+    from pylegislation.research.db import TelemetryLog
+    from pylegislation.research.telemetry import TelemetrySink
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+
+    sink = TelemetrySink(flush_rows=10, flush_interval=60, max_backlog=25)
+    with patch("pylegislation.research.db.engine", engine):
+        row = {"doc_id": "a", "model": "flash", "input_tokens": 1, "output_tokens": 1,
+               "latency_ms": 5, "status": "SUCCESS"}
+        accepted = [sink.submit(dict(row)) for _ in range(30)]
+        sink.start()
+        sink.stop()
+
+    assert accepted.count(False) == 5
+    assert sink.stats() == {"backlog": 0, "written": 25, "dropped": 5, "flushes": sink.flushes}
+    assert sink.flushes <= 4
+    with Session(engine) as session:
+        assert len(session.exec(select(TelemetryLog)).all()) == 25
@@ -0,0 +1,39 @@
+from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy.pool import StaticPool
+
+from pylegislation.research.db import ActMetadata
+from pylegislation.research.title_index import get_title_index
+
+
+def _act(doc_id, title):
+    return ActMetadata(doc_id=doc_id, doc_type="lk_acts", num="1", date_str="2020-01-01", description=title,
+                       lang="en", url_pdf="", year="2020")
+
+
+def test_title_index_query_add_and_batch():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([
+            _act("a1", "Appropriation Act"),
+            _act("a2", "Appropriation Act"),
+            _act("b1", "Universities (Amendment)"),
+            _act("c1", "Fauna and Flora Protection (Amendment)"),
+        ])
+        session.commit()
+
+    index = get_title_index(engine)
+    matches = index.query("Fauna and Flora Protectoin (Amendment)")
+    assert matches[0]["doc_id"] == "c1"
+    assert matches[0]["score"] > 0.9
+    # Identical titles are reported once per act
+    assert {m["doc_id"] for m in index.query("Appropriation Act")} >= {"a1", "a2"}
+    assert index.query("Completely unrelated title about fisheries") == []
+
+    index.add("d1", "Fisheries and Aquatic Resources")
+    assert index.query("Fisheries & Aquatic Resources")[0]["doc_id"] == "d1"
+
+    batch = index.query_many(["National Archives", "National Archivs", "Universities (Amendment)"])
+    assert batch[0] == []
+    assert batch[1][0]["batch_index"] == 0
+    assert batch[2][0]["doc_id"] == "b1"